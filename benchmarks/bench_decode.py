@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the state payload decoder.
+
+Compares the previous json.loads based parser with the decoder stage on real
+Whisper Flex and Bright 2 payloads, for fresh payloads and for repeated
+heartbeats that the raw-payload hash lets the client skip.
+
+Run from the repository root:
+    python -m benchmarks.bench_decode
+"""
+
+import json
+import timeit
+
+from custom_components.duux_fan_local import decoder
+from custom_components.duux_fan_local.decoder import decode_state
+
+PAYLOADS = {
+    "Whisper Flex": json.dumps(
+        {"sub": {"Tune": [{"power": 1, "speed": 10, "mode": 2}]}}
+    ).encode(),
+    "Bright 2": json.dumps(
+        {
+            "sub": {
+                "Tune": [
+                    {
+                        "uid": "123456",
+                        "rssi": -46,
+                        "sub": {
+                            "Tune": [{"power": 1, "ppm": 17, "speed": 0, "filter": 51}]
+                        },
+                    }
+                ]
+            }
+        }
+    ).encode(),
+}
+NUMBER = 200_000
+
+
+def legacy_decode(payload: bytes):
+    """The parser previously inlined in DuuxMqttClient.on_message."""
+    data = json.loads(payload)
+    fan_data = data.get("sub", {}).get("Tune", [{}])[0]
+    if isinstance(fan_data, dict) and "sub" in fan_data and "Tune" in fan_data["sub"]:
+        fan_data = fan_data["sub"]["Tune"][0]
+    return fan_data
+
+
+def hashed_duplicate(payload: bytes, last_hash: int):
+    """The check the client does before decoding a payload."""
+    return hash(payload) == last_hash
+
+
+def main() -> None:
+    """Time each strategy per payload shape."""
+    print(f"orjson available: {decoder.orjson is not None}")
+    for name, payload in PAYLOADS.items():
+        # paho hands over a fresh bytes object per message
+        fresh = [bytes(bytearray(payload)) for _ in range(NUMBER)]
+        results = {
+            "legacy json.loads": timeit.timeit(
+                lambda: legacy_decode(fresh.pop()), number=NUMBER
+            ),
+        }
+        fresh = [bytes(bytearray(payload)) for _ in range(NUMBER)]
+        results["decode_state"] = timeit.timeit(
+            lambda: decode_state(fresh.pop()), number=NUMBER
+        )
+        fresh = [bytes(bytearray(payload)) for _ in range(NUMBER)]
+        last_hash = hash(payload)
+        results["duplicate (hash only)"] = timeit.timeit(
+            lambda: hashed_duplicate(fresh.pop(), last_hash), number=NUMBER
+        )
+        for label, seconds in results.items():
+            print(f"{name:>12} {label:>22}: {seconds / NUMBER * 1e9:7.0f} ns/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark the cost of handing MQTT state messages to the event loop.
+
+Simulates 100 Bright 2 units (nine entities each) reporting once per second
+through the paho thread transport, and compares the legacy one-job-per-entity
+dispatch with the single hop per message used by DuuxMqttClient.
+
+Run from the repository root:
+    python -m benchmarks.bench_dispatch
+"""
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant, callback
+
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+
+DEVICES = 100
+ENTITIES_PER_DEVICE = 9
+SECONDS = 60
+STATE_KEYS = ("power", "speed", "night", "ion", "filter", "ppm", "AQ", "TVOC", "mode")
+
+
+def build_messages(client: DuuxMqttClient) -> list[SimpleNamespace]:
+    """Build one simulated minute of Bright 2 payloads for a device."""
+    messages = []
+    for second in range(SECONDS):
+        tune = {"power": 1, "speed": 2, "night": 0, "ion": 1, "filter": 51}
+        tune.update({"ppm": 10 + second % 5, "AQ": 1, "TVOC": 80 + second % 3})
+        payload = {"sub": {"Tune": [{"rssi": -46, "sub": {"Tune": [tune]}}]}}
+        messages.append(
+            SimpleNamespace(topic=client.state_topic, payload=json.dumps(payload))
+        )
+    return messages
+
+
+def legacy_on_message(client: DuuxMqttClient, msg) -> None:
+    """The previous dispatch: one thread-safe job per registered entity."""
+    data = json.loads(msg.payload)
+    fan_data = data["sub"]["Tune"][0]["sub"]["Tune"][0]
+    for update_callback in client._callbacks:
+        client.hass.add_job(update_callback, fan_data)
+
+
+async def run(hass: HomeAssistant, on_message, clients) -> tuple[int, float]:
+    """Feed every message from a worker thread and wait for the entities."""
+    loop = hass.loop
+    wakeups = 0
+    original = loop.call_soon_threadsafe
+
+    def counting_call_soon_threadsafe(*args, **kwargs):
+        nonlocal wakeups
+        wakeups += 1
+        return original(*args, **kwargs)
+
+    loop.call_soon_threadsafe = counting_call_soon_threadsafe
+    batches = [(client, build_messages(client)) for client in clients]
+    done = asyncio.Event()
+
+    def paho_thread():
+        for second in range(SECONDS):
+            for client, messages in batches:
+                on_message(client, messages[second])
+        original(done.set)
+
+    start = time.process_time()
+    worker = threading.Thread(target=paho_thread)
+    worker.start()
+    await done.wait()
+    await hass.async_block_till_done()
+    worker.join()
+    elapsed = time.process_time() - start
+    loop.call_soon_threadsafe = original
+    return wakeups, elapsed
+
+
+async def main() -> None:
+    """Compare both dispatch strategies."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        clients = []
+        for index in range(DEVICES):
+            client = DuuxMqttClient(
+                hass, {CONF_DEVICE_ID: f"aa:bb:cc:dd:ee:{index:02x}"}
+            )
+            for key in STATE_KEYS[:ENTITIES_PER_DEVICE]:
+                entity_update = callback(lambda state: None)
+                client.register_callback(entity_update, (key,))
+                # Plain list used by the legacy dispatch only
+                client._callbacks.append(entity_update)
+            clients.append(client)
+
+        messages = DEVICES * SECONDS
+        legacy = await run(
+            hass, lambda client, msg: legacy_on_message(client, msg), clients
+        )
+        for client in clients:
+            client._callbacks.clear()
+        current = await run(
+            hass, lambda client, msg: client.on_message(None, None, msg), clients
+        )
+
+        for label, (wakeups, elapsed) in (("legacy", legacy), ("current", current)):
+            print(
+                f"{label:>8}: {wakeups / messages:5.2f} loop wake-ups/message, "
+                f"{elapsed / messages * 1e6:8.1f} µs CPU/message"
+            )
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark the import cost of the device profile catalogue.
+
+Each run imports devices.py in a fresh interpreter. The legacy run also
+validates every profile, as the module used to at import time; the current
+run validates only the one configured model, as setup now does.
+
+Run from the repository root:
+    python -m benchmarks.bench_import
+"""
+
+import statistics
+import subprocess
+import sys
+
+RUNS = 15
+
+# devices.py has no relative imports, so it is loaded on its own to keep the
+# Home Assistant imports of the package out of the measurement.
+IMPORT_ONLY = """
+import hashlib, importlib.util, json, logging, time, voluptuous
+spec = importlib.util.spec_from_file_location(
+    "devices", "custom_components/duux_fan_local/devices.py"
+)
+devices = importlib.util.module_from_spec(spec)
+start = time.perf_counter()
+spec.loader.exec_module(devices)
+{body}
+print(time.perf_counter() - start)
+"""
+
+LEGACY = """
+for profile in devices.DEVICE_PROFILES.values():
+    devices.DEVICE_PROFILE_SCHEMA(profile)
+"""
+
+CURRENT = """
+devices.validate_profile("whisper_flex_2")
+"""
+
+
+def measure(body: str) -> float:
+    """Return the median seconds of the snippet over fresh interpreters."""
+    samples = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", IMPORT_ONLY.format(body=body)],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(RUNS)
+    ]
+    return statistics.median(samples)
+
+
+def main() -> None:
+    """Compare validating the whole catalogue with one configured model."""
+    baseline = measure("")
+    legacy = measure(LEGACY)
+    current = measure(CURRENT)
+    print(f"import without validation:        {baseline * 1e3:6.2f} ms")
+    print(f" legacy (validate all at import): {legacy * 1e3:6.2f} ms")
+    print(f"current (validate configured):    {current * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark the entity update path with compiled device profiles.
+
+Compares the previous dict lookups on the raw DEVICE_PROFILES entries with
+the entities reading their precomputed, slotted plans.
+
+Run from the repository root:
+    python -m benchmarks.bench_profiles
+"""
+
+import timeit
+
+from custom_components.duux_fan_local.devices import DEVICE_PROFILES
+from custom_components.duux_fan_local.fan import DuuxFan
+from custom_components.duux_fan_local.profiles import compile_profile
+from custom_components.duux_fan_local.select import DuuxSelect
+from custom_components.duux_fan_local.sensor import DuuxSensor
+
+NUMBER = 500_000
+STATE = {"power": 1, "speed": 12, "swing": 1, "tilt": 0, "batlvl": 7, "horosc": 3}
+
+
+def legacy_sensor_update(entity, fan_data):
+    """DuuxSensor._update_state before compiled plans."""
+    state_key = entity._details["state_key"]
+    val = fan_data.get(state_key)
+    if val is not None:
+        multiplier = entity._details.get("multiplier", 1)
+        entity._attr_native_value = val * multiplier
+
+
+def legacy_current_option(entity):
+    """DuuxSelect.current_option before compiled plans."""
+    if entity._current_val is None:
+        return None
+    return next(
+        (k for k, v in entity._options_map.items() if v == entity._current_val), None
+    )
+
+
+def legacy_fan_update(entity, fan_data):
+    """DuuxFan._update_state before compiled plans."""
+    entity._attr_is_on = fan_data.get("power") == 1
+    entity._speed = fan_data.get("speed", 0)
+    if "oscillate" in entity._fan_profile.get("supported_features", []):
+        entity._oscillating = fan_data.get("swing", 0) == 1
+    if "direction" in entity._fan_profile.get("supported_features", []):
+        entity._direction = "reverse" if fan_data.get("tilt", 0) == 1 else "forward"
+
+
+def main() -> None:
+    """Time the legacy and compiled update paths."""
+    whisper_flex = DEVICE_PROFILES["whisper_flex_1"]
+    whisper_flex_2 = DEVICE_PROFILES["whisper_flex_2"]
+    plan_flex = compile_profile("whisper_flex_1")
+    plan_flex_2 = compile_profile("whisper_flex_2")
+
+    sensor = DuuxSensor(
+        None, "aa:bb", "Bench", "whisper_flex_2", plan_flex_2.sensors[0]
+    )
+    select = DuuxSelect(
+        None, "aa:bb", "Bench", "whisper_flex_2", plan_flex_2.selects[1]
+    )
+    select._current_val = 3
+    fan = DuuxFan(None, "aa:bb", "Bench", "whisper_flex_1", plan_flex.fan)
+    for entity in (sensor, fan):
+        entity.async_write_ha_state = lambda: None
+
+    # The legacy code paths run against the same entities, reading the raw
+    # profile dicts the entities used to keep.
+    sensor._details = whisper_flex_2["sensors"]["battery_level"]
+    select._options_map = whisper_flex_2["select"]["horizontal_oscillation"]["options"]
+    fan._fan_profile = whisper_flex["fan"]
+
+    cases = {
+        "sensor update": (
+            lambda: legacy_sensor_update(sensor, STATE),
+            lambda: sensor._update_state(STATE),
+        ),
+        "select current_option": (
+            lambda: legacy_current_option(select),
+            lambda: select.current_option,
+        ),
+        "fan update": (
+            lambda: legacy_fan_update(fan, STATE),
+            lambda: fan._update_state(STATE),
+        ),
+    }
+    for name, (legacy, compiled) in cases.items():
+        legacy_ns = timeit.timeit(legacy, number=NUMBER) / NUMBER * 1e9
+        compiled_ns = timeit.timeit(compiled, number=NUMBER) / NUMBER * 1e9
+        print(f"{name:>22}: legacy {legacy_ns:6.0f} ns, compiled {compiled_ns:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
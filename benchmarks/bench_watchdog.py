@@ -0,0 +1,105 @@
+"""
+Benchmark the availability sweep with a thousand devices.
+
+Simulates 1000 devices reporting every 30 seconds, staggered, for ten
+minutes, while 10 of them fall silent. Compares a full scan of every device
+per tick with the deadline heap swept by AvailabilityWatchdog.
+
+Run from the repository root:
+    python -m benchmarks.bench_watchdog
+"""
+
+import time
+from types import SimpleNamespace
+
+from custom_components.duux_fan_local.watchdog import (
+    SWEEP_INTERVAL,
+    AvailabilityWatchdog,
+)
+
+DEVICES = 1000
+SILENT = 10
+REPORT_INTERVAL = 30
+TIMEOUT = 90
+MINUTES = 10
+
+
+class FakeClient(SimpleNamespace):
+    """Just what the watchdog reads and calls on a DuuxMqttClient."""
+
+    __hash__ = object.__hash__
+
+    def async_set_available(self, available: bool) -> None:
+        self.available = available
+
+
+def build_clients() -> list[FakeClient]:
+    return [
+        FakeClient(
+            index=index, last_seen=0.0, availability_timeout=TIMEOUT, available=True
+        )
+        for index in range(DEVICES)
+    ]
+
+
+def report(clients: list[FakeClient], now: float) -> None:
+    """Update last_seen of the devices reporting at this tick."""
+    tick = SWEEP_INTERVAL.total_seconds()
+    for client in clients[SILENT:]:
+        offset = client.index % REPORT_INTERVAL
+        if (now - offset) % REPORT_INTERVAL < tick:
+            client.last_seen = now
+
+
+def run_scan() -> tuple[float, int, int]:
+    """Check every device on every tick."""
+    clients = build_clients()
+    examined = elapsed = 0.0
+    now = 0.0
+    while now < MINUTES * 60:
+        now += SWEEP_INTERVAL.total_seconds()
+        report(clients, now)
+        start = time.perf_counter()
+        for client in clients:
+            examined += 1
+            if client.available and client.last_seen + TIMEOUT <= now:
+                client.async_set_available(False)
+        elapsed += time.perf_counter() - start
+    return elapsed, int(examined), sum(not client.available for client in clients)
+
+
+def run_heap() -> tuple[float, int, int]:
+    """Pop only the deadlines that are due, re-pushing refreshed ones."""
+    clients = build_clients()
+    clock = SimpleNamespace(now=0.0)
+    hass = SimpleNamespace(loop=SimpleNamespace(time=lambda: clock.now))
+    watchdog = AvailabilityWatchdog(hass)
+    for client in clients:
+        watchdog._watched.add(client)
+        watchdog.async_schedule(client)
+
+    examined = 0
+    elapsed = 0.0
+    while clock.now < MINUTES * 60:
+        clock.now += SWEEP_INTERVAL.total_seconds()
+        report(clients, clock.now)
+        # Counted outside the timed sweep, this is O(n) itself
+        examined += sum(entry[0] <= clock.now for entry in watchdog._heap)
+        start = time.perf_counter()
+        watchdog._async_sweep()
+        elapsed += time.perf_counter() - start
+    return elapsed, examined, sum(not client.available for client in clients)
+
+
+def main() -> None:
+    ticks = int(MINUTES * 60 / SWEEP_INTERVAL.total_seconds())
+    for name, bench in (("full scan", run_scan), ("deadline heap", run_heap)):
+        elapsed, examined, unavailable = bench()
+        print(
+            f"{name:>14}: {examined / ticks:7.1f} devices examined per tick, "
+            f"{elapsed / ticks * 1e6:7.1f} µs per tick, {unavailable} unavailable"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,15 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.const import Platform
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .const import CONF_DEVICE_ID, DOMAIN
 from .mqtt import DuuxMqttClient
+from .store import async_get_state_store
+from .view import DuuxMetricsView
+from .websocket import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,6 +31,16 @@ PLATFORMS: list[Platform] = [
 ]
 
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the parts of the integration shared by all entries."""
+    async_register_websocket_commands(hass)
+    hass.http.register_view(DuuxMetricsView)
+    return True
+
+
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Migrate old entry."""
     _LOGGER.debug("Migrating from version %s", config_entry.version)
@@ -45,23 +61,41 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Duux Fan from a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    # Create and connect the MQTT client
-    client = DuuxMqttClient(hass, entry.data)
-    await client.async_connect()
+    # Create the device client and attach it to the shared broker connection.
+    # Only a fast failure stops setup, a slow handshake finishes in the background.
+    client = DuuxMqttClient(hass, {**entry.data, **entry.options})
+    # Entities start from the last known state until the device reports again
+    client.async_restore_state(await async_get_state_store(hass))
+    try:
+        await client.async_connect()
+    except OSError as err:
+        raise ConfigEntryNotReady(f"Cannot reach the MQTT broker: {err}") from err
 
     hass.data[DOMAIN][entry.entry_id] = client
 
     # Forward the setup to platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         client: DuuxMqttClient = hass.data[DOMAIN].pop(entry.entry_id)
-        # The disconnect call is blocking, so it must be run in an executor
-        await hass.async_add_executor_job(client.disconnect)
+        await client.async_disconnect()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the stored state of a removed device."""
+    store = await async_get_state_store(hass)
+    store.async_remove(entry.data[CONF_DEVICE_ID].lower())
@@ -2,6 +2,7 @@
 Binary sensor platform for the Duux Fan Local integration.
 Dynamically creates BinarySensorEntities based on the device profile.
 """
+import asyncio
 import logging
 from typing import Any
 
@@ -13,9 +14,10 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, MANUFACTURER, MODELS
-from .devices import DEVICE_PROFILES
+from .const import CONF_BINARY_SENSOR_DEBOUNCE, DOMAIN, MANUFACTURER, MODELS
+from .entity import DuuxEntity
 from .mqtt import DuuxMqttClient
+from .profiles import BinarySensorPlan, compile_profile
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,20 +32,34 @@ async def async_setup_entry(
     base_name = config_entry.data["name"]
     model = config_entry.data.get("model", "whisper_flex_2")
 
-    profile = DEVICE_PROFILES.get(model)
-    if not profile or "binary_sensors" not in profile:
+    plan = compile_profile(model)
+    if not plan or not plan.binary_sensors:
         return
 
+    # An empty option keeps the profile setting
+    debounce = config_entry.options.get(CONF_BINARY_SENSOR_DEBOUNCE)
+
     binary_sensors = []
-    for bs_id, details in profile["binary_sensors"].items():
+    for bs_plan in plan.binary_sensors:
+        # Only the sensors the profile debounces take the override
+        bs_debounce = bs_plan.debounce
+        if debounce is not None and bs_plan.debounce:
+            bs_debounce = debounce
         binary_sensors.append(
-            DuuxBinarySensor(client, device_id, base_name, model, bs_id, details)
+            DuuxBinarySensor(
+                client,
+                device_id,
+                base_name,
+                model,
+                bs_plan,
+                bs_debounce,
+            )
         )
 
     async_add_entities(binary_sensors)
 
 
-class DuuxBinarySensor(BinarySensorEntity):
+class DuuxBinarySensor(DuuxEntity, BinarySensorEntity):
     _attr_should_poll = False
 
     def __init__(
@@ -52,26 +68,29 @@ class DuuxBinarySensor(BinarySensorEntity):
         device_id: str,
         base_name: str,
         model: str,
-        bs_id: str,
-        details: dict,
+        plan: BinarySensorPlan,
+        debounce: float = 0,
     ):
         self._client = client
         self._device_id = device_id
         self._name = base_name
         self._model = model
-        self._bs_id = bs_id
-        self._details = details
-
-        self._attr_name = f"{base_name} {details['name']}"
-        self._attr_unique_id = f"{DOMAIN}_{device_id}_{bs_id}"
+        self._bs_id = plan.key
+        self._plan = plan
+        self._state_key = plan.state_key
+        self._debounce = debounce
+        self._debounce_handle: asyncio.TimerHandle | None = None
+        self._reported = False
+
+        self._attr_name = f"{base_name} {plan.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{plan.key}"
         self.entity_id = f"binary_sensor.{self._attr_name.lower().replace(' ', '_')}"
         self._attr_is_on = False
 
-        dc = details.get("device_class")
-        if dc:
-            self._attr_device_class = BinarySensorDeviceClass(dc)
+        if plan.device_class:
+            self._attr_device_class = BinarySensorDeviceClass(plan.device_class)
 
-        self._attr_icon = details.get("icon")
+        self._attr_icon = plan.icon
 
     @property
     def device_info(self) -> dict[str, Any]:
@@ -85,14 +104,43 @@ class DuuxBinarySensor(BinarySensorEntity):
 
     @callback
     def _update_state(self, fan_data: dict):
-        state_key = self._details.get("state_key")
-        val = fan_data.get(state_key)
-        if val is not None:
-            self._attr_is_on = val == 1
+        val = fan_data.get(self._state_key)
+        if val is None:
+            return
+
+        is_on = val == 1
+        if self._debounce_handle is not None:
+            if is_on != self._attr_is_on:
+                # Still waiting for the change to hold
+                return
+            # Flapped back before the debounce ran out
+            self._debounce_handle.cancel()
+            self._debounce_handle = None
+            return
+
+        # The first value, and the restored one, are written right away
+        if not self._debounce or not self._reported or is_on == self._attr_is_on:
+            self._attr_is_on = is_on
+            self._reported = True
             self.async_write_ha_state()
+            return
+
+        self._debounce_handle = self.hass.loop.call_later(
+            self._debounce, self._async_write_debounced, is_on
+        )
+
+    @callback
+    def _async_write_debounced(self, is_on: bool) -> None:
+        self._debounce_handle = None
+        self._attr_is_on = is_on
+        self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
-        self._client.register_callback(self._update_state)
+        await super().async_added_to_hass()
+        self._client.register_callback(self._update_state, (self._state_key,))
 
     async def async_will_remove_from_hass(self) -> None:
         self._client.unregister_callback(self._update_state)
+        if self._debounce_handle is not None:
+            self._debounce_handle.cancel()
+            self._debounce_handle = None
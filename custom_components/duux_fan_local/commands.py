@@ -0,0 +1,403 @@
+"""
+Outbound command handling for the Duux Fan Local integration.
+Queues commands per device, merges rapid updates of the same setting,
+paces them so slow device firmware does not drop any and, optionally,
+confirms them against the state the device reports back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .metrics import DeviceMetrics
+from .ratelimit import TokenBucket
+
+_LOGGER = logging.getLogger(__name__)
+
+# Confirmed mode: give up on a command after this many seconds
+CONFIRM_TIMEOUT = 10.0
+# Confirmed mode: first retry delay, doubled after every attempt
+CONFIRM_RETRY_DELAY = 1.0
+# Confirmed mode: commands awaiting their state echo at once per device
+CONFIRM_MAX_INFLIGHT = 4
+# Offline journal: distinct settings kept per device while it is unreachable
+JOURNAL_MAX_COMMANDS = 32
+# Offline journal: seconds a command stays worth sending, unless overridden
+JOURNAL_TTL = 300.0
+JOURNAL_TTLS = {
+    # Timers count from when they are set, a late one runs too long
+    "tune set timer": 60.0,
+}
+
+
+def command_key(payload: str) -> str:
+    """Return the setting a command targets, e.g. "tune set speed"."""
+    key, _, _ = payload.rpartition(" ")
+    return key or payload
+
+
+def command_value(payload: str) -> int | float | None:
+    """Return the numeric value a command sets, if it has one."""
+    _, _, value = payload.rpartition(" ")
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class InFlightCommand:
+    """A sent command waiting for the device to report its value."""
+
+    payload: str
+    state_key: str
+    expected: Any
+    first_sent: float
+    deadline: float
+    attempts: int = 1
+    retry_handle: asyncio.TimerHandle | None = None
+
+
+class DuuxCommandQueue:
+    """Per-device outbound queue that keeps only the last command per key.
+
+    The first command goes out on the next loop iteration. Commands queued
+    within the window after a flush are merged per key and sent together
+    once it elapses, in the order their keys were last set. A token bucket
+    paces the sends; held-back commands wait on a timer, never blocking.
+
+    In confirmed mode, commands whose key maps to a state key stay in flight
+    until a state payload carries the expected value, and are resent with
+    exponential backoff until CONFIRM_TIMEOUT. At most CONFIRM_MAX_INFLIGHT
+    commands are in flight; later ones wait in the queue.
+
+    While paused, the queue is an offline journal: commands, including those
+    still in flight, wait there until resumed, then flush in order. Commands
+    past their TTL by then are dropped.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send: Callable[[str], None],
+        window: float,
+        metrics: DeviceMetrics,
+        rate: float = 0,
+        burst: int = 1,
+        confirm: bool = False,
+        command_state_keys: Mapping[str, str] | None = None,
+        paused: bool = False,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self._send = send
+        self._window = window
+        self._metrics = metrics
+        # Key -> (payload, time the key was first queued, time it goes stale)
+        self._pending: dict[str, tuple[str, float, float]] = {}
+        self._flush_handle: asyncio.Handle | None = None
+        self._last_flush = float("-inf")
+        self._bucket = TokenBucket(rate, burst, hass.loop.time())
+        self._confirm = confirm
+        self._command_state_keys = command_state_keys or {}
+        self._inflight: dict[str, InFlightCommand] = {}
+        # State key -> (value a published command set, loop time it was sent),
+        # until the device reports that value
+        self._echoes: dict[str, tuple[Any, float]] = {}
+        # Timers of batches sent with spacing between their commands
+        self._batch_handles: list[tuple[asyncio.TimerHandle, str]] = []
+        self._paused = paused
+
+    @property
+    def paused(self) -> bool:
+        """Return True while commands are journaled instead of sent."""
+        return self._paused
+
+    @property
+    def awaiting_confirmation(self) -> bool:
+        """Return True while commands wait for their state echo."""
+        return bool(self._inflight or self._echoes)
+
+    @callback
+    def async_enqueue(self, payload: str, ttl: float | None = None) -> None:
+        """Queue a command, replacing a pending one for the same key.
+
+        The command is dropped if it cannot be sent within `ttl` seconds,
+        which defaults to the journal TTL for its key.
+        """
+        key = command_key(payload)
+        metrics = self._metrics
+        loop = self.hass.loop
+        now = queued_at = loop.time()
+        if ttl is None:
+            ttl = JOURNAL_TTLS.get(key, JOURNAL_TTL)
+        if (previous := self._pending.pop(key, None)) is not None:
+            metrics.commands_coalesced += 1
+            queued_at = previous[1]
+        self._pending[key] = (payload, queued_at, now + ttl)
+        if len(self._pending) > JOURNAL_MAX_COMMANDS:
+            dropped, *_ = self._pending.pop(next(iter(self._pending)))
+            metrics.commands_dropped += 1
+            _LOGGER.warning("Command journal full, dropping %r", dropped)
+        metrics.command_queue_depth = len(self._pending)
+
+        if self._paused:
+            metrics.commands_journaled += 1
+        elif self._flush_handle is None:
+            self._async_schedule_flush(self._last_flush + self._window - loop.time())
+
+    @callback
+    def _async_schedule_flush(self, delay: float) -> None:
+        loop = self.hass.loop
+        if delay > 0:
+            self._flush_handle = loop.call_later(delay, self._async_flush)
+        else:
+            self._flush_handle = loop.call_soon(self._async_flush)
+
+    @callback
+    def _async_flush(self) -> None:
+        """Send pending commands while the rate limit and in-flight window allow."""
+        self._flush_handle = None
+        now = self._last_flush = self.hass.loop.time()
+        metrics = self._metrics
+        while self._pending:
+            key = next(iter(self._pending))
+            payload, queued_at, expires_at = self._pending[key]
+            if now > expires_at:
+                del self._pending[key]
+                metrics.commands_expired += 1
+                _LOGGER.debug("Dropping stale command %r", payload)
+                continue
+            state_key = self._confirm and self._command_state_keys.get(key)
+            if (
+                state_key
+                and key not in self._inflight
+                and len(self._inflight) >= CONFIRM_MAX_INFLIGHT
+            ):
+                # Resumed by the confirmation or timeout that frees a slot
+                metrics.commands_window_full += 1
+                break
+            if wait := self._bucket.try_acquire(now):
+                metrics.commands_rate_limited += 1
+                self._async_schedule_flush(wait)
+                break
+
+            del self._pending[key]
+            waited = now - queued_at
+            metrics.command_wait_total += waited
+            metrics.command_wait_max = max(metrics.command_wait_max, waited)
+            self._async_send(key, payload, now)
+        metrics.command_queue_depth = len(self._pending)
+
+    @callback
+    def async_send_batch(self, payloads: Sequence[str], spacing: float = 0) -> None:
+        """Send commands in order as one unit, ahead of the queue.
+
+        The batch is not paced or held back by the in-flight window, so its
+        commands reach the device back to back, or `spacing` seconds apart.
+        Pending commands for the same keys are dropped as superseded. While
+        the queue is paused, the batch is journaled instead.
+        """
+        if self._paused:
+            for payload in payloads:
+                self.async_enqueue(payload)
+            return
+        for payload in payloads:
+            if self._pending.pop(command_key(payload), None) is not None:
+                self._metrics.commands_coalesced += 1
+        self._metrics.command_queue_depth = len(self._pending)
+
+        loop = self.hass.loop
+        now = loop.time()
+        self._batch_handles = [
+            (handle, payload)
+            for handle, payload in self._batch_handles
+            if handle.when() > now
+        ]
+        for index, payload in enumerate(payloads):
+            if spacing and index:
+                handle = loop.call_later(index * spacing, self._async_send_now, payload)
+                self._batch_handles.append((handle, payload))
+            else:
+                self._async_send_now(payload)
+
+    @callback
+    def _async_send_now(self, payload: str) -> None:
+        """Send a batch command and hold the next flush for the window."""
+        self._last_flush = now = self.hass.loop.time()
+        self._async_send(command_key(payload), payload, now)
+
+    @callback
+    def _async_send(self, key: str, payload: str, now: float) -> None:
+        """Send a command and track it in confirmed mode."""
+        self._metrics.commands_published += 1
+        self._send(payload)
+        if state_key := self._command_state_keys.get(key):
+            if (value := command_value(payload)) is not None:
+                self._echoes[state_key] = (value, now)
+            if self._confirm:
+                self._async_track(key, payload, state_key, now)
+
+    @callback
+    def _async_track(self, key: str, payload: str, state_key: str, now: float):
+        """Start waiting for the state echo of a sent command."""
+        if (expected := command_value(payload)) is None:
+            return
+        if (superseded := self._inflight.pop(key, None)) is not None:
+            superseded.retry_handle.cancel()
+        command = self._inflight[key] = InFlightCommand(
+            payload, state_key, expected, now, now + CONFIRM_TIMEOUT
+        )
+        command.retry_handle = self.hass.loop.call_later(
+            CONFIRM_RETRY_DELAY, self._async_retry, key
+        )
+
+    @callback
+    def _async_retry(self, key: str) -> None:
+        """Resend an unconfirmed command, or give up after the deadline."""
+        command = self._inflight[key]
+        loop = self.hass.loop
+        now = loop.time()
+        if now >= command.deadline:
+            del self._inflight[key]
+            self._metrics.commands_unconfirmed += 1
+            _LOGGER.warning(
+                "Device did not confirm %r after %d attempts",
+                command.payload,
+                command.attempts,
+            )
+            self._async_resume_window()
+            return
+
+        if wait := self._bucket.try_acquire(now):
+            command.retry_handle = loop.call_later(wait, self._async_retry, key)
+            return
+
+        command.attempts += 1
+        self._metrics.commands_retried += 1
+        self._send(command.payload)
+        delay = min(
+            CONFIRM_RETRY_DELAY * 2 ** (command.attempts - 1), command.deadline - now
+        )
+        command.retry_handle = loop.call_later(delay, self._async_retry, key)
+
+    @callback
+    def async_process_state(self, state: Mapping[str, Any]) -> None:
+        """Confirm in-flight commands whose expected value the device reports."""
+        if self._echoes:
+            self._async_time_echoes(state)
+        if not self._inflight:
+            return
+        now = self.hass.loop.time()
+        metrics = self._metrics
+        for key, command in list(self._inflight.items()):
+            if command.state_key in state and state[command.state_key] == (
+                command.expected
+            ):
+                del self._inflight[key]
+                command.retry_handle.cancel()
+                latency = now - command.first_sent
+                metrics.commands_confirmed += 1
+                metrics.confirm_latency_total += latency
+                metrics.confirm_latency_max = max(metrics.confirm_latency_max, latency)
+        self._async_resume_window()
+
+    @callback
+    def _async_time_echoes(self, state: Mapping[str, Any]) -> None:
+        """Record how long published values took to show in the state.
+
+        Values not reported within CONFIRM_TIMEOUT count as lost, so a
+        command the device dropped is not timed against a later report.
+        """
+        now = self.hass.loop.time()
+        metrics = self._metrics
+        for state_key, (value, sent) in list(self._echoes.items()):
+            if now - sent > CONFIRM_TIMEOUT:
+                del self._echoes[state_key]
+                metrics.commands_lost += 1
+            elif state.get(state_key) == value:
+                del self._echoes[state_key]
+                metrics.echo_latency.observe(now - sent)
+
+    @callback
+    def _async_resume_window(self) -> None:
+        """Flush commands held back by a full in-flight window."""
+        if (
+            not self._paused
+            and self._pending
+            and self._flush_handle is None
+            and len(self._inflight) < CONFIRM_MAX_INFLIGHT
+        ):
+            self._async_schedule_flush(0)
+
+    @callback
+    def async_pause(self) -> None:
+        """Journal commands until resumed, as the device cannot receive them."""
+        if self._paused:
+            return
+        self._paused = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        # Commands sent but not confirmed may have been lost with the link,
+        # they go first, unless a newer command for the same key is pending
+        journal: dict[str, tuple[str, float, float]] = {}
+        for key, command in self._inflight.items():
+            command.retry_handle.cancel()
+            ttl = JOURNAL_TTLS.get(key, JOURNAL_TTL)
+            journal[key] = (
+                command.payload,
+                command.first_sent,
+                command.first_sent + ttl,
+            )
+        self._inflight.clear()
+        # Values resent after the outage would time the outage, not the device
+        self._echoes.clear()
+        journal.update(self._pending)
+        self._pending = journal
+
+        now = self.hass.loop.time()
+        for handle, payload in self._batch_handles:
+            if handle.when() > now:
+                handle.cancel()
+                self.async_enqueue(payload)
+        self._batch_handles.clear()
+        self._metrics.command_queue_depth = len(self._pending)
+
+    @callback
+    def async_resume(self) -> None:
+        """Send the journaled commands in order, dropping stale ones."""
+        if not self._paused:
+            return
+        self._paused = False
+        if self._pending:
+            _LOGGER.debug("Flushing %d journaled commands", len(self._pending))
+            if self._flush_handle is None:
+                self._async_schedule_flush(0)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop pending and in-flight commands and stop every timer."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+        for handle, _ in self._batch_handles:
+            handle.cancel()
+        self._batch_handles.clear()
+        for command in self._inflight.values():
+            command.retry_handle.cancel()
+        self._inflight.clear()
+        self._echoes.clear()
+        self._metrics.command_queue_depth = 0
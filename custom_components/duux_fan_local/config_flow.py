@@ -14,20 +14,48 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_NAME, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
 from .const import (
-    DOMAIN,
+    CONF_AVAILABILITY_TIMEOUT,
+    CONF_BINARY_SENSOR_DEBOUNCE,
+    CONF_COALESCE_WINDOW,
+    CONF_COMMAND_BURST,
+    CONF_COMMAND_RATE,
+    CONF_CONFIRM_COMMANDS,
     CONF_DEVICE_ID,
+    CONF_HISTORY_HOURS,
+    CONF_HISTORY_RESOLUTION,
     CONF_MODEL,
     CONF_MQTT_HOST,
     CONF_MQTT_PORT,
+    CONF_OPTIMISTIC,
+    CONF_PERSISTENT_SESSION,
+    CONF_SENSOR_DEADBAND,
+    CONF_SENSOR_DEADBAND_PERCENT,
+    CONF_SENSOR_MAX_SILENCE,
+    CONF_SENSOR_MIN_INTERVAL,
+    CONF_TRANSPORT,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_COMMAND_BURST,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_CONFIRM_COMMANDS,
+    DEFAULT_HISTORY_HOURS,
+    DEFAULT_HISTORY_RESOLUTION,
+    DEFAULT_OPTIMISTIC,
+    DEFAULT_PERSISTENT_SESSION,
+    DEFAULT_TRANSPORT,
+    DOMAIN,
     MODELS,
     MQTT_HOST,
     MQTT_PORT,
     MQTT_TIMEOUT,
     TOPIC_STATE,
+    TRANSPORT_ASYNCIO,
+    TRANSPORT_THREAD,
 )
+from .profiles import default_availability_timeout
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -118,6 +146,14 @@ class DuuxFanConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 2
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> DuuxFanOptionsFlow:
+        """Get the options flow for this handler."""
+        return DuuxFanOptionsFlow(config_entry)
+
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._username: str | None = None
@@ -219,3 +255,106 @@ class DuuxFanConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if self._password:
             data[CONF_PASSWORD] = self._password
         return self.async_create_entry(title=user_input[CONF_NAME], data=data)
+
+
+class DuuxFanOptionsFlow(config_entries.OptionsFlow):
+    """Handle Duux Fan options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the command pacing options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_COMMAND_RATE,
+                    default=options.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_COMMAND_BURST,
+                    default=options.get(CONF_COMMAND_BURST, DEFAULT_COMMAND_BURST),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(
+                    CONF_CONFIRM_COMMANDS,
+                    default=options.get(
+                        CONF_CONFIRM_COMMANDS, DEFAULT_CONFIRM_COMMANDS
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_OPTIMISTIC,
+                    default=options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC),
+                ): bool,
+                vol.Optional(
+                    CONF_PERSISTENT_SESSION,
+                    default=options.get(
+                        CONF_PERSISTENT_SESSION, DEFAULT_PERSISTENT_SESSION
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_TRANSPORT,
+                    default=options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT),
+                ): vol.In([TRANSPORT_ASYNCIO, TRANSPORT_THREAD]),
+                vol.Optional(
+                    CONF_COALESCE_WINDOW,
+                    default=options.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+                vol.Optional(
+                    CONF_AVAILABILITY_TIMEOUT,
+                    default=options.get(
+                        CONF_AVAILABILITY_TIMEOUT,
+                        default_availability_timeout(
+                            self.config_entry.data.get(CONF_MODEL, "whisper_flex_2")
+                        ),
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_HISTORY_HOURS,
+                    default=options.get(CONF_HISTORY_HOURS, DEFAULT_HISTORY_HOURS),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=168)),
+                vol.Optional(
+                    CONF_HISTORY_RESOLUTION,
+                    default=options.get(
+                        CONF_HISTORY_RESOLUTION, DEFAULT_HISTORY_RESOLUTION
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                # Report filtering overrides, left empty to use the profile
+                vol.Optional(
+                    CONF_SENSOR_DEADBAND,
+                    description={"suggested_value": options.get(CONF_SENSOR_DEADBAND)},
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_SENSOR_DEADBAND_PERCENT,
+                    description={
+                        "suggested_value": options.get(CONF_SENSOR_DEADBAND_PERCENT)
+                    },
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_SENSOR_MIN_INTERVAL,
+                    description={
+                        "suggested_value": options.get(CONF_SENSOR_MIN_INTERVAL)
+                    },
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_SENSOR_MAX_SILENCE,
+                    description={
+                        "suggested_value": options.get(CONF_SENSOR_MAX_SILENCE)
+                    },
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_BINARY_SENSOR_DEBOUNCE,
+                    description={
+                        "suggested_value": options.get(CONF_BINARY_SENSOR_DEBOUNCE)
+                    },
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=data_schema)
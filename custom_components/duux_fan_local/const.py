@@ -7,6 +7,22 @@ CONF_DEVICE_ID = "device_id"
 CONF_MODEL = "model"
 CONF_MQTT_HOST = "mqtt_host"
 CONF_MQTT_PORT = "mqtt_port"
+CONF_TRANSPORT = "transport"
+CONF_COALESCE_WINDOW = "coalesce_window"
+CONF_COMMAND_WINDOW = "command_window"
+CONF_COMMAND_RATE = "command_rate"
+CONF_COMMAND_BURST = "command_burst"
+CONF_CONFIRM_COMMANDS = "confirm_commands"
+CONF_OPTIMISTIC = "optimistic"
+CONF_PERSISTENT_SESSION = "persistent_session"
+CONF_AVAILABILITY_TIMEOUT = "availability_timeout"
+CONF_HISTORY_HOURS = "history_hours"
+CONF_HISTORY_RESOLUTION = "history_resolution"
+CONF_SENSOR_DEADBAND = "sensor_deadband"
+CONF_SENSOR_DEADBAND_PERCENT = "sensor_deadband_percent"
+CONF_SENSOR_MIN_INTERVAL = "sensor_min_interval"
+CONF_SENSOR_MAX_SILENCE = "sensor_max_silence"
+CONF_BINARY_SENSOR_DEBOUNCE = "binary_sensor_debounce"
 MANUFACTURER = "Duux"
 
 # Generate MODELS dynamically from DEVICE_PROFILES
@@ -17,6 +33,52 @@ MQTT_HOST = "collector3.cloudgarden.nl"
 MQTT_PORT = 443
 MQTT_TIMEOUT = 10
 
+# MQTT transports: drive the socket from the event loop, or paho's own thread
+TRANSPORT_ASYNCIO = "asyncio"
+TRANSPORT_THREAD = "thread"
+DEFAULT_TRANSPORT = TRANSPORT_ASYNCIO
+
+# Seconds to merge state bursts for, 0 drains once per event loop iteration
+DEFAULT_COALESCE_WINDOW = 0
+
+# Seconds during which repeated commands for the same setting are merged
+DEFAULT_COMMAND_WINDOW = 0.25
+
+# Commands per second sent to a device, and how many may go out back to back
+DEFAULT_COMMAND_RATE = 2.0
+DEFAULT_COMMAND_BURST = 3
+DEFAULT_CONFIRM_COMMANDS = False
+DEFAULT_OPTIMISTIC = False
+DEFAULT_PERSISTENT_SESSION = False
+
+# Reports a device may miss before it is unavailable, the interval between
+# reports depends on the model (see report_interval in devices.py)
+AVAILABILITY_MISSED_REPORTS = 3
+
+# In-memory sensor history: hours kept, and seconds averaged into one sample
+DEFAULT_HISTORY_HOURS = 24
+DEFAULT_HISTORY_RESOLUTION = 60
+
+# Service fields
+ATTR_MODE_OPTION = "mode"
+
 # Topics
 TOPIC_COMMAND = "sensor/{device_id}/command"
-TOPIC_STATE = "sensor/{device_id}/in"
+TOPIC_STATE = "sensor/{device_id}/in"
+TOPIC_STATE_WILDCARD = "sensor/+/in"
+
+# hass.data key holding the shared broker connections
+DATA_CONNECTIONS = f"{DOMAIN}_connections"
+# hass.data key and storage file of the last-known device states
+DATA_STATE_STORE = f"{DOMAIN}_state_store"
+STORAGE_KEY = f"{DOMAIN}.state"
+STORAGE_VERSION = 1
+
+# hass.data key mapping sensor entity IDs to their in-memory history
+DATA_HISTORY = f"{DOMAIN}_history"
+
+# hass.data key holding the availability watchdog
+DATA_WATCHDOG = f"{DOMAIN}_watchdog"
+
+# hass.data key holding the limiter shared by all connection attempts
+DATA_CONNECT_LIMITER = f"{DOMAIN}_connect_limiter"
@@ -0,0 +1,58 @@
+"""
+State payload decoding for the Duux Fan Local integration.
+Turns raw MQTT payloads into the flat dict of state keys the entities read.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
+
+# Raised for malformed payloads; orjson's error subclasses json.JSONDecodeError
+DECODE_ERRORS = (json.JSONDecodeError, KeyError, IndexError)
+
+
+def loads(payload: bytes | bytearray | memoryview | str) -> Any:
+    """Parse JSON straight from the raw payload, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(payload)
+    if isinstance(payload, memoryview):
+        payload = payload.tobytes()
+    return json.loads(payload)
+
+
+def extract_state(data: Any) -> dict[str, Any] | None:
+    """Return the state dict under sub.Tune[0], or None if there is none."""
+    fan_data = data.get("sub", {}).get("Tune", [{}])[0]
+
+    # Some models like Bright 2 nest the payload again under "sub"
+    if isinstance(fan_data, dict) and "sub" in fan_data:
+        inner = fan_data["sub"]
+        if "Tune" in inner:
+            fan_data = inner["Tune"][0]
+
+    if isinstance(fan_data, dict) and fan_data:
+        return fan_data
+    return None
+
+
+def extract_rssi(data: Any) -> int | None:
+    """Return the signal strength sent next to the state, if any.
+
+    Double-nested payloads carry it beside the inner "sub", which
+    extract_state unwraps.
+    """
+    outer = data.get("sub", {}).get("Tune", [{}])[0]
+    if isinstance(outer, dict):
+        return outer.get("rssi")
+    return None
+
+
+def decode_state(
+    payload: bytes | bytearray | memoryview | str,
+) -> dict[str, Any] | None:
+    """Decode a raw state payload into its state dict."""
+    return extract_state(loads(payload))
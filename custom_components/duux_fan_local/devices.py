@@ -4,9 +4,12 @@ This module defines the schema and configurations for various Duux models
 (fans, air purifiers, etc.), mapping their MQTT payloads to Home Assistant entities.
 """
 
-import voluptuous as vol
+import hashlib
+import json
 import logging
 
+import voluptuous as vol
+
 _LOGGER = logging.getLogger(__name__)
 
 # Common attributes
@@ -31,11 +34,19 @@ ATTR_ION = "ion"
 ATTR_AQ = "AQ"
 ATTR_TVOC = "TVOC"
 
+# Seconds between state reports of a model that does not declare its own
+DEFAULT_REPORT_INTERVAL = 30
+
+# Rolling statistics a profile can derive from its sensors
+STATISTIC_TYPES = ("mean", "min", "max", "percentile")
+
 # Schema validation for device profiles
 # This ensures any new models added in the future strictly adhere to the expected format.
-DEVICE_PROFILE_SCHEMA = vol.Schema(
+_PROFILE_SCHEMA = vol.Schema(
     {
         vol.Required("name"): str,
+        # Longest expected gap between two state reports, in seconds
+        vol.Optional("report_interval"): vol.All(int, vol.Range(min=1)),
         vol.Optional("fan"): vol.Schema(
             {
                 vol.Optional("supported_features"): [str],
@@ -69,6 +80,37 @@ DEVICE_PROFILE_SCHEMA = vol.Schema(
                         vol.Optional("unit"): vol.Any(str, None),
                         vol.Optional("icon"): vol.Any(str, None),
                         vol.Optional("multiplier"): vol.Any(int, float),
+                        # Report filtering, see filters.ReportFilter
+                        vol.Optional("deadband"): vol.All(
+                            vol.Any(int, float), vol.Range(min=0)
+                        ),
+                        vol.Optional("deadband_percent"): vol.All(
+                            vol.Any(int, float), vol.Range(min=0)
+                        ),
+                        vol.Optional("min_interval"): vol.All(
+                            vol.Any(int, float), vol.Range(min=0)
+                        ),
+                        vol.Optional("max_silence"): vol.All(
+                            vol.Any(int, float), vol.Range(min=0)
+                        ),
+                    }
+                )
+            }
+        ),
+        vol.Optional("statistics"): vol.Schema(
+            {
+                vol.Extra: vol.Schema(
+                    {
+                        vol.Required("name"): str,
+                        # Key of the source entry in "sensors"
+                        vol.Required("sensor"): str,
+                        vol.Required("statistic"): vol.In(STATISTIC_TYPES),
+                        # Window length in minutes
+                        vol.Required("window"): vol.All(int, vol.Range(min=1)),
+                        vol.Optional("percentile"): vol.All(
+                            vol.Any(int, float), vol.Range(min=0, max=100)
+                        ),
+                        vol.Optional("icon"): vol.Any(str, None),
                     }
                 )
             }
@@ -110,6 +152,10 @@ DEVICE_PROFILE_SCHEMA = vol.Schema(
                         vol.Required("state_key"): str,
                         vol.Optional("device_class"): vol.Any(str, None),
                         vol.Optional("icon"): vol.Any(str, None),
+                        # Seconds a new state must hold before it is written
+                        vol.Optional("debounce"): vol.All(
+                            vol.Any(int, float), vol.Range(min=0)
+                        ),
                     }
                 )
             }
@@ -117,9 +163,53 @@ DEVICE_PROFILE_SCHEMA = vol.Schema(
     }
 )
 
+
+def _statistic_sources_exist(profile: dict) -> dict:
+    """Check that every rolling statistic derives from a declared sensor."""
+    sensors = profile.get("sensors", {})
+    for key, details in profile.get("statistics", {}).items():
+        if details["sensor"] not in sensors:
+            raise vol.Invalid(
+                f"unknown sensor '{details['sensor']}'", path=["statistics", key]
+            )
+    return profile
+
+
+DEVICE_PROFILE_SCHEMA = vol.All(_PROFILE_SCHEMA, _statistic_sources_exist)
+
+
+def _rolling_statistics(sensor: str, name: str) -> dict:
+    """Return the rolling statistics of an air quality sensor."""
+    statistics = {
+        f"{sensor}_mean_{window}m": {
+            "name": f"{name} {window} min Average",
+            "sensor": sensor,
+            "statistic": "mean",
+            "window": window,
+        }
+        for window in (5, 15, 60)
+    }
+    for statistic in ("min", "max"):
+        statistics[f"{sensor}_{statistic}_60m"] = {
+            "name": f"{name} 60 min {statistic.capitalize()}",
+            "sensor": sensor,
+            "statistic": statistic,
+            "window": 60,
+        }
+    statistics[f"{sensor}_p95_60m"] = {
+        "name": f"{name} 60 min 95th Percentile",
+        "sensor": sensor,
+        "statistic": "percentile",
+        "window": 60,
+        "percentile": 95,
+    }
+    return statistics
+
+
 DEVICE_PROFILES = {
     "whisper_flex_1": {
         "name": "Whisper Flex 1",
+        "report_interval": 30,
         "fan": {
             "supported_features": [
                 "turn_on",
@@ -184,6 +274,8 @@ DEVICE_PROFILES = {
     },
     "whisper_flex_2": {
         "name": "Whisper Flex 2",
+        # Battery powered, reports less often when idle on battery
+        "report_interval": 300,
         "fan": {
             "supported_features": ["turn_on", "turn_off", "set_speed"],
             "max_speed": 30,
@@ -268,11 +360,13 @@ DEVICE_PROFILES = {
                 "state_key": ATTR_BATCHA,
                 "device_class": "battery_charging",
                 "icon": "mdi:battery-charging",
+                "debounce": 30,
             }
         },
     },
     "whisper_flex_ultimate": {
         "name": "Whisper Flex Ultimate",
+        "report_interval": 30,
         "fan": {
             "supported_features": ["turn_on", "turn_off", "set_speed"],
             "max_speed": 30,
@@ -338,6 +432,7 @@ DEVICE_PROFILES = {
     },
     "bright_2": {
         "name": "Duux Bright 2",
+        "report_interval": 30,
         "fan": {
             "supported_features": ["turn_on", "turn_off", "set_speed"],
             "max_speed": 4,  # 0 to 4 (0 is auto)
@@ -378,6 +473,10 @@ DEVICE_PROFILES = {
                 "unit": "µg/m³",
                 "icon": "mdi:molecule",
                 "multiplier": 1,
+                "deadband": 2,
+                "deadband_percent": 5,
+                "min_interval": 30,
+                "max_silence": 900,
             },
             "air_quality": {
                 "name": "Air Quality",
@@ -396,8 +495,16 @@ DEVICE_PROFILES = {
                 "unit": "µg/m³",
                 "icon": "mdi:molecule",
                 "multiplier": 1,
+                "deadband": 2,
+                "deadband_percent": 5,
+                "min_interval": 30,
+                "max_silence": 900,
             },
         },
+        "statistics": {
+            **_rolling_statistics("pm_10", "PM10"),
+            **_rolling_statistics("tvoc", "TVOC"),
+        },
         "numbers": {
             "speed": {
                 "name": "Speed",
@@ -415,9 +522,33 @@ DEVICE_PROFILES = {
     },
 }
 
-# Validate all profiles at import time
-for model_key, profile in DEVICE_PROFILES.items():
+# Content hashes of profiles that already passed validation. Profiles are only
+# validated when a configured model is first used, the full catalogue is
+# validated by the test suite.
+_VALIDATED_PROFILES: set[str] = set()
+
+
+def profile_digest(profile: dict) -> str:
+    """Return a stable content hash of a device profile."""
+    encoded = json.dumps(profile, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def validate_profile(model_key: str) -> bool:
+    """Validate the profile of a model, once per profile content."""
+    profile = DEVICE_PROFILES.get(model_key)
+    if profile is None:
+        return False
+
+    digest = profile_digest(profile)
+    if digest in _VALIDATED_PROFILES:
+        return True
+
     try:
         DEVICE_PROFILE_SCHEMA(profile)
     except vol.Invalid as e:
         _LOGGER.error("Invalid configuration for Duux profile '%s': %s", model_key, e)
+        return False
+
+    _VALIDATED_PROFILES.add(digest)
+    return True
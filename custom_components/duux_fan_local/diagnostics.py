@@ -0,0 +1,74 @@
+"""
+Diagnostics support for the Duux Fan Local integration.
+Formats the payloads, commands and connection events each client keeps in
+fixed-size buffers, only when a diagnostics download is requested.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .decoder import loads
+from .mqtt import DuuxMqttClient
+
+# Broker credentials, and the account ID some models send in their payloads
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME, "uid"}
+
+
+def _payload(raw: Any) -> Any:
+    """Return a payload as redacted JSON, or as text if it does not parse."""
+    try:
+        return async_redact_data(loads(raw), TO_REDACT)
+    except ValueError:
+        # Invalid JSON or UTF-8, both ValueErrors
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            return bytes(raw).decode(errors="replace")
+        return raw
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    client: DuuxMqttClient = hass.data[DOMAIN][entry.entry_id]
+
+    # Buffers hold loop times, shown as wall-clock timestamps
+    loop_now = hass.loop.time()
+    wall_now = time.time()
+
+    def timestamp(loop_time: float) -> str:
+        return dt_util.utc_from_timestamp(wall_now - (loop_now - loop_time)).isoformat()
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "device": {
+            "available": client.available,
+            "stale": client.stale,
+            "last_seen": timestamp(client.last_seen),
+            "rssi": client.rssi,
+        },
+        "payloads": [
+            {"received": timestamp(received), "payload": _payload(raw)}
+            for received, raw in list(client.recent_payloads)
+        ],
+        "commands": [
+            {"sent": timestamp(sent), "payload": payload}
+            for sent, payload in list(client.recent_commands)
+        ],
+        "connection": [
+            {"time": timestamp(at), "event": event, "detail": detail}
+            for at, event, detail in client.connection_events
+        ],
+        "metrics": client.metrics.as_dict(),
+    }
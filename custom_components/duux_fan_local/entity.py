@@ -0,0 +1,31 @@
+"""
+Base entity for the Duux Fan Local integration.
+"""
+
+from __future__ import annotations
+
+from homeassistant.helpers.entity import Entity
+
+from .mqtt import DuuxMqttClient
+
+
+class DuuxEntity(Entity):
+    """An entity whose state comes from a device's MQTT client."""
+
+    _client: DuuxMqttClient
+
+    @property
+    def available(self) -> bool:
+        """Return True while the device reports within its expected interval."""
+        return self._client.available
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the availability of the device."""
+        self.async_on_remove(
+            self._client.register_availability_callback(self.async_write_ha_state)
+        )
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return True while showing restored state the device has not confirmed."""
+        return self._client.stale
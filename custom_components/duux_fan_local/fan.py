@@ -6,21 +6,28 @@ Dynamically creates a FanEntity based on the device profile capabilities.
 import logging
 from typing import Any
 
+import voluptuous as vol
 from homeassistant.components.fan import FanEntity, FanEntityFeature
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.util.percentage import (
     percentage_to_ranged_value,
     ranged_value_to_percentage,
 )
 
-from .const import DOMAIN, MANUFACTURER, MODELS
-from .devices import DEVICE_PROFILES, ATTR_POWER, ATTR_SPEED, ATTR_SWING, ATTR_TILT
+from .const import ATTR_MODE_OPTION, DOMAIN, MANUFACTURER, MODELS
+from .devices import ATTR_SWING, ATTR_TILT
+from .entity import DuuxEntity
 from .mqtt import DuuxMqttClient
+from .profiles import FanPlan, SelectPlan, compile_profile
 
 _LOGGER = logging.getLogger(__name__)
 
+SERVICE_TURN_ON_WITH_MODE = "turn_on_with_mode"
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -33,18 +40,30 @@ async def async_setup_entry(
     base_name = config_entry.data["name"]
     model = config_entry.data.get("model", "whisper_flex_2")
 
-    profile = DEVICE_PROFILES.get(model)
-    if not profile or "fan" not in profile:
+    plan = compile_profile(model)
+    if not plan or plan.fan is None:
         _LOGGER.debug("Model %s does not support a fan entity.", model)
         return
 
+    # The fan mode select, when the model has one, also drives turn_on_with_mode
+    mode_plan = next(
+        (select for select in plan.selects if select.command_topic == "tune set mode"),
+        None,
+    )
     fan = [
-        DuuxFan(client, device_id, base_name, model, profile),
+        DuuxFan(client, device_id, base_name, model, plan.fan, mode_plan),
     ]
     async_add_entities(fan)
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_TURN_ON_WITH_MODE,
+        {vol.Required(ATTR_MODE_OPTION): cv.string},
+        "async_turn_on_with_mode",
+    )
+
 
-class DuuxFan(FanEntity):
+class DuuxFan(DuuxEntity, FanEntity):
     """Representation of a Duux Fan."""
 
     _attr_should_poll = False
@@ -55,15 +74,16 @@ class DuuxFan(FanEntity):
         device_id: str,
         base_name: str,
         model: str,
-        profile: dict,
+        plan: FanPlan,
+        mode_plan: SelectPlan | None = None,
     ) -> None:
         """Initialize the fan entity."""
         self._client = client
         self._name = base_name
         self._device_id = device_id
         self._model = model
-        self._profile = profile
-        self._fan_profile = profile["fan"]
+        self._plan = plan
+        self._mode_plan = mode_plan
 
         self._attr_name = base_name
         self._attr_unique_id = f"{DOMAIN}_{device_id}_fan"
@@ -73,10 +93,10 @@ class DuuxFan(FanEntity):
         self._oscillating = False
         self._direction = "forward"
 
-        self._max_speed = self._fan_profile.get("max_speed", 100)
+        self._max_speed = plan.max_speed
         self._speed_range = (1, self._max_speed)
 
-        features = self._fan_profile.get("supported_features", [])
+        features = plan.supported_features
         supported_features = FanEntityFeature(0)
         if "turn_on" in features:
             supported_features |= FanEntityFeature.TURN_ON
@@ -84,16 +104,16 @@ class DuuxFan(FanEntity):
             supported_features |= FanEntityFeature.TURN_OFF
         if "set_speed" in features:
             supported_features |= FanEntityFeature.SET_SPEED
-        if "oscillate" in features:
+        if plan.oscillate:
             supported_features |= FanEntityFeature.OSCILLATE
-        if "direction" in features:
+        if plan.direction:
             supported_features |= FanEntityFeature.DIRECTION
 
         self._attr_supported_features = supported_features
 
-        # Determine keys for power and speed based on profile
-        self._power_key = self._fan_profile.get("power_key", ATTR_POWER)
-        self._speed_key = self._fan_profile.get("speed_key", ATTR_SPEED)
+        # Keys for power and speed, resolved from the profile at compile time
+        self._power_key = plan.power_key
+        self._speed_key = plan.speed_key
 
     @property
     def device_info(self) -> dict[str, Any]:
@@ -129,10 +149,35 @@ class DuuxFan(FanEntity):
         """Return the current direction of the fan."""
         return self._direction
 
-    async def async_turn_on(self, *args, **kwargs) -> None:
-        """Turn the fan on."""
+    async def async_turn_on(
+        self,
+        percentage: int | None = None,
+        preset_mode: str | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Turn the fan on, at a speed when a percentage is given."""
+        if percentage:
+            await self.async_set_percentage(percentage)
+            return
         await self._async_publish("tune set power 1")
 
+    async def async_turn_on_with_mode(self, mode: str) -> None:
+        """Turn the fan on in a mode of the fan mode select."""
+        if self._mode_plan is None or mode not in self._mode_plan.option_values:
+            raise ServiceValidationError(
+                f"{self.entity_id} does not support mode {mode!r}",
+                translation_domain=DOMAIN,
+                translation_key="invalid_mode",
+                translation_placeholders={
+                    "entity_id": self.entity_id,
+                    "mode": mode,
+                },
+            )
+        value = self._mode_plan.option_values[mode]
+        await self._client.async_transaction(
+            ["tune set power 1", f"{self._mode_plan.command_topic} {value}"]
+        )
+
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the fan off."""
         await self._async_publish("tune set power 0")
@@ -142,25 +187,29 @@ class DuuxFan(FanEntity):
         if percentage == 0:
             await self.async_turn_off()
             return
-        if not self._attr_is_on:
-            await self._async_publish("tune set power 1")
         speed = round(percentage_to_ranged_value(self._speed_range, percentage))
-        await self._async_publish(f"tune set speed {speed}")
+        if self._attr_is_on:
+            await self._async_publish(f"tune set speed {speed}")
+            return
+        # Power and speed go out together, so the fan never starts at its old speed
+        await self._client.async_send_batch(
+            ["tune set power 1", f"tune set speed {speed}"]
+        )
 
     async def async_oscillate(self, oscillating: bool) -> None:
         """Turn oscillation on or off."""
-        if "oscillate" in self._fan_profile.get("supported_features", []):
+        if self._plan.oscillate:
             await self._async_publish(f"tune set swing {1 if oscillating else 0}")
 
     async def async_set_direction(self, direction: str) -> None:
         """Set the direction of the fan."""
-        if "direction" in self._fan_profile.get("supported_features", []):
+        if self._plan.direction:
             tilt_value = 1 if direction == "reverse" else 0
             await self._async_publish(f"tune set tilt {tilt_value}")
 
     async def _async_publish(self, payload: str) -> None:
         """Publish a command to the MQTT topic."""
-        await self.hass.async_add_executor_job(self._client.publish, payload)
+        await self._client.async_publish(payload)
 
     @callback
     def _update_state(self, fan_data: dict[str, Any]) -> None:
@@ -168,10 +217,10 @@ class DuuxFan(FanEntity):
         self._attr_is_on = fan_data.get(self._power_key) == 1
         self._speed = fan_data.get(self._speed_key, 0)
 
-        if "oscillate" in self._fan_profile.get("supported_features", []):
+        if self._plan.oscillate:
             self._oscillating = fan_data.get(ATTR_SWING, 0) == 1
 
-        if "direction" in self._fan_profile.get("supported_features", []):
+        if self._plan.direction:
             self._direction = (
                 "reverse" if fan_data.get(ATTR_TILT, 0) == 1 else "forward"
             )
@@ -180,7 +229,8 @@ class DuuxFan(FanEntity):
 
     async def async_added_to_hass(self) -> None:
         """Run when entity is added to Home Assistant."""
-        self._client.register_callback(self._update_state)
+        await super().async_added_to_hass()
+        self._client.register_callback(self._update_state, self._plan.state_keys)
 
     async def async_will_remove_from_hass(self) -> None:
         """Run when entity is removed from Home Assistant."""
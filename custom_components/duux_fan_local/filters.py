@@ -0,0 +1,68 @@
+"""
+Report filtering for the Duux Fan Local integration.
+Decides which sensor readings are written to the state machine, so values
+that wobble around a level do not turn into a recorder row per message.
+"""
+
+from __future__ import annotations
+
+
+class ReportFilter:
+    """Deadband, minimum interval and heartbeat for one sensor.
+
+    A reading is written when it moves beyond both the absolute and the
+    relative deadband of the last written value, at most once per
+    min_interval. A reading inside the deadband is still written once
+    max_silence has passed since the last write; the sensor also schedules
+    that write itself, as a steady value may bring no reading at all. Zero
+    disables a setting.
+    """
+
+    __slots__ = (
+        "deadband",
+        "deadband_percent",
+        "min_interval",
+        "max_silence",
+        "_reported",
+        "_reported_at",
+    )
+
+    def __init__(
+        self,
+        deadband: float = 0,
+        deadband_percent: float = 0,
+        min_interval: float = 0,
+        max_silence: float = 0,
+    ) -> None:
+        """Initialize the filter."""
+        self.deadband = deadband
+        self.deadband_percent = deadband_percent
+        self.min_interval = min_interval
+        self.max_silence = max_silence
+        self._reported: float | None = None
+        self._reported_at = 0.0
+
+    def _significant(self, value: float) -> bool:
+        reported = self._reported
+        if reported is None:
+            return True
+        change = abs(value - reported)
+        if change <= self.deadband:
+            return False
+        return change > abs(reported) * self.deadband_percent / 100
+
+    def next_write(self, value: float, now: float) -> float | None:
+        """Return how long to wait before writing value, or None to drop it."""
+        if self._reported is None:
+            return 0
+        silent = now - self._reported_at
+        if not self._significant(value):
+            if self.max_silence and silent >= self.max_silence:
+                return 0
+            return None
+        return max(0.0, self.min_interval - silent)
+
+    def written(self, value: float, now: float) -> None:
+        """Record that value was written at now."""
+        self._reported = value
+        self._reported_at = now
@@ -0,0 +1,102 @@
+"""
+Link health figures for the Duux Fan Local integration.
+Derives per-device diagnostics from the counters the MQTT client already
+keeps, refreshed on a slow timer so they add no write load of their own.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+if TYPE_CHECKING:
+    from .mqtt import DuuxMqttClient
+
+HEALTH_INTERVAL = timedelta(seconds=60)
+
+
+class DeviceHealth:
+    """Throttled link figures of one device.
+
+    Every interval, rates and averages are computed from the difference
+    between the client counters now and at the previous refresh, then
+    handed to the registered callbacks at once.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: DuuxMqttClient,
+        interval: timedelta = HEALTH_INTERVAL,
+    ) -> None:
+        """Initialize the figures, empty until the first refresh."""
+        self.hass = hass
+        self._client = client
+        self._interval = interval
+        self._callbacks: list[Callable[[], None]] = []
+        self._unsub_refresh: CALLBACK_TYPE | None = None
+        # Counter values at the previous refresh
+        self._last_refresh = hass.loop.time()
+        self._last_received = client.metrics.messages_received
+        self._last_echoes = client.metrics.echo_latency.count
+        self._last_echo_total = client.metrics.echo_latency.total
+
+        self.rssi: int | None = None
+        self.message_rate: float | None = None
+        self.last_seen_age: int | None = None
+        self.parse_errors = 0
+        # Mean command round trip in milliseconds over the last interval
+        # that had one, as the device is seldom commanded
+        self.round_trip: float | None = None
+
+    @callback
+    def register_callback(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Register a callback for refreshes, return its remover."""
+        self._callbacks.append(update_callback)
+        if self._unsub_refresh is None:
+            self._unsub_refresh = async_track_time_interval(
+                self.hass, self._async_refresh, self._interval
+            )
+
+        @callback
+        def _remove() -> None:
+            self._callbacks.remove(update_callback)
+            if not self._callbacks and self._unsub_refresh is not None:
+                self._unsub_refresh()
+                self._unsub_refresh = None
+
+        return _remove
+
+    @callback
+    def _async_refresh(self, _now: datetime | None = None) -> None:
+        """Recompute the figures and update the callbacks."""
+        client = self._client
+        metrics = client.metrics
+        now = self.hass.loop.time()
+
+        elapsed = now - self._last_refresh
+        if elapsed > 0:
+            received = metrics.messages_received - self._last_received
+            self.message_rate = round(received * 60 / elapsed, 1)
+        echoes = metrics.echo_latency.count - self._last_echoes
+        if echoes:
+            echo_total = metrics.echo_latency.total - self._last_echo_total
+            self.round_trip = round(echo_total / echoes * 1000, 1)
+
+        self.rssi = client.rssi
+        # The first message sets last_seen, before that it is the setup time
+        if metrics.messages_received:
+            self.last_seen_age = round(now - client.last_seen)
+        self.parse_errors = metrics.parse_errors
+
+        self._last_refresh = now
+        self._last_received = metrics.messages_received
+        self._last_echoes = metrics.echo_latency.count
+        self._last_echo_total = metrics.echo_latency.total
+
+        for update_callback in list(self._callbacks):
+            update_callback()
@@ -0,0 +1,112 @@
+"""
+In-memory sensor history for the Duux Fan Local integration.
+Keeps recent samples of each numeric sensor in a fixed-size ring, so
+dashboards can read them without querying the recorder.
+"""
+
+from __future__ import annotations
+
+from array import array
+
+
+class SampleRing:
+    """Fixed-size ring of downsampled (timestamp, value) samples.
+
+    Samples falling in the same `resolution`-second bucket are averaged
+    into one slot. Each slot takes 8 bytes, a uint32 Unix timestamp and a
+    float32 value, so a ring holds `hours * 3600 / resolution` slots in
+    `8 * slots` bytes, allocated up front: 24 hours at 60 seconds is 1440
+    slots, 11.25 KiB per sensor.
+    """
+
+    __slots__ = (
+        "resolution",
+        "capacity",
+        "_times",
+        "_values",
+        "_start",
+        "_count",
+        "_bucket_samples",
+    )
+
+    def __init__(self, hours: float, resolution: int) -> None:
+        """Allocate a ring covering `hours` at `resolution` seconds."""
+        self.resolution = max(1, int(resolution))
+        self.capacity = max(1, int(hours * 3600 // self.resolution))
+        self._times = array("I", bytes(4 * self.capacity))
+        self._values = array("f", bytes(4 * self.capacity))
+        # Physical index of the oldest slot, and the number of slots in use
+        self._start = 0
+        self._count = 0
+        # Samples averaged into the newest slot
+        self._bucket_samples = 0
+
+    def __len__(self) -> int:
+        """Return the number of slots in use."""
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the samples."""
+        return (self._times.itemsize + self._values.itemsize) * self.capacity
+
+    def _index(self, position: int) -> int:
+        """Return the physical index of the slot at a logical position."""
+        return (self._start + position) % self.capacity
+
+    def add(self, timestamp: float, value: float) -> None:
+        """Add a sample, averaging it into its bucket's slot."""
+        bucket_time = int(timestamp) // self.resolution * self.resolution
+        if self._count:
+            newest = self._index(self._count - 1)
+            if self._times[newest] == bucket_time:
+                self._bucket_samples += 1
+                self._values[newest] += (
+                    value - self._values[newest]
+                ) / self._bucket_samples
+                return
+            if self._times[newest] > bucket_time:
+                # Clock went backwards, keep the ring ordered by time
+                return
+
+        if self._count < self.capacity:
+            slot = self._index(self._count)
+            self._count += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._times[slot] = bucket_time
+        self._values[slot] = value
+        self._bucket_samples = 1
+
+    def _bisect(self, timestamp: float, after: bool = False) -> int:
+        """Return the logical position of the first slot at, or after, a time."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            slot_time = self._times[self._index(middle)]
+            if slot_time < timestamp or (after and slot_time == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(
+        self, start: float | None = None, end: float | None = None
+    ) -> tuple[list[int], list[float]]:
+        """Return the timestamps and values of the slots in [start, end].
+
+        Finds the bounds by binary search and copies at most two contiguous
+        slices of each array.
+        """
+        first = 0 if start is None else self._bisect(start)
+        last = self._count if end is None else self._bisect(end, after=True)
+        if first >= last:
+            return [], []
+        begin, stop = self._index(first), self._index(last - 1) + 1
+        if begin < stop:
+            return self._times[begin:stop].tolist(), self._values[begin:stop].tolist()
+        return (
+            self._times[begin:].tolist() + self._times[:stop].tolist(),
+            self._values[begin:].tolist() + self._values[:stop].tolist(),
+        )
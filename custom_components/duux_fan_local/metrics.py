@@ -0,0 +1,180 @@
+"""
+Runtime counters for the Duux Fan Local integration.
+Kept per device by the MQTT client to show how the message path behaves under load.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterable
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum.
+
+    Observing is a bisect and two additions, with no lock: each device is
+    only updated from one thread at a time.
+    """
+
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize an empty histogram."""
+        self.bounds = bounds
+        # One count per bound, and one for values above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    @property
+    def count(self) -> int:
+        """Return the number of observed values."""
+        return sum(self.counts)
+
+    def observe(self, value: float) -> None:
+        """Count a value in the first bucket whose bound it does not exceed."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counts by bucket bound, the sum and the count."""
+        return {
+            "buckets": dict(zip((*self.bounds, "+Inf"), self.counts, strict=True)),
+            "sum": self.total,
+            "count": self.count,
+        }
+
+
+@dataclass(slots=True)
+class DeviceMetrics:
+    """Counters for a single Duux device."""
+
+    # State messages handed to the device by the broker connection
+    messages_received: int = 0
+    # Payloads identical to the previous one, dropped before decoding
+    payloads_deduplicated: int = 0
+    # Payloads decoded, those without a device state, and those failing to parse
+    messages_decoded: int = 0
+    messages_dropped: int = 0
+    parse_errors: int = 0
+    # Messages merged into an already pending state instead of queued
+    messages_coalesced: int = 0
+    # Pending states applied to the entities
+    mailbox_drains: int = 0
+    # Commands handed to the broker connection
+    commands_published: int = 0
+    # Commands replaced by a newer command for the same setting before sending
+    commands_coalesced: int = 0
+    # Flushes cut short by the rate limiter
+    commands_rate_limited: int = 0
+    # Commands currently waiting in the outbound queue
+    command_queue_depth: int = 0
+    # Seconds commands spent queued before being sent, summed and worst case
+    command_wait_total: float = 0.0
+    command_wait_max: float = 0.0
+    # Confirmed mode: commands echoed back by the device, resent, or given up on
+    commands_confirmed: int = 0
+    commands_retried: int = 0
+    commands_unconfirmed: int = 0
+    # Confirmed mode: flushes held back by a full in-flight window
+    commands_window_full: int = 0
+    # Confirmed mode: seconds from first send to the state echo
+    confirm_latency_total: float = 0.0
+    confirm_latency_max: float = 0.0
+    # Offline journal: commands held while unreachable, expired, or dropped
+    # because the journal was full
+    commands_journaled: int = 0
+    commands_expired: int = 0
+    commands_dropped: int = 0
+    # Optimistic mode: expected values the device reported, or rolled back
+    optimistic_confirmed: int = 0
+    optimistic_rolled_back: int = 0
+    # Seconds from a message reaching the device to its entities being written
+    receive_latency: Histogram = field(default_factory=Histogram)
+    # Seconds from publishing a command to the device reporting its value,
+    # and commands whose value was not reported within the confirm timeout
+    echo_latency: Histogram = field(default_factory=Histogram)
+    commands_lost: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return every counter, and every histogram as a dict."""
+        result = {}
+        for item in fields(self):
+            value = getattr(self, item.name)
+            result[item.name] = (
+                value.as_dict() if isinstance(value, Histogram) else value
+            )
+        return result
+
+
+# Exported counters: field, which is also the metric name, and help text
+_COUNTERS = (
+    ("messages_received", "State messages received."),
+    ("payloads_deduplicated", "Repeated payloads skipped."),
+    ("messages_decoded", "Payloads decoded."),
+    ("messages_dropped", "Decoded payloads without a state."),
+    ("parse_errors", "Payloads that could not be parsed."),
+    ("messages_coalesced", "Messages merged into a pending one."),
+    ("commands_published", "Commands published."),
+    ("commands_confirmed", "Commands confirmed by the device."),
+    ("commands_retried", "Commands resent unconfirmed."),
+    ("commands_unconfirmed", "Commands given up on."),
+    ("commands_lost", "Commands whose value the device never reported."),
+    ("commands_expired", "Journaled commands expired."),
+)
+_HISTOGRAMS = (
+    ("receive_latency", "receive_latency_seconds", "Message to entity write time."),
+    ("echo_latency", "command_echo_latency_seconds", "Command to state echo time."),
+)
+_PREFIX = "duux_fan_local_"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_metrics(devices: Iterable[tuple[str, DeviceMetrics]]) -> str:
+    """Return the metrics of every device in the Prometheus text format."""
+    devices = [(_label(device_id), metrics) for device_id, metrics in devices]
+    lines = []
+    for attr, help_text in _COUNTERS:
+        name = f"{_PREFIX}{attr}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for device_id, metrics in devices:
+            lines.append(f'{name}{{device="{device_id}"}} {getattr(metrics, attr)}')
+    for attr, name, help_text in _HISTOGRAMS:
+        name = f"{_PREFIX}{name}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for device_id, metrics in devices:
+            histogram: Histogram = getattr(metrics, attr)
+            cumulative = 0
+            for bound, count in zip(
+                (*histogram.bounds, "+Inf"), histogram.counts, strict=True
+            ):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{device="{device_id}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{name}_sum{{device="{device_id}"}} {histogram.total}')
+            lines.append(f'{name}_count{{device="{device_id}"}} {cumulative}')
+    return "\n".join(lines) + "\n"
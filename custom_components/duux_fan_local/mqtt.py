@@ -3,106 +3,654 @@ MQTT client manager for the Duux Fan Local integration.
 Handles the connection to the custom broker and parses incoming state payloads.
 """
 
-import json
 import logging
 import ssl
 import asyncio
+import hashlib
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
 
 import paho.mqtt.client as mqtt
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import instance_id
 
 from .const import (
+    CONF_AVAILABILITY_TIMEOUT,
+    CONF_COALESCE_WINDOW,
+    CONF_COMMAND_BURST,
+    CONF_COMMAND_RATE,
+    CONF_COMMAND_WINDOW,
+    CONF_CONFIRM_COMMANDS,
     CONF_DEVICE_ID,
+    CONF_MODEL,
     CONF_MQTT_HOST,
     CONF_MQTT_PORT,
+    CONF_OPTIMISTIC,
+    CONF_PERSISTENT_SESSION,
+    CONF_TRANSPORT,
+    DATA_CONNECTIONS,
+    DATA_CONNECT_LIMITER,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_COMMAND_BURST,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_WINDOW,
+    DEFAULT_CONFIRM_COMMANDS,
+    DEFAULT_OPTIMISTIC,
+    DEFAULT_PERSISTENT_SESSION,
+    DEFAULT_TRANSPORT,
     MQTT_HOST,
     MQTT_PORT,
     TOPIC_COMMAND,
     TOPIC_STATE,
+    TOPIC_STATE_WILDCARD,
+    TRANSPORT_ASYNCIO,
 )
+from .commands import DuuxCommandQueue, command_key, command_value
+from .decoder import DECODE_ERRORS, extract_rssi, extract_state, loads
+from .metrics import DeviceMetrics
+from .optimistic import OptimisticState
+from .profiles import compile_profile, default_availability_timeout
+from .ratelimit import TokenBucket, backoff_delay
+from .store import DuuxStateStore
+from .watchdog import async_get_watchdog
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds between paho housekeeping calls (keepalive pings, timeouts)
+MISC_LOOP_INTERVAL = 1
+# Reconnect backoff, in seconds: the first delay and the cap, before jitter
+RECONNECT_DELAY = 2
+RECONNECT_MAX_DELAY = 300
+# Seconds a replayed session backlog is merged for before entities see it
+BACKLOG_WINDOW = 1
+# Seconds entry setup waits for the first connection attempt to finish
+CONNECT_GRACE_PERIOD = 2
+# Connection attempts per second across all brokers, and how many at once
+CONNECT_RATE = 0.5
+CONNECT_BURST = 5
+# Seconds a transaction waits for the device to report the values it set
+TRANSACTION_TIMEOUT = 10
+# Recent raw payloads, commands and connection events kept for diagnostics
+DIAGNOSTIC_PAYLOADS = 32
+DIAGNOSTIC_COMMANDS = 32
+DIAGNOSTIC_CONNECTION_EVENTS = 16
 
-class DuuxMqttClient:
-    """Manages a single MQTT connection for a Duux device."""
+_MISSING = object()
 
-    def __init__(self, hass: HomeAssistant, config: dict):
-        """Initialize the client."""
+
+def connection_key(config: dict) -> tuple[str, int, str | None, bool]:
+    """Return the key identifying the broker connection a device config uses."""
+    return (
+        config.get(CONF_MQTT_HOST, MQTT_HOST),
+        config.get(CONF_MQTT_PORT, MQTT_PORT),
+        config.get(CONF_USERNAME),
+        config.get(CONF_PERSISTENT_SESSION, DEFAULT_PERSISTENT_SESSION),
+    )
+
+
+def session_client_id(key: tuple, instance: str) -> str:
+    """Return the stable client ID of a persistent session.
+
+    It depends only on the Home Assistant instance and the connection key,
+    so the broker resumes the same session after a restart. At 21 characters
+    it stays within the 23 every MQTT 3.1.1 broker must accept.
+    """
+    host, port, username, _ = key
+    digest = hashlib.sha256(f"{instance}:{host}:{port}:{username}".encode())
+    return f"duux-{digest.hexdigest()[:16]}"
+
+
+class DuuxBrokerConnection:
+    """A single MQTT connection shared by every Duux device on the same broker."""
+
+    def __init__(self, hass: HomeAssistant, config: dict, client_id: str | None = None):
+        """Initialize the connection.
+
+        With a client ID, the broker keeps the session, including the
+        subscription and the messages queued for it, while disconnected.
+        """
         self.hass = hass
-        self.device_id = config[
-            CONF_DEVICE_ID
-        ].lower()  # Ensure MAC address is lowercase
-        self.command_topic = TOPIC_COMMAND.format(device_id=self.device_id)
-        self.state_topic = TOPIC_STATE.format(device_id=self.device_id)
-        self._username = config.get(CONF_USERNAME)
+        self.key = connection_key(config)
+        self._mqtt_host, self._mqtt_port, self._username, _ = self.key
         self._password = config.get(CONF_PASSWORD)
-        self._mqtt_host = config.get(CONF_MQTT_HOST, MQTT_HOST)
-        self._mqtt_port = config.get(CONF_MQTT_PORT, MQTT_PORT)
-        self._callbacks = []
-        self._client = mqtt.Client()
+        self._refcount = 0
+        self._supervisor_task: asyncio.Task | None = None
+        # Set once an attempt is over, with the error of the latest attempt
+        self._attempted = asyncio.Event()
+        self._last_error: OSError | None = None
+        self._tls_configured = False
+        self._closing = False
+        self._loop_thread_id = threading.get_ident()
+        # State topic -> device client, so routing a message is a dict lookup
+        self._devices: dict[str, "DuuxMqttClient"] = {}
+        # (loop time, event, detail), appended from whichever thread runs paho
+        self.events: deque[tuple[float, str, Any]] = deque(
+            maxlen=DIAGNOSTIC_CONNECTION_EVENTS
+        )
+        self._client = mqtt.Client(
+            client_id=client_id or "", clean_session=client_id is None
+        )
         self._client.on_connect = self.on_connect
+        self._client.on_disconnect = self.on_disconnect
         self._client.on_message = self.on_message
 
+        # In asyncio mode the socket is driven by the event loop through
+        # paho's external-loop hooks instead of a loop_start() thread.
+        self.runs_in_event_loop = (
+            config.get(CONF_TRANSPORT, DEFAULT_TRANSPORT) == TRANSPORT_ASYNCIO
+        )
+        if self.runs_in_event_loop:
+            self._client.on_socket_open = self._on_socket_open
+            self._client.on_socket_close = self._on_socket_close
+            self._client.on_socket_register_write = self._on_socket_register_write
+            self._client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def acquire(self) -> None:
+        """Take a reference on the connection."""
+        self._refcount += 1
+
+    def release(self) -> int:
+        """Drop a reference on the connection and return the remaining count."""
+        self._refcount -= 1
+        return self._refcount
+
+    def attach(self, device: "DuuxMqttClient") -> None:
+        """Route messages for a device's state topic to its client."""
+        self._devices[device.state_topic] = device
+
+    def detach(self, device: "DuuxMqttClient") -> None:
+        """Stop routing messages to a device's client."""
+        if self._devices.get(device.state_topic) is device:
+            del self._devices[device.state_topic]
+
     async def async_connect(self):
-        """Asynchronously configure TLS and connect to the MQTT broker."""
-        loop = asyncio.get_running_loop()
+        """Start the connection supervisor and wait briefly for an attempt.
+
+        Raises the OSError of the latest attempt if it failed, waiting up to
+        the grace period for the first one. A handshake still running by then
+        carries on in the background, so a slow broker does not hold up setup.
+        """
+        if self._supervisor_task is None:
+            self._supervisor_task = self.hass.async_create_background_task(
+                self._async_supervise(), f"duux_fan_local mqtt {self._mqtt_host}"
+            )
+        try:
+            async with asyncio.timeout(CONNECT_GRACE_PERIOD):
+                await self._attempted.wait()
+        except TimeoutError:
+            return
+        if self._last_error is not None:
+            raise self._last_error
 
-        def configure_tls_and_connect():
+    def _connect(self):
+        """Configure TLS on the first call, then connect to the MQTT broker."""
+        if not self._tls_configured:
             if self._username:
                 self._client.username_pw_set(self._username, self._password)
             self._client.tls_set(cert_reqs=ssl.CERT_NONE)
-            self._client.connect(self._mqtt_host, self._mqtt_port, 60)
+            self._tls_configured = True
+        self._client.connect(self._mqtt_host, self._mqtt_port, 60)
+        if self._closing:
+            # Released while the handshake ran, nobody owns this socket
+            self._client.disconnect()
 
-        try:
-            await loop.run_in_executor(None, configure_tls_and_connect)
-            self._client.loop_start()
-        except (OSError, ConnectionRefusedError) as err:
-            _LOGGER.error("Failed to connect to Duux MQTT broker: %s", err)
+    async def _async_supervise(self):
+        """Keep the connection up, retrying with jittered exponential backoff.
 
-    def disconnect(self):
+        Every attempt, across all brokers, also takes a slot from a shared
+        limiter, so entries do not all reconnect at once after a restart.
+        """
+        loop = self.hass.loop
+        attempt = 0
+        while not self._closing:
+            if attempt:
+                await asyncio.sleep(
+                    backoff_delay(attempt, RECONNECT_DELAY, RECONNECT_MAX_DELAY)
+                )
+                if self._closing:
+                    return
+            await _async_wait_for_connect_slot(self.hass)
+            attempt += 1
+            try:
+                # The TCP/TLS handshake blocks, so it always runs in the executor
+                await loop.run_in_executor(None, self._connect)
+            except OSError as err:
+                self.events.append((loop.time(), "connect_failed", str(err)))
+                self._last_error = err
+                self._attempted.set()
+                _LOGGER.warning(
+                    "Failed to connect to Duux MQTT broker %s:%s (attempt %d): %s",
+                    self._mqtt_host,
+                    self._mqtt_port,
+                    attempt,
+                    err,
+                )
+                continue
+
+            self._last_error = None
+            self._attempted.set()
+            if self._closing:
+                return
+            if not self.runs_in_event_loop:
+                # paho's network thread reconnects on its own from here
+                self._client.reconnect_delay_set(RECONNECT_DELAY, RECONNECT_MAX_DELAY)
+                self._client.loop_start()
+                return
+
+            await self._async_misc_loop()
+            if not self._closing:
+                _LOGGER.warning("Lost connection to Duux MQTT broker, reconnecting")
+            attempt = 1
+
+    async def _async_misc_loop(self):
+        """Run paho housekeeping on the event loop until the connection drops."""
+        while not self._closing and self._client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(MISC_LOOP_INTERVAL)
+
+    async def async_disconnect(self):
         """Disconnect from the MQTT broker."""
+        self._closing = True
+        if self._supervisor_task is not None:
+            self._supervisor_task.cancel()
+        if not self.runs_in_event_loop:
+            # The disconnect call is blocking, so it must be run in an executor
+            await self.hass.async_add_executor_job(self.disconnect)
+            return
+
+        # Sends DISCONNECT on the non-blocking socket and closes it, which
+        # unregisters the socket from the event loop.
+        self._client.disconnect()
+
+    def disconnect(self):
+        """Disconnect from the MQTT broker and stop the network thread."""
         self._client.loop_stop()
         self._client.disconnect()
 
-    def publish(self, payload: str):
-        """Publish a message to the command topic."""
-        self._client.publish(self.command_topic, payload, qos=0, retain=False)
-        _LOGGER.debug("Published to %s: %s", self.command_topic, payload)
+    def _call_in_loop(self, func, *args):
+        """Run a socket hook on the event loop, whichever thread paho is in."""
+        if threading.get_ident() == self._loop_thread_id:
+            func(*args)
+        else:
+            self.hass.loop.call_soon_threadsafe(func, *args)
+
+    def _on_socket_open(self, client, userdata, sock):
+        """Start reading from the socket on the event loop."""
+        self._call_in_loop(self.hass.loop.add_reader, sock, self._read, client, sock)
+
+    @staticmethod
+    def _read(client, sock):
+        """Read every packet the socket holds, like paho's own loop does.
+
+        loop_read() handles one packet per call. Packets a TLS record brought
+        in beyond that sit decrypted in the SSL buffer, and the socket does
+        not turn readable again for them, so they are read right away.
+        """
+        rc = client.loop_read()
+        pending = getattr(sock, "pending", None)
+        while rc == mqtt.MQTT_ERR_SUCCESS and pending is not None and pending():
+            rc = client.loop_read()
+
+    def _on_socket_close(self, client, userdata, sock):
+        """Stop watching the socket."""
+        self._call_in_loop(self.hass.loop.remove_reader, sock)
+        self._call_in_loop(self.hass.loop.remove_writer, sock)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        """Flush pending outgoing data once the socket is writable."""
+        self._call_in_loop(self.hass.loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        """Stop waiting for the socket to become writable."""
+        self._call_in_loop(self.hass.loop.remove_writer, sock)
+
+    def publish(self, topic: str, payload: str):
+        """Publish a message on the shared connection."""
+        self._client.publish(topic, payload, qos=0, retain=False)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Published to %s: %s", topic, payload)
 
     def on_connect(self, client, userdata, flags, rc):
         """Handle connection to the broker."""
+        self.events.append(
+            (self.hass.loop.time(), "connected" if rc == 0 else "refused", rc)
+        )
         if rc == 0:
-            _LOGGER.info("Connected to Duux MQTT broker for device %s", self.device_id)
-            self._client.subscribe(self.state_topic, qos=1)
-            _LOGGER.info("Subscribed to state topic: %s", self.state_topic)
+            _LOGGER.info(
+                "Connected to Duux MQTT broker %s:%s", self._mqtt_host, self._mqtt_port
+            )
+            self._client.subscribe(TOPIC_STATE_WILDCARD, qos=1)
+            _LOGGER.info("Subscribed to state topic: %s", TOPIC_STATE_WILDCARD)
+            if flags.get("session present"):
+                # The broker replays what it queued while we were away
+                backlog_until = self.hass.loop.time() + BACKLOG_WINDOW
+                for device in list(self._devices.values()):
+                    device.begin_backlog(backlog_until)
         else:
             _LOGGER.error("Failed to connect to Duux MQTT, return code %d", rc)
 
+    def on_disconnect(self, client, userdata, rc):
+        """Have every device journal its commands until the link is back."""
+        self.events.append((self.hass.loop.time(), "disconnected", rc))
+        self._call_in_loop(self._async_link_lost)
+
+    @callback
+    def _async_link_lost(self):
+        for device in list(self._devices.values()):
+            device.async_link_lost()
+
     def on_message(self, client, userdata, msg):
-        """Handle incoming MQTT messages from the paho-mqtt thread."""
+        """Route an incoming message to the device owning its topic."""
+        device = self._devices.get(msg.topic)
+        if device is not None:
+            device.on_message(client, userdata, msg)
+
+
+async def _async_wait_for_connect_slot(hass: HomeAssistant) -> None:
+    """Wait until the shared limiter allows another connection attempt."""
+    limiter = hass.data.get(DATA_CONNECT_LIMITER)
+    if limiter is None:
+        limiter = hass.data[DATA_CONNECT_LIMITER] = TokenBucket(
+            CONNECT_RATE, CONNECT_BURST, hass.loop.time()
+        )
+    while wait := limiter.try_acquire(hass.loop.time()):
+        await asyncio.sleep(wait)
+
+
+async def async_get_connection(
+    hass: HomeAssistant, config: dict
+) -> DuuxBrokerConnection:
+    """Return the shared connection for a device config, connecting if needed."""
+    key = connection_key(config)
+    client_id = None
+    if key[3]:
+        client_id = session_client_id(key, await instance_id.async_get(hass))
+    connections = hass.data.setdefault(DATA_CONNECTIONS, {})
+    connection = connections.get(key)
+    if connection is None:
+        connection = connections[key] = DuuxBrokerConnection(hass, config, client_id)
+    connection.acquire()
+    try:
+        await connection.async_connect()
+    except OSError:
+        await async_release_connection(hass, connection)
+        raise
+    return connection
+
+
+async def async_release_connection(
+    hass: HomeAssistant, connection: DuuxBrokerConnection
+) -> None:
+    """Release a shared connection, disconnecting once nobody uses it."""
+    if connection.release() > 0:
+        return
+    connections = hass.data.get(DATA_CONNECTIONS, {})
+    if connections.get(connection.key) is connection:
+        del connections[connection.key]
+    await connection.async_disconnect()
+
+
+class DuuxMqttClient:
+    """Per-device view on a shared broker connection."""
+
+    def __init__(self, hass: HomeAssistant, config: dict):
+        """Initialize the client."""
+        self.hass = hass
+        self.device_id = config[
+            CONF_DEVICE_ID
+        ].lower()  # Ensure MAC address is lowercase
+        self.command_topic = TOPIC_COMMAND.format(device_id=self.device_id)
+        self.state_topic = TOPIC_STATE.format(device_id=self.device_id)
+        self._config = config
+        self._connection: DuuxBrokerConnection | None = None
+        self._callbacks = []
+        # State key -> callbacks interested in it, and the last value per key
+        self._key_callbacks: dict[str, list] = {}
+        self._state: dict[str, Any] = {}
+        # State key -> callbacks sampling every report of it, changed or not
+        self._sample_callbacks: dict[str, list] = {}
+        # Latest decoded report, replayed to the samplers for a duplicate
+        self._last_report: dict[str, Any] | None = None
+        # Latest-state-wins mailbox: bursts merge here until the next drain
+        self._pending: dict[str, Any] | None = None
+        # Loop time the first message merged into the pending state arrived
+        self._pending_since = 0.0
+        # Loop time until which a replayed session backlog merges in one drain
+        self._backlog_until = 0.0
+        self._pending_lock = threading.Lock()
+        self._coalesce_window = config.get(
+            CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW
+        )
+        self.metrics = DeviceMetrics()
+        self._last_payload_hash: int | None = None
+        model = config.get(CONF_MODEL, "whisper_flex_2")
+        plan = compile_profile(model)
+        self._command_state_keys = plan.command_state_keys if plan else {}
+        self._commands = DuuxCommandQueue(
+            hass,
+            self.publish,
+            config.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW),
+            self.metrics,
+            rate=config.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE),
+            burst=config.get(CONF_COMMAND_BURST, DEFAULT_COMMAND_BURST),
+            confirm=config.get(CONF_CONFIRM_COMMANDS, DEFAULT_CONFIRM_COMMANDS),
+            command_state_keys=self._command_state_keys,
+        )
+        self._optimistic = (
+            OptimisticState(hass, self._async_rollback, self.metrics)
+            if config.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)
+            else None
+        )
+        # Transactions waiting for state keys to take their values
+        self._transactions: list[tuple[dict[str, Any], asyncio.Future]] = []
+        # Restored state is stale until the device reports live data
+        self._stale = False
+        # Loop time of the last message, and whether it came recently enough
+        self.last_seen = hass.loop.time()
+        # Signal strength in dBm, from the payloads of models that send it
+        self.rssi: int | None = None
+        # (loop time, raw payload) of the latest messages and commands
+        self.recent_payloads: deque[tuple[float, Any]] = deque(
+            maxlen=DIAGNOSTIC_PAYLOADS
+        )
+        self.recent_commands: deque[tuple[float, str]] = deque(
+            maxlen=DIAGNOSTIC_COMMANDS
+        )
+        self.available = True
+        self.availability_timeout = config.get(
+            CONF_AVAILABILITY_TIMEOUT, default_availability_timeout(model)
+        )
+        self._availability_callbacks: list[Callable[[], None]] = []
+        self._store: DuuxStateStore | None = None
+
+    @property
+    def stale(self) -> bool:
+        """Return True while the state is restored and not yet reported live."""
+        return self._stale
+
+    @callback
+    def async_restore_state(self, store: DuuxStateStore):
+        """Start from the last stored state and keep the store up to date."""
+        self._store = store
+        if restored := store.get(self.device_id):
+            self._state = dict(restored)
+            self._stale = True
+
+    async def async_connect(self):
+        """Attach this device to the shared connection for its broker.
+
+        Raises OSError if the broker could not be reached right away.
+        """
+        self._connection = await async_get_connection(self.hass, self._config)
+        self._connection.attach(self)
+        if self.availability_timeout:
+            async_get_watchdog(self.hass).async_watch(self)
+
+    @property
+    def connection_events(self) -> list[tuple[float, str, Any]]:
+        """Return the recent events of the broker connection."""
+        if self._connection is None:
+            return []
+        return list(self._connection.events)
+
+    async def async_disconnect(self):
+        """Detach this device and release the shared connection."""
+        if self._connection is None:
+            return
+        self._commands.async_cancel()
+        async_get_watchdog(self.hass).async_unwatch(self)
+        if self._optimistic is not None:
+            self._optimistic.async_cancel()
+        connection, self._connection = self._connection, None
+        connection.detach(self)
+        await async_release_connection(self.hass, connection)
+
+    def publish(self, payload: str):
+        """Publish a message to the command topic."""
+        if self._connection is None:
+            _LOGGER.warning(
+                "Dropping command for %s, not connected: %s", self.device_id, payload
+            )
+            return
+        self.recent_commands.append((self.hass.loop.time(), payload))
+        self._connection.publish(self.command_topic, payload)
+
+    async def async_publish(self, payload: str, ttl: float | None = None):
+        """Queue a command for the device from the event loop.
+
+        paho's publish() only queues the packet, so the queue sends from the
+        loop without an executor job whichever transport is in use.
+        While the device is unreachable, the command is journaled for up to
+        `ttl` seconds. In optimistic mode, entities show the value it sets
+        right away.
+        """
+        self._commands.async_enqueue(payload, ttl)
+        if self._optimistic is not None:
+            self._async_expect(self._expected_state((payload,)))
+
+    async def async_send_batch(self, payloads: Sequence[str], spacing: float = 0):
+        """Send commands in order as one batch, without waiting for them.
+
+        The batch is journaled like single commands while the device is
+        unreachable. In optimistic mode, entities show its values right away.
+        """
+        self._commands.async_send_batch(payloads, spacing)
+        if self._optimistic is not None:
+            self._async_expect(self._expected_state(payloads))
+
+    async def async_transaction(
+        self,
+        payloads: Sequence[str],
+        spacing: float = 0,
+        timeout: float = TRANSACTION_TIMEOUT,
+    ) -> bool:
+        """Send commands in order as one batch and wait until they are applied.
+
+        Returns True once state reports carry every value the commands set,
+        or False if the device does not report them within the timeout. While
+        the device is unreachable, the batch is journaled and False is
+        returned right away.
+        """
+        await self.async_send_batch(payloads, spacing)
+        expected = self._expected_state(payloads)
+        if not expected:
+            return True
+        if self._commands.paused or not self.available:
+            # Nothing can confirm the batch before the device is back
+            return False
+
+        waiter = (expected, self.hass.loop.create_future())
+        self._transactions.append(waiter)
+        try:
+            async with asyncio.timeout(timeout):
+                return await waiter[1]
+        except TimeoutError:
+            _LOGGER.warning(
+                "Device %s did not apply %s within %s seconds",
+                self.device_id,
+                payloads,
+                timeout,
+            )
+            return False
+        finally:
+            self._transactions.remove(waiter)
+
+    def _expected_state(self, payloads: Iterable[str]) -> dict[str, Any]:
+        """Return the state values a series of commands sets."""
+        expected = {}
+        for payload in payloads:
+            state_key = self._command_state_keys.get(command_key(payload))
+            if state_key and (value := command_value(payload)) is not None:
+                expected[state_key] = value
+        return expected
+
+    @callback
+    def _async_expect(self, expected: dict[str, Any]):
+        """Show values ahead of the device reporting them."""
+        for state_key, value in expected.items():
+            self._optimistic.async_expect(
+                state_key, value, self._state.get(state_key, _MISSING)
+            )
+        self._async_notify(expected)
+
+    @callback
+    def _async_confirm_transactions(self, fan_data: dict[str, Any]):
+        """Resolve the transactions whose values are all reported."""
+        for expected, future in self._transactions:
+            for key in [key for key in expected if key in fan_data]:
+                if fan_data[key] == expected[key]:
+                    del expected[key]
+            if not expected and not future.done():
+                future.set_result(True)
+
+    def on_message(self, client, userdata, msg):
+        """Handle incoming MQTT messages from the paho-mqtt thread or event loop."""
+        metrics = self.metrics
+        metrics.messages_received += 1
+        self.last_seen = received = self.hass.loop.time()
+        payload = msg.payload
+        # Kept raw, only formatted if diagnostics are downloaded
+        self.recent_payloads.append((received, payload))
+        # Devices repeat identical heartbeats, skip decoding those entirely
+        payload_hash = hash(payload)
+        # ...unless a command or optimistic value waits for its echo, or the
+        # journal waits for a report to resume after the link came back
+        if (
+            payload_hash == self._last_payload_hash
+            and not self._commands.paused
+            and not self._commands.awaiting_confirmation
+            and not self._optimistic
+            and not self._transactions
+            and self.available
+        ):
+            metrics.payloads_deduplicated += 1
+            if self._sample_callbacks:
+                # Still a reading for the sensors sampling every report
+                self._post_to_mailbox(self._last_report, received)
+            return
+
         try:
-            data = json.loads(msg.payload)
-            _LOGGER.debug("Received message on %s: %s", msg.topic, data)
-            fan_data = data.get("sub", {}).get("Tune", [{}])[0]
-
-            # Some models like Bright 2 nest the payload again under "sub"
-            if (
-                isinstance(fan_data, dict)
-                and "sub" in fan_data
-                and "Tune" in fan_data["sub"]
-            ):
-                fan_data = fan_data["sub"]["Tune"][0]
-
-            if isinstance(fan_data, dict) and fan_data:
-                for update_callback in self._callbacks:
-                    self.hass.add_job(update_callback, fan_data)
+            data = loads(payload)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Received message on %s: %s", msg.topic, data)
+            fan_data = extract_state(data)
+            metrics.messages_decoded += 1
+            if (rssi := extract_rssi(data)) is not None:
+                self.rssi = rssi
+
+            if fan_data is not None:
+                self._last_payload_hash = payload_hash
+                self._last_report = fan_data
+                self._post_to_mailbox(fan_data, received)
             else:
+                metrics.messages_dropped += 1
                 _LOGGER.debug(
                     "Parsed fan_data is empty or not a dict. Skipping update."
                 )
-        except (json.JSONDecodeError, KeyError, IndexError) as e:
+        except DECODE_ERRORS as e:
+            metrics.parse_errors += 1
             _LOGGER.warning(
                 "Could not parse payload on %s: %s (Error: %s)",
                 msg.topic,
@@ -110,11 +658,198 @@ class DuuxMqttClient:
                 e,
             )
 
-    def register_callback(self, update_callback):
-        """Register a callback to be called on new messages."""
-        self._callbacks.append(update_callback)
+    def _post_to_mailbox(self, fan_data: dict[str, Any], received: float):
+        """Merge a payload into the pending state and schedule a single drain.
+
+        Whatever the event loop lag, a device holds at most one pending state
+        and one scheduled drain, newer values overwriting older ones per key.
+        """
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending.update(fan_data)
+                self.metrics.messages_coalesced += 1
+                return
+            self._pending = dict(fan_data)
+            self._pending_since = received
+
+        # Drain on the next loop iteration, or once the window has elapsed
+        loop = self.hass.loop
+        delay = max(self._coalesce_window, self._backlog_until - loop.time())
+        if self._connection is not None and self._connection.runs_in_event_loop:
+            if delay > 0:
+                loop.call_later(delay, self._async_drain_mailbox)
+            else:
+                loop.call_soon(self._async_drain_mailbox)
+        # One wake-up of the event loop per burst, not per entity
+        elif delay > 0:
+            loop.call_soon_threadsafe(loop.call_later, delay, self._async_drain_mailbox)
+        else:
+            loop.call_soon_threadsafe(self._async_drain_mailbox)
+
+    def begin_backlog(self, until: float):
+        """Merge the messages replayed by the broker until a loop time.
+
+        Called from whichever thread runs paho, before the backlog arrives,
+        so entities only see the final state of the device.
+        """
+        self._backlog_until = until
+
+    @callback
+    def _async_drain_mailbox(self):
+        """Apply the pending state to the entities."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, None
+            received = self._pending_since
+        if pending:
+            self.metrics.mailbox_drains += 1
+            self._async_dispatch_changes(pending)
+            # Entities write their state from the dispatch callbacks
+            self.metrics.receive_latency.observe(self.hass.loop.time() - received)
+
+    @callback
+    def _async_dispatch_changes(self, fan_data: dict[str, Any]):
+        """Merge a payload into the known state and update the affected entities.
+
+        Runs on the event loop and updates every affected entity in one batch.
+        """
+        if not self.available:
+            self.async_set_available(True)
+        # A state report means the device can receive the journaled commands
+        if self._commands.paused:
+            self._commands.async_resume()
+        # Unchanged values still confirm commands the device already applied
+        self._commands.async_process_state(fan_data)
+        if self._optimistic is not None:
+            self._optimistic.async_reconcile(fan_data)
+        if self._transactions:
+            self._async_confirm_transactions(fan_data)
+        if self._sample_callbacks:
+            self._async_sample(fan_data)
+        changed = [
+            key
+            for key, value in fan_data.items()
+            if self._state.get(key, _MISSING) != value
+        ]
+        if self._stale:
+            # Live data confirms the restored state, every entity rewrites it
+            self._stale = False
+            changed = list(self._key_callbacks)
+        elif not changed:
+            return
+        self._state.update(fan_data)
+        if self._store is not None:
+            self._store.async_schedule_save(self.device_id, self._state)
+        self._async_notify(changed)
+
+    @callback
+    def _async_notify(self, keys: Iterable[str]):
+        """Call the callbacks watching any of the keys, once each."""
+        # dict keeps first-seen order and drops entities watching several keys
+        affected = dict.fromkeys(self._callbacks)
+        for key in keys:
+            affected.update(dict.fromkeys(self._key_callbacks.get(key, ())))
+
+        state = self._current_state()
+        for update_callback in affected:
+            update_callback(state)
+
+    @callback
+    def _async_sample(self, fan_data: dict[str, Any]):
+        """Hand a report to the callbacks sampling any of its keys, once each."""
+        sampling = {}
+        for key in fan_data:
+            sampling.update(dict.fromkeys(self._sample_callbacks.get(key, ())))
+        for sample_callback in sampling:
+            sample_callback(fan_data)
+
+    def _current_state(self) -> dict[str, Any]:
+        """Return the state entities show, optimistic values included."""
+        if self._optimistic is not None:
+            return self._optimistic.apply(self._state)
+        return self._state
+
+    @callback
+    def async_set_available(self, available: bool):
+        """Mark the device available or not and update its entities."""
+        self.available = available
+        if available:
+            _LOGGER.info("Device %s is reporting again", self.device_id)
+            if self.availability_timeout:
+                async_get_watchdog(self.hass).async_schedule(self)
+        else:
+            _LOGGER.info(
+                "Device %s has not reported for %s seconds, marking it unavailable",
+                self.device_id,
+                self.availability_timeout,
+            )
+            # Commands go out at QoS 0, a silent device would lose them
+            self.async_link_lost()
+        for availability_callback in list(self._availability_callbacks):
+            availability_callback()
+
+    def register_availability_callback(
+        self, availability_callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Register a callback for availability changes, return its remover."""
+        self._availability_callbacks.append(availability_callback)
+        return lambda: self._availability_callbacks.remove(availability_callback)
+
+    @callback
+    def async_link_lost(self):
+        """Journal commands until the device reports its state again."""
+        if not self._commands.paused:
+            _LOGGER.info("Journaling commands for %s until it is back", self.device_id)
+        self._commands.async_pause()
+
+    @callback
+    def _async_rollback(self, key: str):
+        """Show the reported value again after an optimistic value expired."""
+        self._async_notify((key,))
+
+    def register_callback(
+        self, update_callback, keys: Iterable[str] | None = None
+    ) -> None:
+        """Register a callback to be called when the state changes.
+
+        With keys, the callback only runs when one of those state keys changes.
+        A state already known, such as a restored one, is passed right away.
+        """
+        if keys is None:
+            self._callbacks.append(update_callback)
+        else:
+            keys = tuple(keys)
+            for key in keys:
+                self._key_callbacks.setdefault(key, []).append(update_callback)
+        if self._state and (keys is None or not self._state.keys().isdisjoint(keys)):
+            update_callback(self._current_state())
+
+    def register_sample_callback(
+        self, sample_callback: Callable[[dict[str, Any]], None], keys: Iterable[str]
+    ) -> Callable[[], None]:
+        """Register a callback for every report of the keys, return its remover.
+
+        Unlike update callbacks, it also runs for reports that repeat the
+        known values, so it sees each reading of a steady sensor.
+        """
+        keys = tuple(keys)
+        for key in keys:
+            self._sample_callbacks.setdefault(key, []).append(sample_callback)
+
+        def _remove() -> None:
+            for key in keys:
+                callbacks = self._sample_callbacks[key]
+                callbacks.remove(sample_callback)
+                if not callbacks:
+                    del self._sample_callbacks[key]
+
+        return _remove
 
     def unregister_callback(self, update_callback):
         """Unregister a callback."""
         if update_callback in self._callbacks:
             self._callbacks.remove(update_callback)
+        for key, callbacks in list(self._key_callbacks.items()):
+            if update_callback in callbacks:
+                callbacks.remove(update_callback)
+            if not callbacks:
+                del self._key_callbacks[key]
@@ -10,8 +10,9 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.const import UnitOfTime
 
 from .const import DOMAIN, MANUFACTURER, MODELS
-from .devices import DEVICE_PROFILES
+from .entity import DuuxEntity
 from .mqtt import DuuxMqttClient
+from .profiles import NumberPlan, compile_profile
 
 
 async def async_setup_entry(
@@ -24,20 +25,18 @@ async def async_setup_entry(
     base_name = config_entry.data["name"]
     model = config_entry.data.get("model", "whisper_flex_2")
 
-    profile = DEVICE_PROFILES.get(model)
-    if not profile or "numbers" not in profile:
+    plan = compile_profile(model)
+    if not plan or not plan.numbers:
         return
 
     entities = []
-    for number_id, details in profile["numbers"].items():
-        entities.append(
-            DuuxNumber(client, device_id, base_name, model, number_id, details)
-        )
+    for number_plan in plan.numbers:
+        entities.append(DuuxNumber(client, device_id, base_name, model, number_plan))
 
     async_add_entities(entities)
 
 
-class DuuxNumber(NumberEntity):
+class DuuxNumber(DuuxEntity, NumberEntity):
     _attr_should_poll = False
     _attr_mode = NumberMode.SLIDER
 
@@ -47,31 +46,31 @@ class DuuxNumber(NumberEntity):
         device_id: str,
         base_name: str,
         model: str,
-        number_id: str,
-        details: dict,
+        plan: NumberPlan,
     ):
         self._client = client
         self._device_id = device_id
         self._name = base_name
         self._model = model
-        self._number_id = number_id
-        self._details = details
+        self._number_id = plan.key
+        self._plan = plan
+        self._state_key = plan.state_key
 
-        self._attr_name = f"{base_name} {details['name']}"
-        self._attr_unique_id = f"{DOMAIN}_{device_id}_{number_id}"
+        self._attr_name = f"{base_name} {plan.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{plan.key}"
         self.entity_id = f"number.{self._attr_name.lower().replace(' ', '_')}"
 
-        self._attr_native_min_value = float(details.get("min", 1.0))
-        self._attr_native_max_value = float(details.get("max", 100.0))
-        self._attr_native_step = float(details.get("step", 1.0))
+        self._attr_native_min_value = plan.min
+        self._attr_native_max_value = plan.max
+        self._attr_native_step = plan.step
 
-        if details.get("unit"):
-            if details["unit"] == "h":
+        if plan.unit:
+            if plan.unit == "h":
                 self._attr_native_unit_of_measurement = UnitOfTime.HOURS
             else:
-                self._attr_native_unit_of_measurement = details["unit"]
+                self._attr_native_unit_of_measurement = plan.unit
 
-        self._attr_icon = details.get("icon")
+        self._attr_icon = plan.icon
         self._attr_native_value = self._attr_native_min_value
 
     @property
@@ -85,23 +84,21 @@ class DuuxNumber(NumberEntity):
         }
 
     async def async_set_native_value(self, value: float) -> None:
-        cmd_topic = self._details.get("command_topic")
+        cmd_topic = self._plan.command_topic
         if cmd_topic:
             val = int(round(value))
-            await self.hass.async_add_executor_job(
-                self._client.publish, f"{cmd_topic} {val}"
-            )
+            await self._client.async_publish(f"{cmd_topic} {val}")
 
     @callback
     def _update_state(self, fan_data: dict):
-        state_key = self._details.get("state_key")
-        val = fan_data.get(state_key)
+        val = fan_data.get(self._state_key)
         if val is not None:
             self._attr_native_value = float(val)
             self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
-        self._client.register_callback(self._update_state)
+        await super().async_added_to_hass()
+        self._client.register_callback(self._update_state, (self._state_key,))
 
     async def async_will_remove_from_hass(self) -> None:
         self._client.unregister_callback(self._update_state)
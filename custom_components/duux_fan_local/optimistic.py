@@ -0,0 +1,95 @@
+"""
+Optimistic state for the Duux Fan Local integration.
+Holds the values commands are expected to set until the device reports them,
+so entities reflect a change as soon as it is sent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .metrics import DeviceMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+# Roll an optimistic value back if the device has not reported it by then
+OPTIMISTIC_TIMEOUT = 10.0
+
+
+class OptimisticState:
+    """Expected values layered over the reported device state.
+
+    A value stays until a state payload reports it, or is rolled back once
+    OPTIMISTIC_TIMEOUT elapses. Reports of other values in between, such as
+    a periodic state sent before the command arrived, leave it in place.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        on_rollback: Callable[[str], None],
+        metrics: DeviceMetrics,
+        timeout: float = OPTIMISTIC_TIMEOUT,
+    ) -> None:
+        """Initialize the optimistic state."""
+        self.hass = hass
+        self._on_rollback = on_rollback
+        self._metrics = metrics
+        self._timeout = timeout
+        # State key -> (expected value, rollback timer)
+        self._expected: dict[str, tuple[Any, asyncio.TimerHandle]] = {}
+
+    def __bool__(self) -> bool:
+        """Return True while values await their state report."""
+        return bool(self._expected)
+
+    def apply(self, state: dict[str, Any]) -> Mapping[str, Any]:
+        """Return the state with the expected values applied."""
+        if not self._expected:
+            return state
+        return state | {key: value for key, (value, _) in self._expected.items()}
+
+    @callback
+    def async_expect(self, key: str, value: Any, reported: Any) -> None:
+        """Expect a state key to take a value, given its reported value."""
+        if (previous := self._expected.pop(key, None)) is not None:
+            previous[1].cancel()
+        # Setting the reported value again has nothing to wait for
+        if value != reported:
+            handle = self.hass.loop.call_later(self._timeout, self._async_rollback, key)
+            self._expected[key] = (value, handle)
+
+    @callback
+    def async_reconcile(self, fan_data: Mapping[str, Any]) -> None:
+        """Drop the expected values a state payload reports."""
+        for key in [key for key in self._expected if key in fan_data]:
+            value, handle = self._expected[key]
+            if fan_data[key] == value:
+                del self._expected[key]
+                handle.cancel()
+                self._metrics.optimistic_confirmed += 1
+
+    @callback
+    def _async_rollback(self, key: str) -> None:
+        """Forget an expected value the device never reported."""
+        value, _ = self._expected.pop(key)
+        self._metrics.optimistic_rolled_back += 1
+        _LOGGER.warning(
+            "Device did not report %s=%s within %s seconds, rolling back",
+            key,
+            value,
+            self._timeout,
+        )
+        self._on_rollback(key)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop every expected value and stop the rollback timers."""
+        for _, handle in self._expected.values():
+            handle.cancel()
+        self._expected.clear()
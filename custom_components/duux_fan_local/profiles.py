@@ -0,0 +1,328 @@
+"""
+Compiled device profiles for the Duux Fan Local integration.
+Turns each DEVICE_PROFILES entry into frozen, slotted plans once per model, so
+the entity update path reads precomputed attributes instead of profile dicts.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cache
+from types import MappingProxyType
+from collections.abc import Mapping
+from typing import Any
+
+from .commands import command_key
+from .const import AVAILABILITY_MISSED_REPORTS
+from .devices import (
+    ATTR_POWER,
+    ATTR_SPEED,
+    ATTR_SWING,
+    ATTR_TILT,
+    DEFAULT_REPORT_INTERVAL,
+    DEVICE_PROFILES,
+    validate_profile,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class FanPlan:
+    """Fan entity settings."""
+
+    supported_features: frozenset[str]
+    max_speed: int
+    power_key: str
+    speed_key: str
+    oscillate: bool
+    direction: bool
+    state_keys: frozenset[str]
+
+
+@dataclass(frozen=True, slots=True)
+class SwitchPlan:
+    """Switch entity settings."""
+
+    key: str
+    name: str
+    command_on: str
+    command_off: str
+    state_key: str
+    icon: str | None
+    entity_category: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class SensorPlan:
+    """Sensor entity settings."""
+
+    key: str
+    name: str
+    state_key: str
+    device_class: str | None
+    state_class: str | None
+    unit: str | None
+    icon: str | None
+    multiplier: int | float
+    deadband: float
+    deadband_percent: float
+    min_interval: float
+    max_silence: float
+
+
+@dataclass(frozen=True, slots=True)
+class StatisticPlan:
+    """Rolling statistic sensor settings, with the source sensor resolved."""
+
+    key: str
+    name: str
+    state_key: str
+    statistic: str
+    window: int
+    percentile: float | None
+    device_class: str | None
+    unit: str | None
+    icon: str | None
+    multiplier: int | float
+
+
+@dataclass(frozen=True, slots=True)
+class NumberPlan:
+    """Number entity settings."""
+
+    key: str
+    name: str
+    command_topic: str
+    state_key: str
+    min: float
+    max: float
+    step: float
+    unit: str | None
+    icon: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class SelectPlan:
+    """Select entity settings, with option maps in both directions."""
+
+    key: str
+    name: str
+    command_topic: str
+    state_key: str
+    options: tuple[str, ...]
+    option_values: Mapping[str, Any]
+    value_options: Mapping[Any, str]
+    icon: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class BinarySensorPlan:
+    """Binary sensor entity settings."""
+
+    key: str
+    name: str
+    state_key: str
+    device_class: str | None
+    icon: str | None
+    debounce: float
+
+
+@dataclass(frozen=True, slots=True)
+class DevicePlan:
+    """Every entity plan for one model."""
+
+    model: str
+    name: str
+    # Longest expected gap between two state reports, in seconds
+    report_interval: int
+    fan: FanPlan | None
+    switches: tuple[SwitchPlan, ...]
+    sensors: tuple[SensorPlan, ...]
+    statistics: tuple[StatisticPlan, ...]
+    numbers: tuple[NumberPlan, ...]
+    selects: tuple[SelectPlan, ...]
+    binary_sensors: tuple[BinarySensorPlan, ...]
+    # Command key (e.g. "tune set speed") -> state key the device echoes it on
+    command_state_keys: Mapping[str, str]
+
+
+def _compile_fan(fan: dict) -> FanPlan:
+    features = frozenset(fan.get("supported_features", []))
+    power_key = fan.get("power_key", ATTR_POWER)
+    speed_key = fan.get("speed_key", ATTR_SPEED)
+    oscillate = "oscillate" in features
+    direction = "direction" in features
+
+    state_keys = {power_key, speed_key}
+    if oscillate:
+        state_keys.add(ATTR_SWING)
+    if direction:
+        state_keys.add(ATTR_TILT)
+
+    return FanPlan(
+        supported_features=features,
+        max_speed=fan.get("max_speed", 100),
+        power_key=power_key,
+        speed_key=speed_key,
+        oscillate=oscillate,
+        direction=direction,
+        state_keys=frozenset(state_keys),
+    )
+
+
+def _compile_select(key: str, details: dict) -> SelectPlan:
+    options = details.get("options", {})
+    value_options: dict[Any, str] = {}
+    for option, value in options.items():
+        # Keep the first option for a value, like the previous linear scan
+        value_options.setdefault(value, option)
+
+    return SelectPlan(
+        key=key,
+        name=details["name"],
+        command_topic=details.get("command_topic"),
+        state_key=details.get("state_key"),
+        options=tuple(options),
+        option_values=MappingProxyType(dict(options)),
+        value_options=MappingProxyType(value_options),
+        icon=details.get("icon"),
+    )
+
+
+def _compile_statistics(
+    statistics: dict, sensors: tuple[SensorPlan, ...]
+) -> tuple[StatisticPlan, ...]:
+    sources = {sensor.key: sensor for sensor in sensors}
+    plans = []
+    for key, details in statistics.items():
+        source = sources.get(details["sensor"])
+        if source is None:
+            # Already reported by profile validation
+            continue
+        plans.append(
+            StatisticPlan(
+                key=key,
+                name=details["name"],
+                state_key=source.state_key,
+                statistic=details["statistic"],
+                window=details["window"],
+                percentile=details.get("percentile"),
+                device_class=source.device_class,
+                unit=source.unit,
+                icon=details.get("icon", source.icon),
+                multiplier=source.multiplier,
+            )
+        )
+    return tuple(plans)
+
+
+def _command_state_keys(
+    fan: FanPlan | None,
+    switches: tuple[SwitchPlan, ...],
+    numbers: tuple[NumberPlan, ...],
+    selects: tuple[SelectPlan, ...],
+) -> Mapping[str, str]:
+    keys: dict[str, str] = {}
+    if fan is not None:
+        keys["tune set power"] = fan.power_key
+        keys["tune set speed"] = fan.speed_key
+        if fan.oscillate:
+            keys["tune set swing"] = ATTR_SWING
+        if fan.direction:
+            keys["tune set tilt"] = ATTR_TILT
+    for switch in switches:
+        keys[command_key(switch.command_on)] = switch.state_key
+        keys[command_key(switch.command_off)] = switch.state_key
+    for entity in (*numbers, *selects):
+        if entity.command_topic:
+            keys[entity.command_topic] = entity.state_key
+    return MappingProxyType(keys)
+
+
+@cache
+def compile_profile(model: str) -> DevicePlan | None:
+    """Compile the profile of a model, or return None for unknown models."""
+    profile = DEVICE_PROFILES.get(model)
+    if not profile:
+        return None
+    # Only configured models get here, so startup validates just those
+    validate_profile(model)
+
+    fan = _compile_fan(profile["fan"]) if "fan" in profile else None
+    switches = tuple(
+        SwitchPlan(
+            key=key,
+            name=details["name"],
+            command_on=details["command_on"],
+            command_off=details["command_off"],
+            state_key=details["state_key"],
+            icon=details.get("icon"),
+            entity_category=details.get("entity_category"),
+        )
+        for key, details in profile.get("switches", {}).items()
+    )
+    numbers = tuple(
+        NumberPlan(
+            key=key,
+            name=details["name"],
+            command_topic=details.get("command_topic"),
+            state_key=details.get("state_key"),
+            min=float(details.get("min", 1.0)),
+            max=float(details.get("max", 100.0)),
+            step=float(details.get("step", 1.0)),
+            unit=details.get("unit"),
+            icon=details.get("icon"),
+        )
+        for key, details in profile.get("numbers", {}).items()
+    )
+    selects = tuple(
+        _compile_select(key, details)
+        for key, details in profile.get("select", {}).items()
+    )
+    sensors = tuple(
+        SensorPlan(
+            key=key,
+            name=details["name"],
+            state_key=details["state_key"],
+            device_class=details.get("device_class"),
+            state_class=details.get("state_class"),
+            unit=details.get("unit"),
+            icon=details.get("icon"),
+            multiplier=details.get("multiplier", 1),
+            deadband=details.get("deadband", 0),
+            deadband_percent=details.get("deadband_percent", 0),
+            min_interval=details.get("min_interval", 0),
+            max_silence=details.get("max_silence", 0),
+        )
+        for key, details in profile.get("sensors", {}).items()
+    )
+
+    return DevicePlan(
+        model=model,
+        name=profile["name"],
+        report_interval=profile.get("report_interval", DEFAULT_REPORT_INTERVAL),
+        fan=fan,
+        switches=switches,
+        sensors=sensors,
+        statistics=_compile_statistics(profile.get("statistics", {}), sensors),
+        numbers=numbers,
+        selects=selects,
+        binary_sensors=tuple(
+            BinarySensorPlan(
+                key=key,
+                name=details["name"],
+                state_key=details.get("state_key"),
+                device_class=details.get("device_class"),
+                icon=details.get("icon"),
+                debounce=details.get("debounce", 0),
+            )
+            for key, details in profile.get("binary_sensors", {}).items()
+        ),
+        command_state_keys=_command_state_keys(fan, switches, numbers, selects),
+    )
+
+
+def default_availability_timeout(model: str) -> int:
+    """Return the seconds without reports after which a model is unavailable."""
+    plan = compile_profile(model)
+    interval = plan.report_interval if plan else DEFAULT_REPORT_INTERVAL
+    return interval * AVAILABILITY_MISSED_REPORTS
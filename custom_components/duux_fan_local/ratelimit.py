@@ -0,0 +1,50 @@
+"""
+Rate limiting helpers for the Duux Fan Local integration.
+"""
+
+from __future__ import annotations
+
+import random
+
+
+class TokenBucket:
+    """Token bucket allowing bursts of `burst` events at `rate` per second.
+
+    The caller passes the current time, so the bucket never blocks and can be
+    driven from event loop timers.
+    """
+
+    __slots__ = ("rate", "burst", "_tokens", "_updated")
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = now
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, now: float) -> float:
+        """Take a token, returning 0, or the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Return the delay before retry `attempt`, counting from 1.
+
+    The delay doubles with every attempt up to `cap`, and a random half of it
+    is jitter, so clients that failed together do not retry together.
+    """
+    ceiling = min(cap, base * 2 ** min(attempt - 1, 32))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
@@ -11,8 +11,9 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN, MANUFACTURER, MODELS
-from .devices import DEVICE_PROFILES
+from .entity import DuuxEntity
 from .mqtt import DuuxMqttClient
+from .profiles import SelectPlan, compile_profile
 
 
 async def async_setup_entry(
@@ -25,20 +26,18 @@ async def async_setup_entry(
     base_name = config_entry.data["name"]
     model = config_entry.data.get("model", "whisper_flex_2")
 
-    profile = DEVICE_PROFILES.get(model)
-    if not profile or "select" not in profile:
+    plan = compile_profile(model)
+    if not plan or not plan.selects:
         return
 
     entities = []
-    for select_id, details in profile["select"].items():
-        entities.append(
-            DuuxSelect(client, device_id, base_name, model, select_id, details)
-        )
+    for select_plan in plan.selects:
+        entities.append(DuuxSelect(client, device_id, base_name, model, select_plan))
 
     async_add_entities(entities)
 
 
-class DuuxSelect(SelectEntity):
+class DuuxSelect(DuuxEntity, SelectEntity):
     _attr_should_poll = False
 
     def __init__(
@@ -47,23 +46,22 @@ class DuuxSelect(SelectEntity):
         device_id: str,
         base_name: str,
         model: str,
-        select_id: str,
-        details: dict,
+        plan: SelectPlan,
     ):
         self._client = client
         self._device_id = device_id
         self._name = base_name
         self._model = model
-        self._select_id = select_id
-        self._details = details
+        self._select_id = plan.key
+        self._plan = plan
+        self._state_key = plan.state_key
 
-        self._attr_name = f"{base_name} {details['name']}"
-        self._attr_unique_id = f"{DOMAIN}_{device_id}_{select_id}"
+        self._attr_name = f"{base_name} {plan.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{plan.key}"
         self.entity_id = f"select.{self._attr_name.lower().replace(' ', '_')}"
 
-        self._attr_icon = details.get("icon")
-        self._options_map = details.get("options", {})
-        self._attr_options = list(self._options_map.keys())
+        self._attr_icon = plan.icon
+        self._attr_options = list(plan.options)
         self._current_val = None
 
     @property
@@ -80,29 +78,25 @@ class DuuxSelect(SelectEntity):
     def current_option(self) -> str | None:
         if self._current_val is None:
             return None
-        return next(
-            (k for k, v in self._options_map.items() if v == self._current_val), None
-        )
+        return self._plan.value_options.get(self._current_val)
 
     async def async_select_option(self, option: str) -> None:
-        if option in self._options_map:
-            val = self._options_map[option]
-            cmd = self._details.get("command_topic")
+        if option in self._plan.option_values:
+            val = self._plan.option_values[option]
+            cmd = self._plan.command_topic
             if cmd:
-                await self.hass.async_add_executor_job(
-                    self._client.publish, f"{cmd} {val}"
-                )
+                await self._client.async_publish(f"{cmd} {val}")
 
     @callback
     def _update_state(self, fan_data: dict[str, Any]) -> None:
-        state_key = self._details.get("state_key")
-        val = fan_data.get(state_key)
+        val = fan_data.get(self._state_key)
         if val is not None:
             self._current_val = val
             self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
-        self._client.register_callback(self._update_state)
+        await super().async_added_to_hass()
+        self._client.register_callback(self._update_state, (self._state_key,))
 
     async def async_will_remove_from_hass(self) -> None:
         self._client.unregister_callback(self._update_state)
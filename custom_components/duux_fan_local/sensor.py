@@ -2,24 +2,92 @@
 Sensor platform for the Duux Fan Local integration.
 Dynamically creates SensorEntities based on the device profile.
 """
+import asyncio
 import logging
+import time
+from collections.abc import Mapping
+from datetime import datetime
 from typing import Any
 
 from homeassistant.components.sensor import (
     SensorEntity,
+    SensorEntityDescription,
     SensorDeviceClass,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import (
+    SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    EntityCategory,
+    UnitOfTime,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 
-from .const import DOMAIN, MANUFACTURER, MODELS
-from .devices import DEVICE_PROFILES
+from .const import (
+    CONF_HISTORY_HOURS,
+    CONF_HISTORY_RESOLUTION,
+    CONF_SENSOR_DEADBAND,
+    CONF_SENSOR_DEADBAND_PERCENT,
+    CONF_SENSOR_MAX_SILENCE,
+    CONF_SENSOR_MIN_INTERVAL,
+    DATA_HISTORY,
+    DEFAULT_HISTORY_HOURS,
+    DEFAULT_HISTORY_RESOLUTION,
+    DOMAIN,
+    MANUFACTURER,
+    MODELS,
+)
+from .entity import DuuxEntity
+from .filters import ReportFilter
+from .health import DeviceHealth
+from .history import SampleRing
 from .mqtt import DuuxMqttClient
+from .profiles import SensorPlan, StatisticPlan, compile_profile
+from .statistics import rolling_statistic
 
 _LOGGER = logging.getLogger(__name__)
 
+# Link diagnostics, keyed by the DeviceHealth attribute they show
+DIAGNOSTIC_SENSORS = (
+    SensorEntityDescription(
+        key="rssi",
+        name="Signal Strength",
+        device_class=SensorDeviceClass.SIGNAL_STRENGTH,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    ),
+    SensorEntityDescription(
+        key="message_rate",
+        name="Messages per Minute",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement="messages/min",
+        icon="mdi:message-processing",
+    ),
+    SensorEntityDescription(
+        key="last_seen_age",
+        name="Last Seen",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        icon="mdi:clock-check-outline",
+    ),
+    SensorEntityDescription(
+        key="parse_errors",
+        name="Parse Errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:alert-circle-outline",
+    ),
+    SensorEntityDescription(
+        key="round_trip",
+        name="Command Round Trip",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        icon="mdi:timer-sync-outline",
+    ),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -32,20 +100,72 @@ async def async_setup_entry(
     base_name = config_entry.data["name"]
     model = config_entry.data.get("model", "whisper_flex_2")
 
-    profile = DEVICE_PROFILES.get(model)
-    if not profile or "sensors" not in profile:
+    # Link diagnostics exist for every device, whatever its profile
+    health = DeviceHealth(hass, client)
+    sensors: list[SensorEntity] = [
+        DuuxDiagnosticSensor(client, device_id, base_name, model, health, description)
+        for description in DIAGNOSTIC_SENSORS
+    ]
+
+    plan = compile_profile(model)
+    if not plan or not plan.sensors:
+        async_add_entities(sensors)
         return
 
-    sensors = []
-    for sensor_id, details in profile["sensors"].items():
+    options = config_entry.options
+    history_hours = options.get(CONF_HISTORY_HOURS, DEFAULT_HISTORY_HOURS)
+    history_resolution = options.get(
+        CONF_HISTORY_RESOLUTION, DEFAULT_HISTORY_RESOLUTION
+    )
+
+    for sensor_plan in plan.sensors:
+        history = (
+            SampleRing(history_hours, history_resolution) if history_hours else None
+        )
+        report_filter = ReportFilter(
+            deadband=_override(options, CONF_SENSOR_DEADBAND, sensor_plan.deadband),
+            deadband_percent=_override(
+                options, CONF_SENSOR_DEADBAND_PERCENT, sensor_plan.deadband_percent
+            ),
+            min_interval=_override(
+                options, CONF_SENSOR_MIN_INTERVAL, sensor_plan.min_interval
+            ),
+            max_silence=_override(
+                options, CONF_SENSOR_MAX_SILENCE, sensor_plan.max_silence
+            ),
+        )
         sensors.append(
-            DuuxSensor(client, device_id, base_name, model, sensor_id, details)
+            DuuxSensor(
+                client,
+                device_id,
+                base_name,
+                model,
+                sensor_plan,
+                history,
+                report_filter,
+            )
         )
+    sensors.extend(
+        DuuxStatisticSensor(client, device_id, base_name, model, statistic_plan)
+        for statistic_plan in plan.statistics
+    )
 
     async_add_entities(sensors)
 
 
-class DuuxSensor(SensorEntity):
+def _override(options: Mapping[str, Any], key: str, setting: float) -> float:
+    """Return the option overriding a filter setting the profile declares.
+
+    Sensors the profile does not filter keep every change, so a deadband
+    meant for air quality readings does not hide battery or filter levels.
+    An option left empty keeps the profile setting.
+    """
+    if not setting:
+        return setting
+    return options.get(key, setting)
+
+
+class DuuxSensor(DuuxEntity, SensorEntity):
     """Representation of a Duux Fan Sensor."""
 
     _attr_should_poll = False
@@ -56,32 +176,44 @@ class DuuxSensor(SensorEntity):
         device_id: str,
         base_name: str,
         model: str,
-        sensor_id: str,
-        details: dict,
+        plan: SensorPlan,
+        history: SampleRing | None = None,
+        report_filter: ReportFilter | None = None,
     ) -> None:
         """Initialize the sensor."""
         self._client = client
         self._device_id = device_id
         self._name = base_name
         self._model = model
-        self._sensor_id = sensor_id
-        self._details = details
+        self._sensor_id = plan.key
+        self._plan = plan
+        self._state_key = plan.state_key
+        self._multiplier = plan.multiplier
+        self._history = history
+        self._filter = report_filter or ReportFilter()
+        self._pending_value: Any = None
+        self._write_handle: asyncio.TimerHandle | None = None
+        self._unsub_heartbeat: CALLBACK_TYPE | None = None
+        # Whether the last write showed restored state, see assumed_state
+        self._written_assumed = False
+        # Heartbeat writes must reach the recorder even if the value is unchanged
+        self._attr_force_update = bool(self._filter.max_silence)
 
-        self._attr_name = f"{base_name} {details['name']}"
-        self._attr_unique_id = f"{DOMAIN}_{device_id}_{sensor_id}"
+        self._attr_name = f"{base_name} {plan.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{plan.key}"
         self.entity_id = f"sensor.{self._attr_name.lower().replace(' ', '_')}"
         self._attr_native_value = None
 
-        if "device_class" in details and details["device_class"]:
-            self._attr_device_class = SensorDeviceClass(details["device_class"])
-        if "state_class" in details and details["state_class"]:
+        if plan.device_class:
+            self._attr_device_class = SensorDeviceClass(plan.device_class)
+        if plan.state_class:
             self._attr_state_class = getattr(
-                SensorStateClass, details["state_class"].upper(), None
+                SensorStateClass, plan.state_class.upper(), None
             )
-        if "unit" in details and details["unit"]:
-            self._attr_native_unit_of_measurement = details["unit"]
-        if "icon" in details and details["icon"]:
-            self._attr_icon = details["icon"]
+        if plan.unit:
+            self._attr_native_unit_of_measurement = plan.unit
+        if plan.icon:
+            self._attr_icon = plan.icon
 
     @property
     def device_info(self) -> dict[str, Any]:
@@ -97,18 +229,225 @@ class DuuxSensor(SensorEntity):
     @callback
     def _update_state(self, fan_data: dict[str, Any]) -> None:
         """Update the entity's state from parsed MQTT data."""
-        state_key = self._details["state_key"]
-        val = fan_data.get(state_key)
+        val = fan_data.get(self._state_key)
+
+        if val is None:
+            return
+        value = val * self._multiplier
+        if self._client.stale != self._written_assumed:
+            # Restored state went live, even an unchanged value must clear
+            # assumed_state, so it bypasses the report filter
+            if self._write_handle is not None:
+                self._write_handle.cancel()
+                self._write_handle = None
+            self._pending_value = value
+            self._async_write_value(value)
+            return
+        self._async_report(value)
 
+    @callback
+    def _async_sample(self, report: dict[str, Any]) -> None:
+        """Add a reported reading to the history, whether it changed or not."""
+        val = report.get(self._state_key)
         if val is not None:
-            multiplier = self._details.get("multiplier", 1)
-            self._attr_native_value = val * multiplier
-            self.async_write_ha_state()
+            self._history.add(time.time(), val * self._multiplier)
+
+    @callback
+    def _async_report(self, value: Any) -> None:
+        """Write value now, later or not at all, as the report filter decides."""
+        self._pending_value = value
+        if self._write_handle is not None:
+            # The scheduled write picks up the latest value
+            return
+
+        loop = self.hass.loop
+        delay = self._filter.next_write(value, loop.time())
+        if delay is None:
+            return
+        if delay:
+            self._write_handle = loop.call_later(delay, self._async_write_pending)
+            return
+        self._async_write_value(value)
+
+    @callback
+    def _async_write_pending(self) -> None:
+        self._write_handle = None
+        value = self._pending_value
+        # The value may have settled back inside the deadband meanwhile
+        if self._filter.next_write(value, self.hass.loop.time()) is not None:
+            self._async_write_value(value)
+
+    @callback
+    def _async_write_value(self, value: Any) -> None:
+        self._filter.written(value, self.hass.loop.time())
+        self._written_assumed = self._client.stale
+        self._attr_native_value = value
+        self.async_write_ha_state()
+        if self._filter.max_silence:
+            # A steady value brings no reading to trigger the heartbeat
+            if self._unsub_heartbeat is not None:
+                self._unsub_heartbeat()
+            self._unsub_heartbeat = async_call_later(
+                self.hass, self._filter.max_silence, self._async_heartbeat
+            )
+
+    @callback
+    def _async_heartbeat(self, _now: datetime) -> None:
+        """Write the latest reading once max_silence has passed without a write."""
+        self._unsub_heartbeat = None
+        if self._write_handle is None:
+            self._async_write_value(self._pending_value)
 
     async def async_added_to_hass(self) -> None:
         """Run when entity is added to hass."""
-        self._client.register_callback(self._update_state)
+        await super().async_added_to_hass()
+        if self._history is not None:
+            self.hass.data.setdefault(DATA_HISTORY, {})[self.entity_id] = self._history
+            self.async_on_remove(
+                self._client.register_sample_callback(
+                    self._async_sample, (self._state_key,)
+                )
+            )
+        self._client.register_callback(self._update_state, (self._state_key,))
 
     async def async_will_remove_from_hass(self) -> None:
         """Run when entity is about to be removed."""
         self._client.unregister_callback(self._update_state)
+        if self._write_handle is not None:
+            self._write_handle.cancel()
+            self._write_handle = None
+        if self._unsub_heartbeat is not None:
+            self._unsub_heartbeat()
+            self._unsub_heartbeat = None
+        if self._history is not None:
+            self.hass.data.get(DATA_HISTORY, {}).pop(self.entity_id, None)
+
+
+class DuuxStatisticSensor(DuuxEntity, SensorEntity):
+    """Rolling statistic of a Duux sensor, computed from every device report."""
+
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        client: DuuxMqttClient,
+        device_id: str,
+        base_name: str,
+        model: str,
+        plan: StatisticPlan,
+    ) -> None:
+        """Initialize the sensor."""
+        self._client = client
+        self._device_id = device_id
+        self._name = base_name
+        self._model = model
+        self._plan = plan
+        self._state_key = plan.state_key
+        self._multiplier = plan.multiplier
+        self._statistic = rolling_statistic(
+            plan.statistic, plan.window * 60, plan.percentile
+        )
+
+        self._attr_name = f"{base_name} {plan.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{plan.key}"
+        self.entity_id = f"sensor.{self._attr_name.lower().replace(' ', '_')}"
+        self._attr_native_value = None
+
+        if plan.device_class:
+            self._attr_device_class = SensorDeviceClass(plan.device_class)
+        if plan.unit:
+            self._attr_native_unit_of_measurement = plan.unit
+        if plan.icon:
+            self._attr_icon = plan.icon
+
+    @property
+    def device_info(self) -> dict[str, Any]:
+        """Return device information for the entity."""
+        return {
+            "identifiers": {(DOMAIN, self._device_id)},
+            "name": self._name,
+            "manufacturer": MANUFACTURER,
+            "model": MODELS.get(self._model, self._model),
+            "connections": {("mac", self._device_id)},
+        }
+
+    @callback
+    def _async_sample(self, report: dict[str, Any]) -> None:
+        """Add a reported reading to the window and publish the statistic.
+
+        Every report counts, changed or not, so a steady value weighs in
+        with each reading, and samples older than the window drop out.
+        """
+        val = report.get(self._state_key)
+        if val is None:
+            return
+
+        now = time.monotonic()
+        self._statistic.add(now, val * self._multiplier)
+        value = self._statistic.value(now)
+        self._attr_native_value = round(value, 2) if value is not None else None
+        self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        """Run when entity is added to hass."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._client.register_sample_callback(
+                self._async_sample, (self._state_key,)
+            )
+        )
+
+
+class DuuxDiagnosticSensor(SensorEntity):
+    """Link diagnostic of a Duux device, refreshed by its DeviceHealth.
+
+    Stays available while the device is silent, as that is when the last
+    seen age matters.
+    """
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        client: DuuxMqttClient,
+        device_id: str,
+        base_name: str,
+        model: str,
+        health: DeviceHealth,
+        description: SensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self._client = client
+        self._device_id = device_id
+        self._name = base_name
+        self._model = model
+        self._health = health
+        self.entity_description = description
+
+        self._attr_name = f"{base_name} {description.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{description.key}"
+        self.entity_id = f"sensor.{self._attr_name.lower().replace(' ', '_')}"
+
+    @property
+    def device_info(self) -> dict[str, Any]:
+        """Return device information for the entity."""
+        return {
+            "identifiers": {(DOMAIN, self._device_id)},
+            "name": self._name,
+            "manufacturer": MANUFACTURER,
+            "model": MODELS.get(self._model, self._model),
+            "connections": {("mac", self._device_id)},
+        }
+
+    @property
+    def native_value(self) -> Any:
+        """Return the figure of the last refresh."""
+        return getattr(self._health, self.entity_description.key)
+
+    async def async_added_to_hass(self) -> None:
+        """Run when entity is added to hass."""
+        self.async_on_remove(self._health.register_callback(self.async_write_ha_state))
@@ -0,0 +1,168 @@
+"""
+Rolling statistics for the Duux Fan Local integration.
+Each statistic covers the samples of the last few minutes and is updated as
+samples arrive, so derived sensors never query the recorder.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+import math
+
+STAT_MEAN = "mean"
+STAT_MIN = "min"
+STAT_MAX = "max"
+STAT_PERCENTILE = "percentile"
+
+
+class RollingMean:
+    """Mean of a time window, kept as a running sum."""
+
+    __slots__ = ("window", "_samples", "_sum")
+
+    def __init__(self, window: float) -> None:
+        """Initialize the statistic for a window in seconds."""
+        self.window = window
+        self._samples: deque[tuple[float, float]] = deque()
+        self._sum = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, ts: float, value: float) -> None:
+        """Add a sample taken at ts."""
+        self._samples.append((ts, value))
+        self._sum += value
+        self._expire(ts)
+
+    def _expire(self, now: float) -> None:
+        samples = self._samples
+        cutoff = now - self.window
+        while samples and samples[0][0] <= cutoff:
+            self._sum -= samples.popleft()[1]
+        if not samples:
+            # Drop the rounding error the running sum picked up
+            self._sum = 0.0
+
+    def value(self, now: float) -> float | None:
+        """Return the mean of the window ending at now."""
+        self._expire(now)
+        if not self._samples:
+            return None
+        return self._sum / len(self._samples)
+
+
+class RollingExtreme:
+    """Minimum or maximum of a time window, kept in a monotonic deque.
+
+    Samples that can never become the extreme again, because a newer sample
+    is at least as extreme, are dropped when they are superseded.
+    """
+
+    __slots__ = ("window", "largest", "_candidates", "_times")
+
+    def __init__(self, window: float, largest: bool = False) -> None:
+        """Initialize the statistic for a window in seconds."""
+        self.window = window
+        self.largest = largest
+        self._candidates: deque[tuple[float, float]] = deque()
+        # Arrival times of every sample, only to count them
+        self._times: deque[float] = deque()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def add(self, ts: float, value: float) -> None:
+        """Add a sample taken at ts."""
+        candidates = self._candidates
+        if self.largest:
+            while candidates and candidates[-1][1] <= value:
+                candidates.pop()
+        else:
+            while candidates and candidates[-1][1] >= value:
+                candidates.pop()
+        candidates.append((ts, value))
+        self._times.append(ts)
+        self._expire(ts)
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window
+        candidates = self._candidates
+        while candidates and candidates[0][0] <= cutoff:
+            candidates.popleft()
+        times = self._times
+        while times and times[0] <= cutoff:
+            times.popleft()
+
+    def value(self, now: float) -> float | None:
+        """Return the extreme of the window ending at now."""
+        self._expire(now)
+        if not self._candidates:
+            return None
+        return self._candidates[0][1]
+
+
+class RollingPercentile:
+    """Percentile of a time window, kept in a sorted list.
+
+    Insertions and removals use bisect; the window holds at most a few
+    hundred samples, so moving list items stays cheap.
+    """
+
+    __slots__ = ("window", "percentile", "_samples", "_sorted")
+
+    def __init__(self, window: float, percentile: float) -> None:
+        """Initialize the statistic for a window in seconds."""
+        self.window = window
+        self.percentile = percentile
+        self._samples: deque[tuple[float, float]] = deque()
+        self._sorted: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, ts: float, value: float) -> None:
+        """Add a sample taken at ts."""
+        self._samples.append((ts, value))
+        insort(self._sorted, value)
+        self._expire(ts)
+
+    def _expire(self, now: float) -> None:
+        samples = self._samples
+        ordered = self._sorted
+        cutoff = now - self.window
+        while samples and samples[0][0] <= cutoff:
+            del ordered[bisect_left(ordered, samples.popleft()[1])]
+
+    def value(self, now: float) -> float | None:
+        """Return the percentile of the window ending at now.
+
+        Interpolates linearly between the closest ranks.
+        """
+        self._expire(now)
+        ordered = self._sorted
+        if not ordered:
+            return None
+        rank = (len(ordered) - 1) * self.percentile / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+RollingStatistic = RollingMean | RollingExtreme | RollingPercentile
+
+
+def rolling_statistic(
+    statistic: str, window: float, percentile: float | None = None
+) -> RollingStatistic:
+    """Return an empty rolling statistic of the given type."""
+    if statistic == STAT_MEAN:
+        return RollingMean(window)
+    if statistic == STAT_MIN:
+        return RollingExtreme(window)
+    if statistic == STAT_MAX:
+        return RollingExtreme(window, largest=True)
+    if statistic == STAT_PERCENTILE:
+        return RollingPercentile(window, percentile if percentile is not None else 50)
+    raise ValueError(f"Unknown statistic: {statistic}")
@@ -0,0 +1,79 @@
+"""
+Last-known device state for the Duux Fan Local integration.
+Persists each device's parsed state so entities can show it right after a
+restart, before the device publishes again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_STATE_STORE, STORAGE_KEY, STORAGE_VERSION
+
+# Seconds state changes are batched for before they are written to disk
+SAVE_DELAY = 60
+
+
+class DuuxStateStore:
+    """Last-known state of every device, shared by all config entries.
+
+    A write is scheduled by the first change after the previous one and
+    saves every device at once, so a steady stream of messages costs one
+    write per SAVE_DELAY. Home Assistant flushes a pending write on stop.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        # Device ID -> state dict, owned and updated in place by its client
+        self._states: dict[str, dict[str, Any]] = {}
+        self._load_task: asyncio.Task | None = None
+        self._save_scheduled = False
+
+    async def async_load(self) -> None:
+        """Load the stored states, sharing a single read between callers."""
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+        await asyncio.shield(self._load_task)
+
+    async def _async_load(self) -> None:
+        self._states = await self._store.async_load() or {}
+
+    def get(self, device_id: str) -> dict[str, Any] | None:
+        """Return the last stored state of a device."""
+        return self._states.get(device_id)
+
+    @callback
+    def async_schedule_save(self, device_id: str, state: dict[str, Any]) -> None:
+        """Record the state of a device and schedule a batched write."""
+        self._states[device_id] = state
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_remove(self, device_id: str) -> None:
+        """Forget a removed device."""
+        if self._states.pop(device_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        """Copy the states, clients keep updating theirs during the write."""
+        self._save_scheduled = False
+        return {device_id: dict(state) for device_id, state in self._states.items()}
+
+
+async def async_get_state_store(hass: HomeAssistant) -> DuuxStateStore:
+    """Return the shared state store, loaded."""
+    if (store := hass.data.get(DATA_STATE_STORE)) is None:
+        store = hass.data[DATA_STATE_STORE] = DuuxStateStore(hass)
+    await store.async_load()
+    return store
@@ -11,8 +11,9 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN, MANUFACTURER, MODELS
-from .devices import DEVICE_PROFILES
+from .entity import DuuxEntity
 from .mqtt import DuuxMqttClient
+from .profiles import SwitchPlan, compile_profile
 
 
 async def async_setup_entry(
@@ -26,20 +27,18 @@ async def async_setup_entry(
     base_name = config_entry.data["name"]
     model = config_entry.data.get("model", "whisper_flex_2")
 
-    profile = DEVICE_PROFILES.get(model)
-    if not profile or "switches" not in profile:
+    plan = compile_profile(model)
+    if not plan or not plan.switches:
         return
 
     switches = []
-    for switch_id, details in profile["switches"].items():
-        switches.append(
-            DuuxSwitch(client, device_id, base_name, model, switch_id, details)
-        )
+    for switch_plan in plan.switches:
+        switches.append(DuuxSwitch(client, device_id, base_name, model, switch_plan))
 
     async_add_entities(switches)
 
 
-class DuuxSwitch(SwitchEntity):
+class DuuxSwitch(DuuxEntity, SwitchEntity):
     """Representation of a Duux Fan switch."""
 
     _attr_should_poll = False
@@ -50,23 +49,23 @@ class DuuxSwitch(SwitchEntity):
         device_id: str,
         base_name: str,
         model: str,
-        switch_id: str,
-        details: dict[str, Any],
+        plan: SwitchPlan,
     ) -> None:
         """Initialize the switch."""
         self._client = client
-        self._details = details
+        self._plan = plan
+        self._state_key = plan.state_key
         self._device_id = device_id
         self._name = base_name
         self._model = model
-        self._switch_id = switch_id
+        self._switch_id = plan.key
 
-        self._attr_name = f"{base_name} {details['name']}"
-        self._attr_unique_id = f"{DOMAIN}_{device_id}_{switch_id}"
+        self._attr_name = f"{base_name} {plan.name}"
+        self._attr_unique_id = f"{DOMAIN}_{device_id}_{plan.key}"
         self.entity_id = f"switch.{self._attr_name.lower().replace(' ', '_')}"
         self._attr_is_on = False
-        self._attr_icon = details.get("icon")
-        self._attr_entity_category = details.get("entity_category")
+        self._attr_icon = plan.icon
+        self._attr_entity_category = plan.entity_category
 
     @property
     def device_info(self) -> dict[str, Any]:
@@ -81,26 +80,26 @@ class DuuxSwitch(SwitchEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the switch on."""
-        await self._async_publish(self._details["command_on"])
+        await self._async_publish(self._plan.command_on)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off."""
-        await self._async_publish(self._details["command_off"])
+        await self._async_publish(self._plan.command_off)
 
     async def _async_publish(self, payload: str) -> None:
         """Publish a command to the MQTT topic."""
-        await self.hass.async_add_executor_job(self._client.publish, payload)
+        await self._client.async_publish(payload)
 
     @callback
     def _update_state(self, fan_data: dict[str, Any]) -> None:
         """Update the entity's state from parsed MQTT data."""
-        state_key = self._details["state_key"]
-        self._attr_is_on = fan_data.get(state_key, 0) > 0
+        self._attr_is_on = fan_data.get(self._state_key, 0) > 0
         self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
         """Run when entity is about to be added."""
-        self._client.register_callback(self._update_state)
+        await super().async_added_to_hass()
+        self._client.register_callback(self._update_state, (self._state_key,))
 
     async def async_will_remove_from_hass(self) -> None:
         """Run when entity will be removed."""
@@ -0,0 +1,26 @@
+"""
+HTTP views for the Duux Fan Local integration.
+"""
+
+from __future__ import annotations
+
+from aiohttp import web
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+
+from .const import DOMAIN
+from .metrics import format_metrics
+from .mqtt import DuuxMqttClient
+
+
+class DuuxMetricsView(HomeAssistantView):
+    """Serve the runtime counters of every device in the Prometheus format."""
+
+    url = f"/api/{DOMAIN}/metrics"
+    name = f"api:{DOMAIN}:metrics"
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics of the configured devices."""
+        hass = request.app[KEY_HASS]
+        clients: list[DuuxMqttClient] = list(hass.data.get(DOMAIN, {}).values())
+        body = format_metrics((client.device_id, client.metrics) for client in clients)
+        return web.Response(text=body, content_type="text/plain", charset="utf-8")
@@ -0,0 +1,92 @@
+"""
+Availability watchdog for the Duux Fan Local integration.
+Marks devices unavailable once they stop reporting, with one periodic sweep
+shared by every configured device.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DATA_WATCHDOG
+
+if TYPE_CHECKING:
+    from .mqtt import DuuxMqttClient
+
+_LOGGER = logging.getLogger(__name__)
+
+SWEEP_INTERVAL = timedelta(seconds=5)
+
+
+class AvailabilityWatchdog:
+    """Deadline heap of every watched device.
+
+    A report only updates the device's last-seen time. Its heap entry is
+    refreshed lazily, when the sweep pops it and finds a later deadline, so
+    a sweep costs O(k log n) for the k entries due, whatever the number of
+    devices. Unavailable devices leave the heap until they report again.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the watchdog."""
+        self.hass = hass
+        self._heap: list[tuple[float, int, DuuxMqttClient]] = []
+        # Tie-breaker, so clients themselves are never compared
+        self._sequence = itertools.count()
+        self._watched: set[DuuxMqttClient] = set()
+        self._unsub_sweep: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_watch(self, client: DuuxMqttClient) -> None:
+        """Start watching a device."""
+        self._watched.add(client)
+        self.async_schedule(client)
+        if self._unsub_sweep is None:
+            self._unsub_sweep = async_track_time_interval(
+                self.hass, self._async_sweep, SWEEP_INTERVAL
+            )
+
+    @callback
+    def async_unwatch(self, client: DuuxMqttClient) -> None:
+        """Stop watching a device, stopping the sweep after the last one."""
+        self._watched.discard(client)
+        if not self._watched and self._unsub_sweep is not None:
+            self._unsub_sweep()
+            self._unsub_sweep = None
+            self._heap.clear()
+
+    @callback
+    def async_schedule(self, client: DuuxMqttClient) -> None:
+        """Add the deadline of an available device to the heap."""
+        deadline = client.last_seen + client.availability_timeout
+        heapq.heappush(self._heap, (deadline, next(self._sequence), client))
+
+    @callback
+    def _async_sweep(self, _now: datetime | None = None) -> None:
+        """Mark the devices past their deadline unavailable."""
+        now = self.hass.loop.time()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, client = heapq.heappop(heap)
+            if client not in self._watched or not client.available:
+                continue
+            deadline = client.last_seen + client.availability_timeout
+            if deadline > now:
+                heapq.heappush(heap, (deadline, next(self._sequence), client))
+            else:
+                client.async_set_available(False)
+
+
+@callback
+def async_get_watchdog(hass: HomeAssistant) -> AvailabilityWatchdog:
+    """Return the watchdog shared by all config entries."""
+    if (watchdog := hass.data.get(DATA_WATCHDOG)) is None:
+        watchdog = hass.data[DATA_WATCHDOG] = AvailabilityWatchdog(hass)
+    return watchdog
@@ -0,0 +1,52 @@
+"""
+Websocket API for the Duux Fan Local integration.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+
+from .const import DATA_HISTORY
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the websocket commands of the integration."""
+    websocket_api.async_register_command(hass, websocket_history)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "duux_fan_local/history",
+        vol.Required("entity_id"): cv.entity_id,
+        # Unix timestamps, both ends included
+        vol.Optional("start"): vol.Coerce(float),
+        vol.Optional("end"): vol.Coerce(float),
+    }
+)
+@callback
+def websocket_history(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return the in-memory history of a sensor over a time window."""
+    ring = hass.data.get(DATA_HISTORY, {}).get(msg["entity_id"])
+    if ring is None:
+        connection.send_error(
+            msg["id"],
+            websocket_api.ERR_NOT_FOUND,
+            f"No history kept for {msg['entity_id']}",
+        )
+        return
+
+    times, values = ring.window(msg.get("start"), msg.get("end"))
+    connection.send_result(
+        msg["id"],
+        {"resolution": ring.resolution, "times": times, "values": values},
+    )
@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from tools.capture import CaptureWriter, async_replay, iter_capture
+
+
+def _state(ppm: int) -> bytes:
+    tune = {"rssi": -46, "sub": {"Tune": [{"power": 1, "ppm": ppm}]}}
+    return json.dumps({"sub": {"Tune": [tune]}}).encode()
+
+
+def test_capture_round_trip_and_truncated_tail(tmp_path):
+    """Test that records read back in order and a cut-off record is ignored."""
+    path = str(tmp_path / "bedroom.cap")
+    with CaptureWriter(path) as writer:
+        writer.write(10.0, "sensor/aa:bb/in", _state(10))
+    # Appending to an existing capture keeps its records
+    with CaptureWriter(path) as writer:
+        writer.write(11.5, "sensor/aa:bb/command", b"tune set speed 3")
+    with open(path, "ab") as capture:
+        capture.write(b"\x00\x01\x02")
+
+    assert list(iter_capture(path)) == [
+        (10.0, "sensor/aa:bb/in", _state(10)),
+        (11.5, "sensor/aa:bb/command", b"tune set speed 3"),
+    ]
+
+
+def test_capture_rejects_other_files(tmp_path):
+    """Test that a file without the capture header is refused."""
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError):
+        list(iter_capture(str(path)))
+    with pytest.raises(ValueError):
+        CaptureWriter(str(path))
+
+
+async def test_replay_into_the_client(hass: HomeAssistant, tmp_path):
+    """Test that a replay prints the state changes and captured commands."""
+    path = str(tmp_path / "bedroom.cap")
+    with CaptureWriter(path) as writer:
+        writer.write(1.0, "sensor/AA:BB/in", _state(10))
+        writer.write(2.0, "sensor/AA:BB/in", _state(10))
+        writer.write(3.0, "sensor/aa:bb/command", b"tune set speed 3")
+        writer.write(4.0, "sensor/AA:BB/in", _state(12))
+
+    output = io.StringIO()
+    assert await async_replay(hass, path, "bright_2", output=output) == 3
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == [
+        {"time": 1.0, "device": "aa:bb", "changed": {"power": 1, "ppm": 10}},
+        {"time": 3.0, "device": "aa:bb", "command": "tune set speed 3"},
+        {"time": 4.0, "device": "aa:bb", "changed": {"ppm": 12}},
+    ]
@@ -0,0 +1,203 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import Mock, call
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.duux_fan_local import commands
+from custom_components.duux_fan_local.commands import DuuxCommandQueue, command_key
+from custom_components.duux_fan_local.metrics import DeviceMetrics
+from custom_components.duux_fan_local.ratelimit import TokenBucket, backoff_delay
+
+
+def test_command_key():
+    """Test that the key strips the value from a command."""
+    assert command_key("tune set speed 12") == "tune set speed"
+    assert command_key("reboot") == "reboot"
+
+
+async def test_queue_coalesces_slider_storm(hass: HomeAssistant):
+    """Test that a storm of commands on one key collapses to the last value."""
+    send = Mock()
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(hass, send, 0.25, metrics)
+
+    # The first command goes out on the next loop iteration
+    queue.async_enqueue("tune set speed 1")
+    await asyncio.sleep(0)
+    send.assert_called_once_with("tune set speed 1")
+
+    # Commands within the window are merged per key, keeping key order
+    send.reset_mock()
+    for speed in range(2, 31):
+        queue.async_enqueue(f"tune set speed {speed}")
+    queue.async_enqueue("tune set timer 2")
+    queue.async_enqueue("tune set power 1")
+    queue.async_enqueue("tune set timer 3")
+    await asyncio.sleep(0)
+    send.assert_not_called()
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    assert send.call_args_list == [
+        call("tune set speed 30"),
+        call("tune set power 1"),
+        call("tune set timer 3"),
+    ]
+    assert metrics.commands_published == 4
+    assert metrics.commands_coalesced == 29
+
+
+def test_token_bucket():
+    """Test that the bucket allows a burst, then paces at the rate."""
+    bucket = TokenBucket(rate=2, burst=2, now=0)
+    assert bucket.try_acquire(0) == 0
+    assert bucket.try_acquire(0) == 0
+    assert bucket.try_acquire(0) == 0.5
+    assert bucket.try_acquire(0.5) == 0
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    """Test the exponential backoff with jitter."""
+    delays = [backoff_delay(attempt, 2, 60) for attempt in range(1, 8)]
+    assert 1 <= delays[0] <= 2
+    assert 4 <= delays[2] <= 8
+    assert all(30 <= delay <= 60 for delay in delays[5:])
+
+
+async def test_queue_paces_commands_with_rate_limit(hass: HomeAssistant):
+    """Test that held-back commands are sent later on a timer, in order."""
+    send = Mock()
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(hass, send, 0, metrics, rate=20, burst=1)
+
+    queue.async_enqueue("tune set power 1")
+    queue.async_enqueue("tune set speed 5")
+    queue.async_enqueue("tune set mode 1")
+    await asyncio.sleep(0)
+
+    send.assert_called_once_with("tune set power 1")
+    assert metrics.command_queue_depth == 2
+    assert metrics.commands_rate_limited == 1
+
+    # One command per 50ms token
+    await asyncio.sleep(0.06)
+    assert send.call_args_list[-1] == call("tune set speed 5")
+    await asyncio.sleep(0.06)
+    assert send.call_args_list == [
+        call("tune set power 1"),
+        call("tune set speed 5"),
+        call("tune set mode 1"),
+    ]
+    assert metrics.command_queue_depth == 0
+    assert metrics.command_wait_max >= 0.05
+
+
+async def test_confirmed_mode_retries_until_echo(hass: HomeAssistant):
+    """Test that unconfirmed commands are resent until the state echoes them."""
+    send = Mock()
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(
+        hass,
+        send,
+        0,
+        metrics,
+        confirm=True,
+        command_state_keys={"tune set speed": "speed"},
+    )
+
+    queue.async_enqueue("tune set speed 12")
+    await asyncio.sleep(0)
+    assert queue.awaiting_confirmation
+
+    # A state with another value does not confirm the command
+    queue.async_process_state({"speed": 3})
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1.5))
+    assert send.call_args_list == [call("tune set speed 12")] * 2
+    assert metrics.commands_retried == 1
+
+    queue.async_process_state({"speed": 12})
+    assert not queue.awaiting_confirmation
+    assert metrics.commands_confirmed == 1
+
+    # Keys without a state echo are sent once
+    queue.async_enqueue("reboot")
+    await asyncio.sleep(0)
+    assert not queue.awaiting_confirmation
+
+
+async def test_confirmed_mode_gives_up_and_bounds_inflight(
+    hass: HomeAssistant, monkeypatch
+):
+    """Test the in-flight window and the confirmation timeout."""
+    monkeypatch.setattr(commands, "CONFIRM_MAX_INFLIGHT", 1)
+    monkeypatch.setattr(commands, "CONFIRM_TIMEOUT", 0)
+    send = Mock()
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(
+        hass,
+        send,
+        0,
+        metrics,
+        confirm=True,
+        command_state_keys={"tune set speed": "speed", "tune set mode": "mode"},
+    )
+
+    queue.async_enqueue("tune set speed 12")
+    queue.async_enqueue("tune set mode 1")
+    await asyncio.sleep(0)
+    send.assert_called_once_with("tune set speed 12")
+    assert metrics.commands_window_full == 1
+
+    # Giving up on the first command frees the slot for the next one
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1.5))
+    await asyncio.sleep(0)
+    assert metrics.commands_unconfirmed == 1
+    assert send.call_args_list[-1] == call("tune set mode 1")
+    queue.async_cancel()
+
+
+async def test_batch_goes_out_ahead_of_the_queue(hass: HomeAssistant):
+    """Test that a batch is sent in order and supersedes pending commands."""
+    send = Mock()
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(hass, send, 0.25, metrics, rate=1, burst=1)
+
+    queue.async_enqueue("tune set timer 1")
+    await asyncio.sleep(0)
+    queue.async_enqueue("tune set speed 4")
+    # The rate limit does not hold the batch back
+    queue.async_send_batch(["tune set power 1", "tune set speed 12"])
+    assert send.call_args_list == [
+        call("tune set timer 1"),
+        call("tune set power 1"),
+        call("tune set speed 12"),
+    ]
+    assert metrics.commands_coalesced == 1
+
+    # With spacing, later commands wait on timers
+    send.reset_mock()
+    queue.async_send_batch(["tune set power 0", "tune set timer 0"], spacing=0.5)
+    send.assert_called_once_with("tune set power 0")
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    send.assert_called_with("tune set timer 0")
+    queue.async_cancel()
+
+
+async def test_journal_drops_stale_commands(hass: HomeAssistant):
+    """Test that a paused queue journals commands and drops stale ones."""
+    send = Mock()
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(hass, send, 0, metrics, paused=True)
+
+    queue.async_enqueue("tune set timer 2", ttl=0.01)
+    queue.async_enqueue("tune set power 0")
+    await asyncio.sleep(0.02)
+    send.assert_not_called()
+    assert metrics.commands_journaled == 2
+
+    queue.async_resume()
+    await asyncio.sleep(0)
+    send.assert_called_once_with("tune set power 0")
+    assert metrics.commands_expired == 1
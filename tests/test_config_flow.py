@@ -1,6 +1,21 @@
 from unittest.mock import patch
 
-from custom_components.duux_fan_local.const import CONF_DEVICE_ID, CONF_MODEL
+import pytest
+import voluptuous as vol
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.duux_fan_local.const import (
+    CONF_COALESCE_WINDOW,
+    CONF_COMMAND_BURST,
+    CONF_COMMAND_RATE,
+    CONF_DEVICE_ID,
+    CONF_MODEL,
+    CONF_TRANSPORT,
+    DOMAIN,
+    TRANSPORT_ASYNCIO,
+    TRANSPORT_THREAD,
+)
 from custom_components.duux_fan_local.config_flow import DuuxFanConfigFlow
 
 
@@ -58,3 +73,49 @@ async def test_step_device_success(hass):
         assert result["title"] == "My Bright 2"
         assert result["data"]["device_id"] == "aa:bb:cc:dd:ee:ff"  # Ensure lowered
         assert result["data"]["model"] == "bright_2"
+
+
+async def test_options_flow_command_pacing(hass):
+    """Test that the options flow stores the command rate and burst."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=2,
+        data={"device_id": "aa:bb:cc:dd:ee:ff", "name": "Fan", "model": "bright_2"},
+    )
+    config_entry.add_to_hass(hass)
+
+    flow = DuuxFanConfigFlow.async_get_options_flow(config_entry)
+    flow.hass = hass
+
+    result = await flow.async_step_init()
+    assert result["type"] == "form"
+    assert result["step_id"] == "init"
+
+    result = await flow.async_step_init({CONF_COMMAND_RATE: 1.0, CONF_COMMAND_BURST: 2})
+
+    assert result["type"] == "create_entry"
+    assert result["data"] == {CONF_COMMAND_RATE: 1.0, CONF_COMMAND_BURST: 2}
+
+
+async def test_options_flow_connection_settings(hass):
+    """Test that the options flow offers the transport and coalescing window."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=2,
+        data={"device_id": "aa:bb:cc:dd:ee:ff", "name": "Fan", "model": "bright_2"},
+        options={CONF_TRANSPORT: TRANSPORT_THREAD},
+    )
+    config_entry.add_to_hass(hass)
+
+    flow = DuuxFanConfigFlow.async_get_options_flow(config_entry)
+    flow.hass = hass
+    schema = (await flow.async_step_init())["data_schema"]
+
+    assert schema({})[CONF_TRANSPORT] == TRANSPORT_THREAD
+    assert schema({CONF_TRANSPORT: TRANSPORT_ASYNCIO})[CONF_TRANSPORT] == "asyncio"
+    with pytest.raises(vol.Invalid):
+        schema({CONF_TRANSPORT: "socket"})
+
+    # The message coalescing window defaults to a single loop iteration
+    assert schema({})[CONF_COALESCE_WINDOW] == 0
+    assert schema({CONF_COALESCE_WINDOW: "0.5"})[CONF_COALESCE_WINDOW] == 0.5
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from custom_components.duux_fan_local import decoder
+from custom_components.duux_fan_local.decoder import (
+    DECODE_ERRORS,
+    decode_state,
+    extract_rssi,
+    loads,
+)
+
+WHISPER_FLEX_PAYLOAD = json.dumps(
+    {"sub": {"Tune": [{"power": 1, "speed": 10, "mode": 2}]}}
+).encode()
+
+BRIGHT_2_PAYLOAD = json.dumps(
+    {
+        "sub": {
+            "Tune": [
+                {
+                    "uid": "123456",
+                    "rssi": -46,
+                    "sub": {
+                        "Tune": [{"power": 1, "ppm": 17, "speed": 0, "filter": 51}]
+                    },
+                }
+            ]
+        }
+    }
+).encode()
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_decode_state_from_raw_bytes(monkeypatch, use_orjson):
+    """Test decoding bytes and memoryviews with and without orjson."""
+    if not use_orjson:
+        monkeypatch.setattr(decoder, "orjson", None)
+
+    assert decode_state(WHISPER_FLEX_PAYLOAD) == {"power": 1, "speed": 10, "mode": 2}
+    assert decode_state(memoryview(BRIGHT_2_PAYLOAD)) == {
+        "power": 1,
+        "ppm": 17,
+        "speed": 0,
+        "filter": 51,
+    }
+    assert decode_state(b'{"sub": {"Tune": [{}]}}') is None
+
+    with pytest.raises(DECODE_ERRORS):
+        decode_state(b"this is not valid json")
+
+
+def test_extract_rssi_beside_the_inner_state():
+    """Test that the signal strength is read from the outer payload."""
+    assert extract_rssi(loads(BRIGHT_2_PAYLOAD)) == -46
+    assert extract_rssi(loads(WHISPER_FLEX_PAYLOAD)) is None
@@ -1,9 +1,13 @@
+from unittest.mock import patch
+
 import voluptuous as vol
 import pytest
 
+from custom_components.duux_fan_local import devices
 from custom_components.duux_fan_local.devices import (
     DEVICE_PROFILE_SCHEMA,
     DEVICE_PROFILES,
+    validate_profile,
 )
 
 
@@ -33,3 +37,48 @@ def test_invalid_profile_raises_error():
 
     with pytest.raises(vol.Invalid):
         DEVICE_PROFILE_SCHEMA(invalid_profile_2)
+
+
+def test_statistic_requires_a_declared_sensor():
+    """Test that a rolling statistic must derive from a sensor of the profile."""
+    profile = {
+        "name": "Bad Device",
+        "sensors": {"tvoc": {"name": "TVOC", "state_key": "TVOC"}},
+        "statistics": {
+            "pm_mean": {
+                "name": "PM Average",
+                "sensor": "pm_10",
+                "statistic": "mean",
+                "window": 5,
+            }
+        },
+    }
+    with pytest.raises(vol.Invalid):
+        DEVICE_PROFILE_SCHEMA(profile)
+
+    profile["statistics"]["pm_mean"]["sensor"] = "tvoc"
+    DEVICE_PROFILE_SCHEMA(profile)
+
+
+def test_validate_profile_caches_by_content():
+    """Test that a profile is validated once per content hash."""
+    devices._VALIDATED_PROFILES.clear()
+
+    with patch.object(
+        devices, "DEVICE_PROFILE_SCHEMA", wraps=DEVICE_PROFILE_SCHEMA
+    ) as mock_schema:
+        assert validate_profile("bright_2")
+        assert validate_profile("bright_2")
+        assert mock_schema.call_count == 1
+
+        assert not validate_profile("unknown_model")
+        assert mock_schema.call_count == 1
+
+
+def test_validate_profile_rejects_invalid_profile():
+    """Test that an invalid profile is reported and not cached."""
+    with patch.dict(
+        devices.DEVICE_PROFILES, {"broken": {"fan": {"max_speed": "fast"}}}
+    ):
+        assert not validate_profile("broken")
+        assert not validate_profile("broken")
@@ -0,0 +1,51 @@
+import json
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.duux_fan_local import mqtt
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID, DOMAIN
+from custom_components.duux_fan_local.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+
+
+async def test_diagnostics_redact_and_keep_recent_payloads(hass: HomeAssistant):
+    """Test the buffers, the redaction and the counters in diagnostics."""
+    config = {
+        CONF_DEVICE_ID: "aa:bb",
+        "name": "Bedroom",
+        "username": "user",
+        "password": "secret",
+    }
+    entry = MockConfigEntry(domain=DOMAIN, data=config)
+    client = DuuxMqttClient(hass, config)
+    client._connection = Mock(events=[(hass.loop.time(), "connected", 0)])
+    hass.data[DOMAIN] = {entry.entry_id: client}
+
+    for power in range(mqtt.DIAGNOSTIC_PAYLOADS + 1):
+        payload = {"sub": {"Tune": [{"uid": "123", "power": power}]}}
+        client.on_message(
+            None, None, Mock(topic=client.state_topic, payload=json.dumps(payload))
+        )
+    client.on_message(None, None, Mock(topic=client.state_topic, payload=b"\xffoops"))
+    client.publish("tune set power 1")
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert diagnostics["entry"]["data"]["password"] == "**REDACTED**"
+    assert diagnostics["entry"]["data"]["username"] == "**REDACTED**"
+    payloads = diagnostics["payloads"]
+    assert len(payloads) == mqtt.DIAGNOSTIC_PAYLOADS
+    assert payloads[0]["payload"] == {
+        "sub": {"Tune": [{"uid": "**REDACTED**", "power": 2}]}
+    }
+    assert payloads[-1]["payload"] == "�oops"
+    assert [command["payload"] for command in diagnostics["commands"]] == [
+        "tune set power 1"
+    ]
+    assert diagnostics["connection"][0]["event"] == "connected"
+    assert diagnostics["metrics"]["messages_received"] == mqtt.DIAGNOSTIC_PAYLOADS + 2
+    assert diagnostics["metrics"]["echo_latency"]["count"] == 0
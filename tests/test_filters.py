@@ -0,0 +1,149 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.duux_fan_local.binary_sensor import DuuxBinarySensor
+from custom_components.duux_fan_local.filters import ReportFilter
+from custom_components.duux_fan_local.profiles import compile_profile
+from custom_components.duux_fan_local.sensor import DuuxSensor, _override
+
+
+def test_report_filter_deadband_interval_and_silence():
+    """Test when the filter writes, holds or drops a reading."""
+    report_filter = ReportFilter(
+        deadband=2, deadband_percent=10, min_interval=30, max_silence=600
+    )
+    assert report_filter.next_write(40, 0) == 0
+    report_filter.written(40, 0)
+
+    # Inside the absolute deadband, then inside the relative one
+    assert report_filter.next_write(42, 10) is None
+    assert report_filter.next_write(44, 10) is None
+    # Outside both, held until the minimum interval has passed
+    assert report_filter.next_write(45, 10) == 20
+    assert report_filter.next_write(45, 40) == 0
+    # Inside the deadband, but silent for too long
+    assert report_filter.next_write(41, 600) == 0
+
+
+def test_report_filter_disabled_writes_every_change():
+    """Test that a filter without settings only drops repeated values."""
+    report_filter = ReportFilter()
+    report_filter.written(1, 0)
+    assert report_filter.next_write(1, 1) is None
+    assert report_filter.next_write(2, 1) == 0
+
+
+def test_overrides_only_apply_to_filtered_sensors():
+    """Test that filter options leave the sensors without that setting alone."""
+    options = {"sensor_deadband": 5}
+    assert _override(options, "sensor_deadband", 2) == 5
+    assert _override(options, "sensor_deadband", 0) == 0
+    assert _override({}, "sensor_deadband", 2) == 2
+
+
+def _entity(hass: HomeAssistant, entity):
+    entity.hass = hass
+    entity.async_write_ha_state = Mock()
+    return entity
+
+
+async def test_sensor_holds_changes_for_the_minimum_interval(hass: HomeAssistant):
+    """Test that a held sensor change is written with the latest value."""
+    plan = compile_profile("bright_2").sensors[1]
+    client = Mock(stale=False)
+    sensor = _entity(
+        hass,
+        DuuxSensor(
+            client, "aa", "Bright", "bright_2", plan, None, ReportFilter(0, 0, 30)
+        ),
+    )
+
+    sensor._update_state({"ppm": 10})
+    assert sensor.native_value == 10
+    sensor._update_state({"ppm": 20})
+    sensor._update_state({"ppm": 25})
+    assert sensor.native_value == 10
+    assert sensor.async_write_ha_state.call_count == 1
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=31))
+    assert sensor.native_value == 25
+    assert sensor.async_write_ha_state.call_count == 2
+
+
+async def test_sensor_heartbeat_without_readings(hass: HomeAssistant):
+    """Test that a steady sensor is rewritten every max_silence."""
+    plan = compile_profile("bright_2").sensors[1]
+    sensor = _entity(
+        hass,
+        DuuxSensor(
+            Mock(stale=False),
+            "aa",
+            "Bright",
+            "bright_2",
+            plan,
+            None,
+            ReportFilter(2, 0, 0, 600),
+        ),
+    )
+
+    sensor._update_state({"ppm": 10})
+    sensor._update_state({"ppm": 11})
+    assert sensor.async_write_ha_state.call_count == 1
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=601))
+    assert sensor.native_value == 11
+    assert sensor.async_write_ha_state.call_count == 2
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1202))
+    assert sensor.async_write_ha_state.call_count == 3
+
+    await sensor.async_will_remove_from_hass()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1803))
+    assert sensor.async_write_ha_state.call_count == 3
+
+
+async def test_sensor_confirms_restored_value(hass: HomeAssistant):
+    """Test that live data repeating the restored value clears assumed_state."""
+    plan = compile_profile("bright_2").sensors[1]
+    client = Mock(stale=True)
+    sensor = _entity(
+        hass, DuuxSensor(client, "aa", "Bright", "bright_2", plan, None, ReportFilter())
+    )
+
+    sensor._update_state({"ppm": 10})
+    assert sensor.assumed_state
+    client.stale = False
+    sensor._update_state({"ppm": 10})
+    assert not sensor.assumed_state
+    assert sensor.async_write_ha_state.call_count == 2
+
+    # Once live, an unchanged value is filtered again
+    sensor._update_state({"ppm": 10})
+    assert sensor.async_write_ha_state.call_count == 2
+
+
+async def test_binary_sensor_debounces_flapping(hass: HomeAssistant):
+    """Test that a binary sensor only changes once the new state holds."""
+    plan = compile_profile("whisper_flex_2").binary_sensors[0]
+    sensor = _entity(
+        hass, DuuxBinarySensor(Mock(), "aa", "Fan", "whisper_flex_2", plan, 30)
+    )
+
+    sensor._update_state({"batcha": 0})
+    assert sensor.is_on is False
+
+    # Flapping back within the debounce is never written
+    sensor._update_state({"batcha": 1})
+    sensor._update_state({"batcha": 0})
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=31))
+    assert sensor.is_on is False
+    assert sensor.async_write_ha_state.call_count == 1
+
+    sensor._update_state({"batcha": 1})
+    sensor._update_state({"batcha": 1})
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=62))
+    assert sensor.is_on is True
+    assert sensor.async_write_ha_state.call_count == 2
@@ -0,0 +1,44 @@
+import json
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID
+from custom_components.duux_fan_local.health import DeviceHealth
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+
+BRIGHT_2_PAYLOAD = json.dumps(
+    {"sub": {"Tune": [{"rssi": -61, "sub": {"Tune": [{"ppm": 17}]}}]}}
+)
+
+
+async def test_health_derives_figures_from_client_counters(hass: HomeAssistant):
+    """Test the rates and averages computed between two refreshes."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    health = DeviceHealth(hass, client)
+    update = Mock()
+    remove = health.register_callback(update)
+
+    for payload in (BRIGHT_2_PAYLOAD, "not json", BRIGHT_2_PAYLOAD):
+        client.on_message(None, None, Mock(topic=client.state_topic, payload=payload))
+    client.metrics.echo_latency.observe(0.2)
+    client.metrics.echo_latency.observe(0.4)
+    # Pretend the refresh interval took 30 seconds
+    health._last_refresh -= 30
+    client.last_seen -= 12
+
+    health._async_refresh()
+    update.assert_called_once_with()
+    assert health.rssi == -61
+    assert health.message_rate == 6.0
+    assert health.last_seen_age == 12
+    assert health.parse_errors == 1
+    assert health.round_trip == 300.0
+
+    # Without new commands the last round trip is kept
+    health._async_refresh()
+    assert health.message_rate == 0
+    assert health.round_trip == 300.0
+
+    remove()
+    assert health._unsub_refresh is None
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.duux_fan_local.const import (
+    CONF_DEVICE_ID,
+    CONF_MODEL,
+    DATA_HISTORY,
+)
+from custom_components.duux_fan_local.history import SampleRing
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+from custom_components.duux_fan_local.profiles import compile_profile
+from custom_components.duux_fan_local.sensor import DuuxSensor
+from custom_components.duux_fan_local.websocket import websocket_history
+
+
+def test_ring_downsamples_and_wraps():
+    """Test that samples average per bucket and old slots are overwritten."""
+    ring = SampleRing(hours=1, resolution=600)
+    assert ring.capacity == 6
+    assert ring.nbytes == 48
+
+    ring.add(1000, 10)
+    ring.add(1100, 20)
+    assert ring.window() == ([600], [15.0])
+
+    for index in range(1, 8):
+        ring.add(600 + index * 600, index)
+    assert len(ring) == 6
+    assert ring.window() == (
+        [1800, 2400, 3000, 3600, 4200, 4800],
+        [2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+    )
+    # The window wraps around the end of the arrays
+    assert ring.window(3000, 4500) == ([3000, 3600, 4200], [4.0, 5.0, 6.0])
+    assert ring.window(9000) == ([], [])
+
+
+async def test_websocket_history(hass: HomeAssistant):
+    """Test reading a window through the websocket command."""
+    ring = SampleRing(hours=1, resolution=60)
+    for minute in range(10):
+        ring.add(minute * 60, minute)
+    hass.data[DATA_HISTORY] = {"sensor.bright_ppm": ring}
+    connection = Mock()
+
+    websocket_history(
+        hass,
+        connection,
+        {"id": 1, "entity_id": "sensor.bright_ppm", "start": 120, "end": 240},
+    )
+    connection.send_result.assert_called_once_with(
+        1, {"resolution": 60, "times": [120, 180, 240], "values": [2.0, 3.0, 4.0]}
+    )
+
+    websocket_history(hass, connection, {"id": 2, "entity_id": "sensor.other"})
+    assert connection.send_error.call_args[0][:2] == (2, "not_found")
+
+
+async def test_steady_sensor_fills_its_history(hass: HomeAssistant):
+    """Test that repeated readings are sampled though only the first is written."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "aa", CONF_MODEL: "bright_2"})
+    history = Mock()
+    plan = compile_profile("bright_2").sensors[1]
+    sensor = DuuxSensor(client, "aa", "Bright", "bright_2", plan, history)
+    sensor.hass = hass
+    sensor.async_write_ha_state = Mock()
+    await sensor.async_added_to_hass()
+
+    mock_msg = Mock()
+    mock_msg.topic = client.state_topic
+    mock_msg.payload = json.dumps({"sub": {"Tune": [{plan.state_key: 12}]}})
+    for _ in range(3):
+        client.on_message(None, None, mock_msg)
+        await asyncio.sleep(0)
+
+    assert client.metrics.payloads_deduplicated == 2
+    assert [add.args[1] for add in history.add.call_args_list] == [12, 12, 12]
+    sensor.async_write_ha_state.assert_called_once()
+    await sensor.async_will_remove_from_hass()
@@ -0,0 +1,145 @@
+import asyncio
+import json
+from unittest.mock import Mock, patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.duux_fan_local.commands import CONFIRM_TIMEOUT, DuuxCommandQueue
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID, DOMAIN
+from custom_components.duux_fan_local.metrics import (
+    DeviceMetrics,
+    Histogram,
+    format_metrics,
+)
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+from custom_components.duux_fan_local.view import DuuxMetricsView
+
+
+def test_histogram_buckets_include_their_bound():
+    """Test that values land in the first bucket whose bound they reach."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.total == 3.65
+
+
+def test_format_metrics_exports_counters_and_histograms():
+    """Test the Prometheus text of a device."""
+    metrics = DeviceMetrics(messages_received=3, parse_errors=1)
+    metrics.receive_latency = Histogram((0.01,))
+    metrics.receive_latency.observe(0.004)
+    metrics.receive_latency.observe(0.5)
+
+    text = format_metrics([("aa:bb", metrics)])
+    lines = text.splitlines()
+    assert "# TYPE duux_fan_local_messages_received_total counter" in lines
+    assert 'duux_fan_local_messages_received_total{device="aa:bb"} 3' in lines
+    assert 'duux_fan_local_parse_errors_total{device="aa:bb"} 1' in lines
+    assert (
+        'duux_fan_local_receive_latency_seconds_bucket{device="aa:bb",le="0.01"} 1'
+        in lines
+    )
+    assert (
+        'duux_fan_local_receive_latency_seconds_bucket{device="aa:bb",le="+Inf"} 2'
+        in lines
+    )
+    assert 'duux_fan_local_receive_latency_seconds_count{device="aa:bb"} 2' in lines
+    assert text.endswith("\n")
+
+
+async def test_message_path_counts_and_times_messages(hass: HomeAssistant):
+    """Test the decode counters and the receive-to-write latency."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client.register_callback(Mock())
+
+    for payload in (
+        json.dumps({"sub": {"Tune": [{"power": 1}]}}),
+        json.dumps({"sub": {}}),
+        "not json",
+    ):
+        client.on_message(None, None, Mock(topic=client.state_topic, payload=payload))
+    await asyncio.sleep(0)
+
+    metrics = client.metrics
+    assert metrics.messages_received == 3
+    assert metrics.messages_decoded == 2
+    assert metrics.messages_dropped == 1
+    assert metrics.parse_errors == 1
+    assert metrics.receive_latency.count == 1
+
+
+async def test_command_echo_latency(hass: HomeAssistant):
+    """Test that a published value is timed until the device reports it."""
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(
+        hass,
+        Mock(),
+        0,
+        metrics,
+        command_state_keys={"tune set speed": "speed"},
+    )
+    queue.async_enqueue("tune set speed 12")
+    await asyncio.sleep(0)
+
+    queue.async_process_state({"speed": 3})
+    assert metrics.echo_latency.count == 0
+    queue.async_process_state({"speed": 12})
+    queue.async_process_state({"speed": 12})
+    assert metrics.echo_latency.count == 1
+
+
+async def test_unreported_echo_is_lost_not_timed(hass: HomeAssistant):
+    """Test that a dropped command is not timed against a later report."""
+    metrics = DeviceMetrics()
+    queue = DuuxCommandQueue(
+        hass,
+        Mock(),
+        0,
+        metrics,
+        command_state_keys={"tune set speed": "speed"},
+    )
+    queue.async_enqueue("tune set speed 12")
+    await asyncio.sleep(0)
+    assert queue.awaiting_confirmation
+
+    later = hass.loop.time() + CONFIRM_TIMEOUT + 1
+    with patch.object(hass.loop, "time", return_value=later):
+        queue.async_process_state({"speed": 12})
+    assert metrics.echo_latency.count == 0
+    assert metrics.commands_lost == 1
+    assert not queue.awaiting_confirmation
+
+
+async def test_heartbeat_after_command_is_not_deduplicated(hass: HomeAssistant):
+    """Test that an unchanged report still times a command setting that value."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac", "model": "bright_2"})
+    mock_msg = Mock()
+    mock_msg.topic = client.state_topic
+    mock_msg.payload = json.dumps({"sub": {"Tune": [{"speed": 3}]}})
+    client.on_message(None, None, mock_msg)
+    await asyncio.sleep(0)
+
+    client._commands.async_send_batch(["tune set speed 3"])
+    client.on_message(None, None, mock_msg)
+    await asyncio.sleep(0)
+
+    assert client.metrics.payloads_deduplicated == 0
+    assert client.metrics.echo_latency.count == 1
+    client._commands.async_cancel()
+
+
+async def test_metrics_view(hass: HomeAssistant):
+    """Test that the view serves the metrics of every configured device."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client.metrics.commands_published = 4
+    hass.data[DOMAIN] = {"entry": client}
+
+    request = Mock(app={"hass": hass})
+    response = await DuuxMetricsView().get(request)
+    assert response.content_type == "text/plain"
+    assert (
+        'duux_fan_local_commands_published_total{device="test_mac"} 4'
+        in response.text.splitlines()
+    )
@@ -1,10 +1,30 @@
+import asyncio
 import json
 import logging
-from unittest.mock import Mock, patch
+import time
+from datetime import timedelta
+from unittest.mock import Mock, call, patch
+
+import pytest
 from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 
-from custom_components.duux_fan_local.mqtt import DuuxMqttClient
-from custom_components.duux_fan_local.const import CONF_DEVICE_ID
+from custom_components.duux_fan_local.mqtt import (
+    DuuxBrokerConnection,
+    DuuxMqttClient,
+    connection_key,
+    session_client_id,
+)
+from custom_components.duux_fan_local.const import (
+    CONF_COMMAND_RATE,
+    CONF_DEVICE_ID,
+    CONF_PERSISTENT_SESSION,
+    CONF_TRANSPORT,
+    DATA_CONNECTIONS,
+    TRANSPORT_ASYNCIO,
+    TRANSPORT_THREAD,
+)
 
 
 def test_mqtt_client_initialization(hass: HomeAssistant):
@@ -33,13 +53,12 @@ def test_on_message_standard_payload(hass: HomeAssistant):
     mock_msg.topic = client.state_topic
     mock_msg.payload = json.dumps(payload)
 
-    with patch.object(hass, "add_job") as mock_add_job:
+    with patch.object(hass.loop, "call_soon_threadsafe") as mock_call_soon:
         client.on_message(None, None, mock_msg)
 
-        # Verify the callback was triggered via add_job
-        mock_add_job.assert_called_once_with(
-            mock_callback, {"power": 1, "speed": 10, "mode": 2}
-        )
+        # Verify the payload was handed to the event loop in a single hop
+        mock_call_soon.assert_called_once_with(client._async_drain_mailbox)
+        assert client._pending == {"power": 1, "speed": 10, "mode": 2}
 
 
 def test_on_message_double_nested_payload(hass: HomeAssistant):
@@ -67,13 +86,12 @@ def test_on_message_double_nested_payload(hass: HomeAssistant):
     mock_msg.topic = client.state_topic
     mock_msg.payload = json.dumps(payload)
 
-    with patch.object(hass, "add_job") as mock_add_job:
+    with patch.object(hass.loop, "call_soon_threadsafe") as mock_call_soon:
         client.on_message(None, None, mock_msg)
 
-        # Verify the callback was triggered with the *inner* dictionary payload
-        mock_add_job.assert_called_once_with(
-            mock_callback, {"power": 1, "ppm": 17, "speed": 0, "filter": 51}
-        )
+        # Verify the update was scheduled with the *inner* dictionary payload
+        mock_call_soon.assert_called_once_with(client._async_drain_mailbox)
+        assert client._pending == {"power": 1, "ppm": 17, "speed": 0, "filter": 51}
 
 
 def test_on_message_invalid_payload(hass: HomeAssistant, caplog):
@@ -92,3 +110,387 @@ def test_on_message_invalid_payload(hass: HomeAssistant, caplog):
 
     # Ensure no callbacks were registered
     assert mock_callback.call_count == 0
+
+
+def test_broker_connection_routes_by_topic(hass: HomeAssistant):
+    """Test that a shared connection only wakes the device owning the topic."""
+    connection = DuuxBrokerConnection(hass, {})
+    living_room = DuuxMqttClient(hass, {CONF_DEVICE_ID: "aa:aa"})
+    bedroom = DuuxMqttClient(hass, {CONF_DEVICE_ID: "bb:bb"})
+    connection.attach(living_room)
+    connection.attach(bedroom)
+
+    mock_msg = Mock()
+    mock_msg.topic = bedroom.state_topic
+    mock_msg.payload = json.dumps({"sub": {"Tune": [{"power": 1}]}})
+
+    with (
+        patch.object(living_room, "on_message") as living_room_message,
+        patch.object(bedroom, "on_message") as bedroom_message,
+    ):
+        connection.on_message(None, None, mock_msg)
+        mock_msg.topic = "sensor/unknown/in"
+        connection.on_message(None, None, mock_msg)
+
+    living_room_message.assert_not_called()
+    bedroom_message.assert_called_once()
+
+
+async def test_devices_share_reference_counted_connection(hass: HomeAssistant):
+    """Test that devices on the same broker share one connection."""
+    first = DuuxMqttClient(hass, {CONF_DEVICE_ID: "aa:aa", "username": "user"})
+    second = DuuxMqttClient(hass, {CONF_DEVICE_ID: "bb:bb", "username": "user"})
+
+    with (
+        patch.object(DuuxBrokerConnection, "_async_supervise") as mock_connect,
+        patch.object(DuuxBrokerConnection, "async_disconnect") as mock_disconnect,
+        patch("custom_components.duux_fan_local.mqtt.CONNECT_GRACE_PERIOD", 0),
+    ):
+        await first.async_connect()
+        await second.async_connect()
+        assert first._connection is second._connection
+        assert mock_connect.call_count == 1
+
+        await first.async_disconnect()
+        mock_disconnect.assert_not_called()
+        await second.async_disconnect()
+        mock_disconnect.assert_called_once()
+
+    assert hass.data[DATA_CONNECTIONS] == {}
+
+
+async def test_event_loop_transport_skips_thread_hops(hass: HomeAssistant):
+    """Test that the asyncio transport dispatches and publishes on the loop."""
+    connection = DuuxBrokerConnection(hass, {CONF_TRANSPORT: TRANSPORT_ASYNCIO})
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client._connection = connection
+    connection.attach(client)
+    mock_callback = Mock()
+    client.register_callback(mock_callback)
+
+    mock_msg = Mock()
+    mock_msg.topic = client.state_topic
+    mock_msg.payload = json.dumps({"sub": {"Tune": [{"power": 1}]}})
+
+    with (
+        patch.object(hass, "add_job") as mock_add_job,
+        patch.object(hass, "async_add_executor_job") as mock_executor,
+        patch.object(connection, "publish") as mock_publish,
+    ):
+        connection.on_message(None, None, mock_msg)
+        await client.async_publish("tune set power 0")
+        await asyncio.sleep(0)
+        # The state report resumes the command journal, which flushes next
+        await asyncio.sleep(0)
+
+    mock_add_job.assert_not_called()
+    mock_executor.assert_not_called()
+    mock_callback.assert_called_once_with({"power": 1})
+    mock_publish.assert_called_once_with(client.command_topic, "tune set power 0")
+
+
+def test_thread_transport_keeps_paho_thread(hass: HomeAssistant):
+    """Test that the thread fallback does not install the socket hooks."""
+    connection = DuuxBrokerConnection(hass, {CONF_TRANSPORT: TRANSPORT_THREAD})
+    assert not connection.runs_in_event_loop
+    assert connection._client.on_socket_open is None
+
+    connection = DuuxBrokerConnection(hass, {})
+    assert connection.runs_in_event_loop
+    with patch.object(hass.loop, "add_reader") as mock_add_reader:
+        connection._on_socket_open(connection._client, None, "sock")
+    mock_add_reader.assert_called_once_with(
+        "sock", connection._read, connection._client, "sock"
+    )
+
+
+def test_reader_drains_packets_buffered_by_tls(hass: HomeAssistant):
+    """Test that packets decrypted behind one readable event are all read."""
+    client = Mock()
+    client.loop_read.return_value = 0
+    sock = Mock()
+    # Two more packets sit in the SSL buffer after the first read
+    sock.pending.side_effect = [2, 1, 0]
+    DuuxBrokerConnection._read(client, sock)
+    assert client.loop_read.call_count == 3
+
+    # A failed read stops, whatever is still buffered
+    client.loop_read.reset_mock()
+    client.loop_read.return_value = 7
+    sock.pending.side_effect = None
+    sock.pending.return_value = 1
+    DuuxBrokerConnection._read(client, sock)
+    client.loop_read.assert_called_once()
+
+
+def test_dispatch_only_wakes_changed_keys(hass: HomeAssistant):
+    """Test that callbacks only run when one of their state keys changes."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    speed_callback = Mock()
+    fan_callback = Mock()
+    client.register_callback(speed_callback, ("speed",))
+    client.register_callback(fan_callback, {"power", "speed"})
+
+    client._async_dispatch_changes({"power": 1, "speed": 3})
+    speed_callback.assert_called_once()
+    fan_callback.assert_called_once()
+
+    # An identical heartbeat wakes nobody
+    client._async_dispatch_changes({"power": 1, "speed": 3})
+    assert speed_callback.call_count == 1
+    assert fan_callback.call_count == 1
+
+    client._async_dispatch_changes({"power": 0, "speed": 3})
+    assert speed_callback.call_count == 1
+    fan_callback.assert_called_with({"power": 0, "speed": 3})
+
+    client.unregister_callback(fan_callback)
+    assert client._key_callbacks == {"speed": [speed_callback]}
+
+
+async def test_mailbox_coalesces_bursts(hass: HomeAssistant):
+    """Test that a burst of messages reaches the entities as one merged state."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    mock_callback = Mock()
+    client.register_callback(mock_callback)
+
+    mock_msg = Mock()
+    mock_msg.topic = client.state_topic
+    for tune in ({"power": 1, "speed": 3}, {"speed": 7}, {"speed": 9, "mode": 1}):
+        mock_msg.payload = json.dumps({"sub": {"Tune": [tune]}})
+        client.on_message(None, None, mock_msg)
+    await hass.async_block_till_done()
+
+    mock_callback.assert_called_once_with({"power": 1, "speed": 9, "mode": 1})
+    assert client.metrics.messages_received == 3
+    assert client.metrics.messages_coalesced == 2
+    assert client.metrics.mailbox_drains == 1
+
+
+def test_on_message_skips_identical_payloads(hass: HomeAssistant):
+    """Test that a repeated raw payload is dropped before decoding."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+
+    mock_msg = Mock()
+    mock_msg.topic = client.state_topic
+    mock_msg.payload = json.dumps({"sub": {"Tune": [{"power": 1}]}}).encode()
+
+    with (
+        patch.object(hass.loop, "call_soon_threadsafe"),
+        patch(
+            "custom_components.duux_fan_local.mqtt.loads", wraps=json.loads
+        ) as mock_loads,
+    ):
+        client.on_message(None, None, mock_msg)
+        client.on_message(None, None, mock_msg)
+
+    mock_loads.assert_called_once()
+    assert client.metrics.messages_received == 2
+    assert client.metrics.payloads_deduplicated == 1
+
+
+async def test_state_confirms_commands(hass: HomeAssistant):
+    """Test that state payloads reach the command queue, even when unchanged."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client._state = {"speed": 5}
+    with patch.object(client._commands, "async_process_state") as process:
+        client._async_dispatch_changes({"speed": 5})
+    process.assert_called_once_with({"speed": 5})
+
+
+async def test_transaction_resolves_when_applied(hass: HomeAssistant):
+    """Test that a transaction waits for the device to report every value."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    with patch.object(client._commands, "async_send_batch") as send_batch:
+        task = hass.async_create_task(
+            client.async_transaction(["tune set power 1", "tune set speed 12"])
+        )
+        await asyncio.sleep(0)
+        send_batch.assert_called_once_with(["tune set power 1", "tune set speed 12"], 0)
+
+        # Values may be reported across several payloads
+        client._async_dispatch_changes({"power": 1, "speed": 3})
+        await asyncio.sleep(0)
+        assert not task.done()
+        client._async_dispatch_changes({"power": 1, "speed": 12})
+        assert await task
+        assert not client._transactions
+
+        assert not await client.async_transaction(["tune set power 0"], timeout=0)
+
+
+async def test_transaction_does_not_wait_while_journaled(hass: HomeAssistant, caplog):
+    """Test that a journaled transaction returns without waiting or warning."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client.async_link_lost()
+    with patch.object(client._commands, "async_send_batch") as send_batch:
+        assert not await client.async_transaction(["tune set power 1"])
+
+    send_batch.assert_called_once_with(["tune set power 1"], 0)
+    assert not client._transactions
+    assert "did not apply" not in caplog.text
+
+
+async def test_commands_journaled_while_link_is_down(hass: HomeAssistant):
+    """Test that commands wait for the device to report state after a drop."""
+    connection = DuuxBrokerConnection(hass, {})
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac", CONF_COMMAND_RATE: 0})
+    client._connection = connection
+    connection.attach(client)
+    client._async_dispatch_changes({"power": 1})
+    assert not client._commands.paused
+
+    with patch.object(connection, "publish") as mock_publish:
+        connection.on_disconnect(None, None, 1)
+        await client.async_publish("tune set power 0")
+        await client.async_publish("tune set speed 4")
+        await client.async_publish("tune set power 1")
+        await asyncio.sleep(0)
+        mock_publish.assert_not_called()
+
+        # The device reports state once the link is back
+        client._async_dispatch_changes({"power": 1})
+        await asyncio.sleep(0)
+
+    # Only the latest command per setting, in the order they were last set
+    assert mock_publish.call_args_list == [
+        call(client.command_topic, "tune set speed 4"),
+        call(client.command_topic, "tune set power 1"),
+    ]
+
+
+async def test_commands_journaled_while_device_is_silent(hass: HomeAssistant):
+    """Test that commands wait for a device the watchdog marked unavailable."""
+    connection = DuuxBrokerConnection(hass, {})
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac", CONF_COMMAND_RATE: 0})
+    client._connection = connection
+    connection.attach(client)
+
+    with patch.object(connection, "publish") as mock_publish:
+        client.async_set_available(False)
+        await client.async_publish("tune set power 0")
+        await asyncio.sleep(0)
+        mock_publish.assert_not_called()
+
+        client._async_dispatch_changes({"power": 1})
+        await asyncio.sleep(0)
+
+    assert client.available
+    mock_publish.assert_called_once_with(client.command_topic, "tune set power 0")
+
+
+async def test_identical_heartbeat_resumes_journal(hass: HomeAssistant):
+    """Test that an unchanged report after a reconnect flushes the journal."""
+    connection = DuuxBrokerConnection(hass, {})
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac", CONF_COMMAND_RATE: 0})
+    client._connection = connection
+    connection.attach(client)
+    mock_msg = Mock()
+    mock_msg.topic = client.state_topic
+    mock_msg.payload = json.dumps({"sub": {"Tune": [{"power": 1}]}})
+
+    with patch.object(connection, "publish") as mock_publish:
+        client.on_message(None, None, mock_msg)
+        await asyncio.sleep(0)
+        connection.on_disconnect(None, None, 1)
+        await client.async_publish("tune set power 0")
+        await asyncio.sleep(0)
+        mock_publish.assert_not_called()
+
+        # The device repeats the heartbeat it sent before the drop
+        client.on_message(None, None, mock_msg)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    mock_publish.assert_called_once_with(client.command_topic, "tune set power 0")
+    assert client.metrics.payloads_deduplicated == 0
+
+
+@pytest.mark.parametrize("transport", [TRANSPORT_ASYNCIO, TRANSPORT_THREAD])
+async def test_first_connection_failure_is_raised(hass: HomeAssistant, transport):
+    """Test that a fast first failure is raised and releases the connection."""
+    client = DuuxMqttClient(
+        hass, {CONF_DEVICE_ID: "test_mac", CONF_TRANSPORT: transport}
+    )
+    with (
+        patch.object(
+            DuuxBrokerConnection,
+            "_connect",
+            side_effect=ConnectionRefusedError("refused"),
+        ) as mock_connect,
+        patch("custom_components.duux_fan_local.mqtt.RECONNECT_DELAY", 0.01),
+    ):
+        with pytest.raises(ConnectionRefusedError):
+            await client.async_connect()
+
+        assert client._connection is None
+        assert hass.data[DATA_CONNECTIONS] == {}
+        await asyncio.sleep(0.05)
+    # The supervisor stopped with the last reference
+    assert mock_connect.call_count == 1
+
+
+async def test_slow_first_failure_does_not_stick(hass: HomeAssistant):
+    """Test that later devices only see the error of the latest attempt."""
+    connection = DuuxBrokerConnection(hass, {CONF_TRANSPORT: TRANSPORT_THREAD})
+
+    attempts = []
+
+    def connect():
+        attempts.append(None)
+        if len(attempts) == 1:
+            time.sleep(0.05)
+            raise ConnectionResetError("reset")
+
+    with (
+        patch.object(connection, "_connect", side_effect=connect),
+        patch.object(connection._client, "loop_start") as mock_loop_start,
+        patch("custom_components.duux_fan_local.mqtt.CONNECT_GRACE_PERIOD", 0.01),
+        patch("custom_components.duux_fan_local.mqtt.RECONNECT_DELAY", 0.01),
+    ):
+        # The first attempt outlasts the grace period, setup carries on
+        await connection.async_connect()
+        await asyncio.sleep(0.2)
+        assert len(attempts) == 2
+        mock_loop_start.assert_called_once()
+
+        # The supervisor has connected since, the old error is history
+        await connection.async_connect()
+    await connection.async_disconnect()
+
+
+async def test_persistent_session_uses_stable_client_id(hass: HomeAssistant):
+    """Test that persistent sessions keep their client ID across restarts."""
+    config = {CONF_PERSISTENT_SESSION: True, "username": "user"}
+    key = connection_key(config)
+    assert session_client_id(key, "instance") == session_client_id(key, "instance")
+    assert session_client_id(key, "instance") != session_client_id(key, "other")
+    assert len(session_client_id(key, "instance")) <= 23
+
+    connection = DuuxBrokerConnection(hass, config, session_client_id(key, "a"))
+    assert connection._client._clean_session is False
+    assert DuuxBrokerConnection(hass, {})._client._clean_session is True
+
+
+async def test_session_backlog_merges_into_one_drain(hass: HomeAssistant):
+    """Test that messages replayed after a reconnect reach entities once."""
+    connection = DuuxBrokerConnection(hass, {})
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client._connection = connection
+    connection.attach(client)
+    mock_callback = Mock()
+    client.register_callback(mock_callback)
+
+    with patch.object(connection._client, "subscribe"):
+        connection.on_connect(None, None, {"session present": 1}, 0)
+    for speed in range(1, 6):
+        mock_msg = Mock()
+        mock_msg.topic = client.state_topic
+        mock_msg.payload = json.dumps({"sub": {"Tune": [{"speed": speed}]}})
+        connection.on_message(None, None, mock_msg)
+        await asyncio.sleep(0)
+    mock_callback.assert_not_called()
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2))
+    mock_callback.assert_called_once_with({"speed": 5})
+    client._commands.async_cancel()
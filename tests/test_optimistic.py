@@ -0,0 +1,69 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.duux_fan_local.const import (
+    CONF_COMMAND_RATE,
+    CONF_DEVICE_ID,
+    CONF_OPTIMISTIC,
+)
+from custom_components.duux_fan_local.metrics import DeviceMetrics
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+from custom_components.duux_fan_local.optimistic import OptimisticState
+
+
+async def test_expected_values_confirm_and_roll_back(hass: HomeAssistant):
+    """Test that expected values last until reported or timed out."""
+    on_rollback = Mock()
+    metrics = DeviceMetrics()
+    optimistic = OptimisticState(hass, on_rollback, metrics)
+
+    optimistic.async_expect("speed", 12, 3)
+    optimistic.async_expect("power", 1, 0)
+    # Setting the reported value has nothing to wait for
+    optimistic.async_expect("mode", 1, 1)
+    assert optimistic.apply({"speed": 3, "mode": 1}) == {
+        "speed": 12,
+        "power": 1,
+        "mode": 1,
+    }
+
+    # Other values leave the expected one in place until it is reported
+    optimistic.async_reconcile({"speed": 3, "power": 1})
+    assert optimistic.apply({"speed": 3, "power": 1}) == {"speed": 12, "power": 1}
+    assert metrics.optimistic_confirmed == 1
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    on_rollback.assert_called_once_with("speed")
+    assert not optimistic
+    assert metrics.optimistic_rolled_back == 1
+
+
+async def test_client_writes_optimistic_state(hass: HomeAssistant):
+    """Test that entities see a sent value at once, without flicker."""
+    client = DuuxMqttClient(
+        hass,
+        {
+            CONF_DEVICE_ID: "test_mac",
+            CONF_OPTIMISTIC: True,
+            CONF_COMMAND_RATE: 0,
+        },
+    )
+    states = []
+    client.register_callback(lambda state: states.append(state["speed"]), ("speed",))
+    client._state = {"speed": 3}
+
+    await client.async_publish("tune set speed 12")
+    # A periodic report sent before the command arrived does not flicker
+    client._async_dispatch_changes({"speed": 3})
+    client._async_dispatch_changes({"speed": 12})
+    assert states == [12, 12]
+    assert not client._optimistic
+
+    await client.async_publish("tune set speed 5")
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=11))
+    assert states == [12, 12, 5, 12]
+    client._commands.async_cancel()
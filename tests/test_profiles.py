@@ -0,0 +1,62 @@
+import dataclasses
+
+import pytest
+
+from custom_components.duux_fan_local.devices import DEVICE_PROFILES
+from custom_components.duux_fan_local.profiles import (
+    compile_profile,
+    default_availability_timeout,
+)
+
+
+def test_compile_every_profile():
+    """Test that every device profile compiles into a cached plan."""
+    for model_key, profile in DEVICE_PROFILES.items():
+        plan = compile_profile(model_key)
+        assert plan is compile_profile(model_key)
+        assert plan.name == profile["name"]
+        assert [sensor.key for sensor in plan.sensors] == list(profile["sensors"])
+        assert not hasattr(plan, "__dict__")
+
+    assert compile_profile("unknown_model") is None
+
+
+def test_compiled_plans_precompute_lookups():
+    """Test the precomputed feature flags, multipliers and option maps."""
+    whisper_flex = compile_profile("whisper_flex_1")
+    assert whisper_flex.fan.oscillate and whisper_flex.fan.direction
+    assert whisper_flex.fan.state_keys == {"power", "speed", "swing", "tilt"}
+
+    whisper_flex_2 = compile_profile("whisper_flex_2")
+    assert not whisper_flex_2.fan.oscillate
+    assert whisper_flex_2.sensors[0].multiplier == 10
+
+    horizontal = next(
+        select
+        for select in whisper_flex_2.selects
+        if select.key == "horizontal_oscillation"
+    )
+    assert horizontal.value_options[2] == "60°"
+    assert horizontal.option_values["90°"] == 3
+    assert whisper_flex_2.command_state_keys["tune set speed"] == "speed"
+    assert whisper_flex_2.command_state_keys["tune set horosc"] == "horosc"
+
+    bright = compile_profile("bright_2")
+    p95 = next(stat for stat in bright.statistics if stat.key == "tvoc_p95_60m")
+    assert p95.state_key == "TVOC"
+    assert p95.statistic == "percentile" and p95.percentile == 95
+    assert p95.window == 60
+    assert p95.unit == "µg/m³"
+    assert not whisper_flex_2.statistics
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        horizontal.state_key = "swing"
+    with pytest.raises(TypeError):
+        horizontal.option_values["Off"] = 1
+
+
+def test_availability_timeout_follows_report_interval():
+    """Test that battery models get longer to report than mains models."""
+    assert default_availability_timeout("bright_2") == 90
+    assert default_availability_timeout("whisper_flex_2") == 900
+    assert default_availability_timeout("unknown") == 90
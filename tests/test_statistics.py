@@ -0,0 +1,100 @@
+import asyncio
+import json
+import random
+import statistics
+from unittest.mock import Mock
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID, CONF_MODEL
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+from custom_components.duux_fan_local.profiles import compile_profile
+from custom_components.duux_fan_local.sensor import DuuxStatisticSensor
+from custom_components.duux_fan_local.statistics import (
+    RollingExtreme,
+    RollingMean,
+    RollingPercentile,
+    rolling_statistic,
+)
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * percentile / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def test_rolling_statistics_match_a_full_recompute():
+    """Test every statistic against a recompute of the window contents."""
+    rng = random.Random(7)
+    window = 300
+    mean = RollingMean(window)
+    minimum = RollingExtreme(window)
+    maximum = RollingExtreme(window, largest=True)
+    p95 = RollingPercentile(window, 95)
+
+    samples = []
+    now = 0.0
+    for _ in range(2000):
+        now += rng.uniform(1, 40)
+        value = rng.randint(0, 200)
+        samples.append((now, value))
+        for statistic in (mean, minimum, maximum, p95):
+            statistic.add(now, value)
+
+        in_window = [v for ts, v in samples if ts > now - window]
+        assert len(mean) == len(minimum) == len(p95) == len(in_window)
+        assert mean.value(now) == pytest.approx(statistics.fmean(in_window))
+        assert minimum.value(now) == min(in_window)
+        assert maximum.value(now) == max(in_window)
+        assert p95.value(now) == pytest.approx(_percentile(in_window, 95))
+
+
+def test_rolling_statistics_expire_without_new_samples():
+    """Test that reading a statistic drops the samples that left the window."""
+    mean = RollingMean(60)
+    maximum = RollingExtreme(60, largest=True)
+    for statistic in (mean, maximum):
+        statistic.add(0, 10)
+        statistic.add(30, 4)
+
+    assert mean.value(30) == 7
+    assert maximum.value(30) == 10
+    assert mean.value(75) == 4
+    assert maximum.value(75) == 4
+    assert mean.value(90) is None
+    assert maximum.value(90) is None
+
+
+def test_rolling_statistic_factory():
+    """Test that the profile statistic names map to their implementations."""
+    assert isinstance(rolling_statistic("mean", 60), RollingMean)
+    assert rolling_statistic("max", 60).largest
+    assert not rolling_statistic("min", 60).largest
+    assert rolling_statistic("percentile", 60, 90).percentile == 90
+    with pytest.raises(ValueError):
+        rolling_statistic("median", 60)
+
+
+async def test_statistic_sensor_samples_every_report(hass: HomeAssistant):
+    """Test that repeated readings weigh in the mean like changed ones."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "aa", CONF_MODEL: "bright_2"})
+    plan = compile_profile("bright_2").statistics[0]
+    assert plan.statistic == "mean"
+    sensor = DuuxStatisticSensor(client, "aa", "Bright", "bright_2", plan)
+    sensor.hass = hass
+    sensor.async_write_ha_state = Mock()
+    await sensor.async_added_to_hass()
+
+    for ppm in (10, 10, 10, 40):
+        mock_msg = Mock()
+        mock_msg.topic = client.state_topic
+        mock_msg.payload = json.dumps({"sub": {"Tune": [{"ppm": ppm}]}})
+        client.on_message(None, None, mock_msg)
+        await asyncio.sleep(0)
+
+    assert sensor.native_value == 17.5
+    assert sensor.async_write_ha_state.call_count == 4
@@ -0,0 +1,47 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID, STORAGE_KEY
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+from custom_components.duux_fan_local.store import async_get_state_store
+
+
+async def test_restored_state_is_replayed_until_live(hass: HomeAssistant, hass_storage):
+    """Test that entities start from the stored state, marked stale."""
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {"test_mac": {"power": 1, "speed": 12}},
+    }
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client.async_restore_state(await async_get_state_store(hass))
+    assert client.stale
+
+    speed_callback = Mock()
+    client.register_callback(speed_callback, ("speed",))
+    speed_callback.assert_called_once_with({"power": 1, "speed": 12})
+
+    # Live data clears the stale flag on every entity, changed or not
+    speed_callback.reset_mock()
+    client._async_dispatch_changes({"power": 0})
+    assert not client.stale
+    speed_callback.assert_called_once_with({"power": 0, "speed": 12})
+    client._commands.async_cancel()
+
+
+async def test_state_writes_are_batched(hass: HomeAssistant, hass_storage):
+    """Test that many state changes lead to one delayed write."""
+    client = DuuxMqttClient(hass, {CONF_DEVICE_ID: "test_mac"})
+    client.async_restore_state(await async_get_state_store(hass))
+    for speed in range(1, 20):
+        client._async_dispatch_changes({"speed": speed})
+    assert STORAGE_KEY not in hass_storage
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert hass_storage[STORAGE_KEY]["data"] == {"test_mac": {"speed": 19}}
+    client._commands.async_cancel()
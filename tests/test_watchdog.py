@@ -0,0 +1,40 @@
+from unittest.mock import Mock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.duux_fan_local.const import CONF_DEVICE_ID, CONF_MODEL
+from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+from custom_components.duux_fan_local.watchdog import async_get_watchdog
+
+
+async def test_sweep_only_expires_silent_devices(hass: HomeAssistant):
+    """Test that silent devices go unavailable and come back on a report."""
+    watchdog = async_get_watchdog(hass)
+    clients = [
+        DuuxMqttClient(hass, {CONF_DEVICE_ID: f"mac_{index}", CONF_MODEL: "bright_2"})
+        for index in range(3)
+    ]
+    silent, reporting, _ = clients
+    now = hass.loop.time()
+    for client in clients:
+        client.last_seen = now - 100
+        watchdog.async_watch(client)
+    availability_callback = Mock()
+    silent.register_availability_callback(availability_callback)
+
+    # A report only moves last_seen, the sweep re-pushes its heap entry
+    reporting.last_seen = now
+    watchdog._async_sweep()
+    assert not silent.available
+    assert reporting.available
+    availability_callback.assert_called_once()
+    assert [entry[2] for entry in watchdog._heap] == [reporting]
+
+    silent._async_dispatch_changes({"power": 1})
+    assert silent.available
+    assert len(watchdog._heap) == 2
+
+    for client in clients:
+        watchdog.async_unwatch(client)
+        client._commands.async_cancel()
+    assert watchdog._unsub_sweep is None
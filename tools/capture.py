@@ -0,0 +1,280 @@
+"""
+Record, read and replay Duux MQTT traffic offline.
+
+Captures are append-only files of length-prefixed records, read back through
+mmap one record at a time, so week-long captures of several gigabytes are
+recorded, dumped and replayed in constant memory.
+
+Run from the repository root:
+    python -m tools.capture record captures/bedroom.cap --host 192.168.1.10
+    python -m tools.capture dump captures/bedroom.cap
+    python -m tools.capture replay captures/bedroom.cap --model bright_2 --speed 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import ssl
+import struct
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import BinaryIO, TextIO
+
+# File header, then per record: receive time (Unix seconds), topic length,
+# payload length, topic (UTF-8) and payload (raw bytes)
+MAGIC = b"DUUXCAP1"
+RECORD = struct.Struct("<dHI")
+
+TOPICS = ("sensor/+/in", "sensor/+/command")
+
+
+class CaptureWriter:
+    """Append records to a capture file, creating it if needed."""
+
+    def __init__(self, path: str) -> None:
+        """Open the file for appending."""
+        self._file: BinaryIO = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        elif not _has_magic(path):
+            self._file.close()
+            raise ValueError(f"{path} is not a capture file")
+
+    def write(self, timestamp: float, topic: str, payload: bytes) -> None:
+        """Append one message, flushed so a crash loses at most this record."""
+        encoded = topic.encode()
+        self._file.write(RECORD.pack(timestamp, len(encoded), len(payload)))
+        self._file.write(encoded)
+        self._file.write(payload)
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+    def __enter__(self) -> CaptureWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _has_magic(path: str) -> bool:
+    with open(path, "rb") as capture:
+        return capture.read(len(MAGIC)) == MAGIC
+
+
+def iter_capture(path: str) -> Iterator[tuple[float, str, bytes]]:
+    """Yield (timestamp, topic, payload) for each record of a capture.
+
+    The file is mapped, not read: only the pages around the current record
+    are resident, and each payload is copied out as bytes like paho hands
+    it over. A record cut short by an interrupted capture ends the iteration.
+    """
+    with open(path, "rb") as capture:
+        if os.fstat(capture.fileno()).st_size == 0:
+            return
+        with mmap.mmap(capture.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+            offset = len(MAGIC)
+            size = len(mapped)
+            while offset + RECORD.size <= size:
+                timestamp, topic_length, payload_length = RECORD.unpack_from(
+                    mapped, offset
+                )
+                start = offset + RECORD.size
+                end = start + topic_length + payload_length
+                if end > size:
+                    return
+                topic = mapped[start : start + topic_length].decode()
+                yield timestamp, topic, mapped[start + topic_length : end]
+                offset = end
+
+
+def record(args: argparse.Namespace) -> None:
+    """Write the state and command traffic of the broker to a capture."""
+    import paho.mqtt.client as mqtt
+
+    if hasattr(mqtt, "CallbackAPIVersion"):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1)
+    else:
+        client = mqtt.Client()
+    if args.username:
+        client.username_pw_set(args.username, args.password)
+    if not args.no_tls:
+        # Duux devices use the broker's self-signed certificate
+        client.tls_set(cert_reqs=ssl.CERT_NONE)
+
+    topics = (
+        [topic.replace("+", args.device.lower()) for topic in TOPICS]
+        if args.device
+        else TOPICS
+    )
+    writer = CaptureWriter(args.capture)
+    count = 0
+
+    def on_connect(client, userdata, flags, rc):
+        if rc:
+            print(f"Connection refused, return code {rc}", file=sys.stderr)
+            return
+        for topic in topics:
+            client.subscribe(topic, qos=1)
+        print(f"Recording {', '.join(topics)} to {args.capture}", file=sys.stderr)
+
+    def on_message(client, userdata, msg):
+        nonlocal count
+        writer.write(time.time(), msg.topic, msg.payload)
+        count += 1
+
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.host, args.port, 60)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.disconnect()
+        writer.close()
+        print(f"Recorded {count} messages", file=sys.stderr)
+
+
+def dump(args: argparse.Namespace, output: TextIO = sys.stdout) -> None:
+    """Print each record of a capture as a JSON line."""
+    for timestamp, topic, payload in iter_capture(args.capture):
+        try:
+            body = json.loads(payload)
+        except ValueError:
+            body = payload.decode(errors="replace")
+        output.write(
+            json.dumps({"time": timestamp, "topic": topic, "payload": body}) + "\n"
+        )
+
+
+async def async_replay(
+    hass,
+    path: str,
+    model: str,
+    speed: float = 0,
+    output: TextIO = sys.stdout,
+) -> int:
+    """Feed the state messages of a capture to DuuxMqttClient.on_message.
+
+    With a speed, messages keep their original spacing divided by it, else
+    they go as fast as the clients process them. Each change of a device's
+    state is printed as a JSON line; captured commands are printed as is.
+    Returns the number of state messages replayed.
+    """
+    from custom_components.duux_fan_local.const import CONF_DEVICE_ID, CONF_MODEL
+    from custom_components.duux_fan_local.mqtt import DuuxMqttClient
+
+    loop = asyncio.get_running_loop()
+    clients: dict[str, DuuxMqttClient] = {}
+    # Capture time of the message each device is processing
+    received: dict[str, float] = {}
+    first: float | None = None
+    started = loop.time()
+    replayed = 0
+
+    def watch(device_id: str):
+        previous: dict = {}
+
+        def update(state: dict) -> None:
+            changed = {
+                key: value for key, value in state.items() if previous.get(key) != value
+            }
+            previous.update(state)
+            if changed:
+                line = {"time": received[device_id], "device": device_id}
+                output.write(json.dumps({**line, "changed": changed}) + "\n")
+
+        return update
+
+    for timestamp, topic, payload in iter_capture(path):
+        _, device_id, kind = topic.split("/", 2)
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = started + (timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if kind == "command":
+            line = {"time": timestamp, "device": device_id}
+            output.write(json.dumps({**line, "command": payload.decode()}) + "\n")
+            continue
+
+        client = clients.get(device_id)
+        if client is None:
+            client = clients[device_id] = DuuxMqttClient(
+                hass, {CONF_DEVICE_ID: device_id, CONF_MODEL: model}
+            )
+            client.register_callback(watch(client.device_id))
+        received[client.device_id] = timestamp
+        message = SimpleNamespace(topic=client.state_topic, payload=payload)
+        client.on_message(None, None, message)
+        replayed += 1
+        # Let the client drain its mailbox before the next message
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    return replayed
+
+
+def replay(args: argparse.Namespace) -> None:
+    """Replay a capture against the integration, without Home Assistant."""
+    from homeassistant.core import HomeAssistant
+
+    async def run() -> int:
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            return await async_replay(hass, args.capture, args.model, args.speed)
+
+    replayed = asyncio.run(run())
+    print(f"Replayed {replayed} state messages", file=sys.stderr)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run one of the capture jobs."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    jobs = parser.add_subparsers(dest="job", required=True)
+
+    recorder = jobs.add_parser("record", help="record broker traffic")
+    recorder.add_argument("capture")
+    recorder.add_argument("--host", required=True)
+    recorder.add_argument("--port", type=int, default=443)
+    recorder.add_argument("--username")
+    recorder.add_argument("--password")
+    recorder.add_argument("--device", help="MAC address of a single device")
+    recorder.add_argument("--no-tls", action="store_true")
+    recorder.set_defaults(run=record)
+
+    dumper = jobs.add_parser("dump", help="print a capture as JSON lines")
+    dumper.add_argument("capture")
+    dumper.set_defaults(run=dump)
+
+    replayer = jobs.add_parser("replay", help="replay a capture into the clients")
+    replayer.add_argument("capture")
+    replayer.add_argument("--model", default="whisper_flex_2")
+    replayer.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="1 for the original timing, 0 for as fast as possible",
+    )
+    replayer.set_defaults(run=replay)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()